@@ -0,0 +1,177 @@
+"""Query plans for the submission hot paths, before and after migration 2's indexes.
+
+Builds a throwaway fixture in its own schema (bench_indexes) of the configured
+database, so real tables are never touched, then runs each hot query with
+EXPLAIN ANALYZE without the indexes and again with them:
+
+    python bench_indexes.py                 # 1,000,000 submissions
+    python bench_indexes.py --rows 200000 --plans --keep
+
+Uses the same DB_* settings as the server. --plans prints the full plans,
+--keep leaves the schema behind for poking at with psql.
+"""
+import argparse
+import os
+import re
+import statistics
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+import migrations
+
+SCHEMA = "bench_indexes"
+USERS = 20000
+PROBLEMS = 60
+
+# Same shape as the server's queries; %(user)s is the busiest user, %(slug)s the
+# most submitted problem
+QUERIES = [
+    ("user submissions list", """
+        SELECT id, problem_id, language, status, created_at, cpu_time_ms, peak_memory_kb
+        FROM submissions WHERE user_id = %(user)s ORDER BY created_at DESC LIMIT 50"""),
+    ("user solved", "SELECT DISTINCT problem_id FROM submissions WHERE user_id = %(user)s AND status = 'Pass'"),
+    ("user pass count", "SELECT COUNT(*) FROM submissions WHERE user_id = %(user)s AND status = 'Pass'"),
+    ("user solved by difficulty", """
+        SELECT p.difficulty, COUNT(DISTINCT s.problem_id) FROM submissions s
+        JOIN problems p ON s.problem_id = p.slug
+        WHERE s.user_id = %(user)s AND s.status = 'Pass' GROUP BY p.difficulty"""),
+    ("user activity calendar", """
+        SELECT DATE(created_at) AS day, COUNT(*) FROM submissions
+        WHERE user_id = %(user)s AND created_at >= CURRENT_DATE - INTERVAL '364 days'
+        GROUP BY DATE(created_at) ORDER BY day ASC"""),
+    ("problem list acceptance", """
+        SELECT p.slug, p.title, p.difficulty, COUNT(s.id),
+               COUNT(CASE WHEN s.status = 'Pass' THEN 1 END)
+        FROM problems p LEFT JOIN submissions s ON p.slug = s.problem_id
+        GROUP BY p.id, p.slug, p.title, p.difficulty ORDER BY p.id ASC"""),
+    ("accepted usage of a problem", """
+        SELECT id, cpu_time_ms, peak_memory_kb FROM submissions
+        WHERE problem_id = %(slug)s AND language = 'python' AND status = 'Pass' AND cpu_time_ms IS NOT NULL"""),
+    ("rejudge scope", "SELECT COUNT(*) FROM submissions WHERE problem_id = %(slug)s AND status = ANY(ARRAY['Fail'])"),
+    ("admin submissions today", "SELECT COUNT(*) FROM submissions WHERE created_at >= CURRENT_DATE"),
+]
+
+
+def connect():
+    load_dotenv()
+    conn = psycopg2.connect(
+        host=os.getenv("DB_HOST", "localhost"),
+        database=os.getenv("DB_NAME", "contest_db"),
+        user=os.getenv("DB_USER", "user"),
+        password=os.getenv("DB_PASSWORD", "password"),
+        port=os.getenv("DB_PORT", "5433"),
+    )
+    conn.autocommit = True
+    return conn
+
+
+def build_fixture(cur, rows):
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"SET search_path TO {SCHEMA}")
+    for statement in migrations.MIGRATIONS[0]["sql"]:
+        cur.execute(statement)
+
+    cur.execute("""
+        INSERT INTO users (username, password_hash)
+        SELECT 'user' || g, 'x' FROM generate_series(1, %s) g
+    """, (USERS,))
+    cur.execute("""
+        INSERT INTO problems (slug, title, description, difficulty)
+        SELECT 'problem_' || g, 'Problem ' || g, '',
+               (ARRAY['Easy', 'Medium', 'Hard'])[1 + g %% 3]
+        FROM generate_series(1, %s) g
+    """, (PROBLEMS,))
+    # Skewed like real traffic: a few users and problems get most submissions
+    cur.execute("""
+        INSERT INTO submissions (user_id, problem_id, language, code, status, output,
+                                 cpu_time_ms, peak_memory_kb, created_at)
+        SELECT 1 + floor(power(random(), 3) * %(users)s)::int,
+               'problem_' || (1 + floor(power(random(), 2) * %(problems)s)::int),
+               CASE WHEN random() < 0.6 THEN 'python' ELSE 'cpp' END,
+               'class Solution: pass',
+               CASE WHEN random() < 0.45 THEN 'Pass' ELSE 'Fail' END,
+               '',
+               (random() * 900)::int,
+               (random() * 60000)::int,
+               now() - random() * INTERVAL '500 days'
+        FROM generate_series(1, %(rows)s)
+    """, {"users": USERS, "problems": PROBLEMS, "rows": rows})
+    cur.execute("VACUUM ANALYZE submissions")
+    cur.execute("ANALYZE users")
+    cur.execute("ANALYZE problems")
+
+
+def explain(cur, query, params, runs):
+    """Plan text of the last run and the median execution time in ms."""
+    times = []
+    plan = ""
+    for _ in range(runs):
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+        plan = "\n".join(row[0] for row in cur.fetchall())
+        times.append(float(re.search(r"Execution Time: ([\d.]+) ms", plan).group(1)))
+    return plan, statistics.median(times)
+
+
+def scan_nodes(plan):
+    # Enough to see a Seq Scan turn into an index (only) scan
+    return "; ".join(line.strip().lstrip("-> ") for line in plan.splitlines() if "Scan" in line)
+
+
+def run_queries(cur, params, runs):
+    return {name: explain(cur, query, params, runs) for name, query in QUERIES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=5, help="EXPLAIN ANALYZE runs per query (median is reported)")
+    parser.add_argument("--plans", action="store_true", help="print full plans")
+    parser.add_argument("--keep", action="store_true", help=f"keep the {SCHEMA} schema afterwards")
+    args = parser.parse_args()
+
+    conn = connect()
+    cur = conn.cursor()
+    try:
+        start = time.time()
+        print(f"Building fixture: {args.rows:,} submissions, {USERS:,} users, {PROBLEMS} problems...")
+        build_fixture(cur, args.rows)
+        print(f"Fixture ready in {time.time() - start:.1f}s")
+
+        cur.execute("SELECT user_id FROM submissions GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1")
+        user = cur.fetchone()[0]
+        cur.execute("SELECT problem_id FROM submissions GROUP BY problem_id ORDER BY COUNT(*) DESC LIMIT 1")
+        params = {"user": user, "slug": cur.fetchone()[0]}
+        cur.execute("SELECT COUNT(*) FROM submissions WHERE user_id = %s", (user,))
+        print(f"Busiest user {user} has {cur.fetchone()[0]:,} submissions; busiest problem is {params['slug']}")
+
+        before = run_queries(cur, params, args.runs)
+        start = time.time()
+        # Only migration 2's: later ones index tables the fixture does not have
+        migration = next(m for m in migrations.MIGRATIONS if m["version"] == 2)
+        migrations.build_indexes(conn, migration["indexes"])
+        print(f"Indexes built in {time.time() - start:.1f}s")
+        after = run_queries(cur, params, args.runs)
+
+        print()
+        print(f"{'query':<30} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        for name, _ in QUERIES:
+            b, a = before[name][1], after[name][1]
+            print(f"{name:<30} {b:>10.2f} {a:>10.2f} {b / max(a, 0.001):>7.1f}x")
+
+        for name, _ in QUERIES:
+            if args.plans:
+                print(f"\n=== {name} ===\n--- before ---\n{before[name][0]}\n--- after ---\n{after[name][0]}")
+            else:
+                print(f"\n{name}:\n  before: {scan_nodes(before[name][0])}"
+                      f"\n  after:  {scan_nodes(after[name][0])}")
+    finally:
+        if not args.keep:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Space used by submission code and output, and what blob storage saves.
+
+Submissions reference content-addressed, compressed blobs (see blobs.py)
+instead of storing code and output inline:
+
+    python blob_report.py                 # report only
+    python blob_report.py --gc            # also delete blobs no submission references
+    python blob_report.py --vacuum-full   # also rewrite submissions to return the
+                                          # space of the dropped inline columns
+
+Deleting users or problems leaves their blobs behind until --gc. --gc blocks
+new submissions while it runs and --vacuum-full locks submissions entirely, so
+run them when the site is quiet.
+"""
+import argparse
+import time
+
+import server
+
+
+def mib(n):
+    return f"{n / 2**20:,.1f} MiB"
+
+
+def report(cur):
+    cur.execute("""
+        SELECT COUNT(*), COUNT(DISTINCT code_hash), COUNT(output_hash), COUNT(DISTINCT output_hash)
+        FROM submissions
+    """)
+    submissions, code_blobs, outputs, output_blobs = cur.fetchone()
+    # What the same text would take stored inline, once per submission
+    cur.execute("""
+        SELECT COALESCE(SUM(b.size), 0) FROM submissions s JOIN blobs b ON b.hash = s.code_hash
+    """)
+    inline_code = cur.fetchone()[0]
+    cur.execute("""
+        SELECT COALESCE(SUM(b.size), 0) FROM submissions s JOIN blobs b ON b.hash = s.output_hash
+    """)
+    inline_output = cur.fetchone()[0]
+    cur.execute("SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(octet_length(data)), 0) FROM blobs")
+    blob_count, unique_bytes, stored_bytes = cur.fetchone()
+    cur.execute("""
+        SELECT pg_relation_size('submissions'), pg_total_relation_size('submissions'),
+               pg_total_relation_size('blobs')
+    """)
+    submissions_heap, submissions_total, blobs_total = cur.fetchone()
+
+    inline = inline_code + inline_output
+    print(f"Submissions:        {submissions:,}")
+    print(f"  code:             {code_blobs:,} distinct ({submissions / max(code_blobs, 1):.2f} submissions per blob)")
+    print(f"  output:           {output_blobs:,} distinct ({outputs / max(output_blobs, 1):.2f} submissions per blob)")
+    print(f"Blobs:              {blob_count:,}")
+    print()
+    print(f"Inline equivalent:  {mib(inline)} (code {mib(inline_code)}, output {mib(inline_output)})")
+    print(f"After dedup:        {mib(unique_bytes)}")
+    print(f"After compression:  {mib(stored_bytes)}")
+    print(f"Saved:              {mib(inline - stored_bytes)} ({(1 - stored_bytes / max(inline, 1)) * 100:.1f}%)")
+    print()
+    print(f"submissions table:  {mib(submissions_heap)} heap, {mib(submissions_total)} with indexes and TOAST")
+    print(f"blobs table:        {mib(blobs_total)} with indexes")
+
+
+def collect_garbage(conn):
+    cur = conn.cursor()
+    # Submissions referencing an existing blob insert into blobs (ON CONFLICT
+    # DO NOTHING) in the same transaction, so this waits for those to commit
+    # and holds off new ones until the sweep is done
+    cur.execute("LOCK TABLE blobs IN SHARE ROW EXCLUSIVE MODE")
+    cur.execute("""
+        DELETE FROM blobs b
+        WHERE NOT EXISTS (SELECT 1 FROM submissions s WHERE s.code_hash = b.hash)
+          AND NOT EXISTS (SELECT 1 FROM submissions s WHERE s.output_hash = b.hash)
+    """)
+    deleted = cur.rowcount
+    conn.commit()
+    return deleted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--gc", action="store_true", help="delete blobs no submission references")
+    parser.add_argument("--vacuum-full", action="store_true", help="rewrite submissions and blobs to reclaim space")
+    args = parser.parse_args()
+
+    conn = server.get_db_connection()
+    try:
+        if args.gc:
+            start = time.time()
+            print(f"Deleted {collect_garbage(conn):,} unreferenced blobs in {time.time() - start:.1f}s\n")
+        if args.vacuum_full:
+            start = time.time()
+            conn.autocommit = True
+            cur = conn.cursor()
+            for table in ("submissions", "blobs"):
+                cur.execute(f"VACUUM FULL ANALYZE {table}")
+            conn.autocommit = False
+            print(f"Rewrote submissions and blobs in {time.time() - start:.1f}s\n")
+        report(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
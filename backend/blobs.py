@@ -0,0 +1,45 @@
+"""Content-addressed, compressed storage for submission code and output.
+
+A blob is keyed by the SHA-256 of its UTF-8 text and stored zlib-compressed in
+the blobs table; submissions reference it by hash. A resubmitted solution, or
+the same verdict output, is stored once however many submissions point at it.
+Blobs are never updated; ones no submission references any more are removed
+by `python blob_report.py --gc`.
+"""
+import hashlib
+import zlib
+
+import psycopg2.extras
+
+COMPRESS_LEVEL = 6
+# Characters of judge output kept with a submission; the submit response
+# still returns all of it
+OUTPUT_LIMIT = 4096
+
+
+def pack(text):
+    """(hash, size, data) row for `text`: size is the uncompressed UTF-8 length."""
+    raw = text.encode("utf-8")
+    return hashlib.sha256(raw).digest(), len(raw), zlib.compress(raw, COMPRESS_LEVEL)
+
+
+def unpack(data):
+    return zlib.decompress(data).decode("utf-8")
+
+
+def summarize_output(output, limit=OUTPUT_LIMIT):
+    """Output as stored with a submission: at most `limit` characters, noting what was cut."""
+    if output is None or len(output) <= limit:
+        return output
+    return f"{output[:limit]}\n... [{len(output) - limit} more characters not stored]"
+
+
+def store(cur, texts):
+    """Insert the blobs of `texts` (None entries are skipped) and return their hashes, in order."""
+    rows = [pack(text) if text is not None else None for text in texts]
+    unique = {row[0]: row for row in rows if row is not None}
+    if unique:
+        psycopg2.extras.execute_values(cur,
+            "INSERT INTO blobs (hash, size, data) VALUES %s ON CONFLICT (hash) DO NOTHING",
+            list(unique.values()))
+    return [row[0] if row is not None else None for row in rows]
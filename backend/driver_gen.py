@@ -0,0 +1,304 @@
+"""Generate problem drivers (driver.py / driver.cpp) from a problem spec.
+
+A spec declares the method under test and how to judge it:
+
+    {
+        "method": "twoSum",
+        "params": [{"name": "nums", "type": "int[]"}, {"name": "target", "type": "int"}],
+        "returns": "int[]",
+        "compare": "unordered"
+    }
+
+- "compare" is "exact" (default), "unordered" (array results in any order) or
+  "float" (within "tolerance", default 1e-6).
+- In-place problems return "void" and name the argument to judge after the call
+  with "output": "s".
+
+Test data is whitespace-separated tokens: each case lists its arguments in
+order, then the expected value. Scalars are one token (bool is true/false,
+string is a token without spaces with "" for the empty string, char is one
+character). Arrays are a length followed by their elements, so int[][] is a row
+count followed by that many int[]. One case per line is conventional but not
+required:
+
+    4 2 7 11 15 9 2 0 1
+"""
+import json
+import keyword
+import re
+
+# spec type -> (C++ type, C++ parameter type, Python reader expression)
+TYPES = {
+    "int": ("int", "int", "reader.int()"),
+    "long": ("long long", "long long", "reader.int()"),
+    "double": ("double", "double", "reader.float()"),
+    "bool": ("bool", "bool", "reader.bool()"),
+    "char": ("char", "char", "reader.string()"),
+    "string": ("string", "string", "reader.string()"),
+    "int[]": ("vector<int>", "vector<int>&", "reader.ints(reader.int())"),
+    "long[]": ("vector<long long>", "vector<long long>&", "reader.ints(reader.int())"),
+    "double[]": ("vector<double>", "vector<double>&", "reader.floats(reader.int())"),
+    "char[]": ("vector<char>", "vector<char>&", "reader.strings(reader.int())"),
+    "string[]": ("vector<string>", "vector<string>&", "reader.strings(reader.int())"),
+    "int[][]": ("vector<vector<int>>", "vector<vector<int>>&",
+                "[reader.ints(reader.int()) for _ in range(reader.int())]"),
+}
+COMPARE_MODES = ("exact", "unordered", "float")
+IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# Locals of the generated drivers plus C++ keywords a parameter might plausibly be called
+RESERVED_NAMES = {
+    "reader", "out", "sol", "result", "expected", "input_str", "e", "solve", "main", "Solution",
+    "auto", "bool", "char", "class", "const", "default", "delete", "double", "float", "int",
+    "long", "new", "operator", "private", "public", "short", "signed", "string", "struct",
+    "switch", "template", "this", "union", "unsigned", "vector", "void",
+}
+
+HEADER = "Generated from the problem spec in problem.json; edit the spec, not this file."
+
+
+def load_spec(spec):
+    """Validate a spec (dict or JSON string) and return it normalized. Raises ValueError."""
+    if isinstance(spec, str):
+        try:
+            spec = json.loads(spec)
+        except ValueError as e:
+            raise ValueError(f"spec is not valid JSON: {e}")
+    if not isinstance(spec, dict):
+        raise ValueError("spec must be an object")
+
+    method = spec.get("method")
+    if not isinstance(method, str) or not IDENTIFIER_RE.match(method) or keyword.iskeyword(method):
+        raise ValueError("method must be an identifier")
+
+    params = []
+    for i, param in enumerate(spec.get("params") or []):
+        name = param.get("name") if isinstance(param, dict) else None
+        ptype = param.get("type") if isinstance(param, dict) else None
+        if not isinstance(name, str) or not IDENTIFIER_RE.match(name) or keyword.iskeyword(name):
+            raise ValueError(f"params[{i}].name must be an identifier")
+        if name in RESERVED_NAMES:
+            raise ValueError(f"params[{i}].name '{name}' is reserved")
+        if ptype not in TYPES:
+            raise ValueError(f"params[{i}].type must be one of {', '.join(TYPES)}")
+        if any(p["name"] == name for p in params):
+            raise ValueError(f"duplicate parameter '{name}'")
+        params.append({"name": name, "type": ptype})
+
+    returns = spec.get("returns", "void")
+    output = spec.get("output")
+    if output is not None:
+        if returns != "void":
+            raise ValueError("output is only allowed when returns is void")
+        if not any(p["name"] == output for p in params):
+            raise ValueError(f"output '{output}' is not a parameter")
+    elif returns not in TYPES:
+        raise ValueError(f"returns must be one of {', '.join(TYPES)} (or void with output)")
+
+    compare = spec.get("compare", "exact")
+    if compare not in COMPARE_MODES:
+        raise ValueError(f"compare must be one of {', '.join(COMPARE_MODES)}")
+    judged = judged_type({"params": params, "returns": returns, "output": output})
+    if compare == "unordered" and not judged.endswith("[]"):
+        raise ValueError("compare 'unordered' needs an array result")
+    if compare == "float" and judged not in ("double", "double[]"):
+        raise ValueError("compare 'float' needs a double or double[] result")
+
+    normalized = {"method": method, "params": params, "returns": returns, "compare": compare}
+    if output is not None:
+        normalized["output"] = output
+    if compare == "float":
+        try:
+            normalized["tolerance"] = float(spec.get("tolerance", 1e-6))
+        except (TypeError, ValueError):
+            raise ValueError("tolerance must be a number")
+    return normalized
+
+
+def judged_type(spec):
+    """Type of the value compared against the expected one."""
+    if spec.get("output"):
+        return next(p["type"] for p in spec["params"] if p["name"] == spec["output"])
+    return spec["returns"]
+
+
+# --- Starter templates ---
+
+def python_template(spec):
+    args = "".join(f", {p['name']}" for p in spec["params"])
+    body = '        """\n        Do not return anything, modify the input in-place instead.\n        """\n        ' \
+        if spec.get("output") else "        "
+    return f"class Solution:\n    def {spec['method']}(self{args}):\n{body}"
+
+
+def cpp_template(spec):
+    ret = "void" if spec["returns"] == "void" else TYPES[spec["returns"]][0]
+    args = ", ".join(f"{TYPES[p['type']][1]} {p['name']}" for p in spec["params"])
+    return f"class Solution {{\npublic:\n    {ret} {spec['method']}({args}) {{\n        \n    }}\n}};"
+
+
+# --- Drivers ---
+
+def _compare_expr(spec, lang):
+    prefix = "algoarena::" if lang == "cpp" else ""
+    if spec["compare"] == "unordered":
+        return f"{prefix}same_elements(result, expected)"
+    if spec["compare"] == "float":
+        return f"{prefix}approx_equal(result, expected, {spec['tolerance']!r})"
+    return "result == expected"
+
+
+def python_driver(spec):
+    params = spec["params"]
+    reads = "".join(f"            {p['name']} = {TYPES[p['type']][2]}\n" for p in params)
+    reads += f"            expected = {TYPES[judged_type(spec)][2]}\n"
+    input_str = ", ".join(f"{p['name']}={{show({p['name']})}}" for p in params)
+    call = f"Solution().{spec['method']}({', '.join(p['name'] for p in params)})"
+    if spec.get("output"):
+        call = f"{call}\n            result = {spec['output']}"
+    else:
+        call = f"result = {call}"
+    helpers = ["Emitter", "TokenReader", "load_solution", "show"]
+    if spec["compare"] == "unordered":
+        helpers.append("same_elements")
+    elif spec["compare"] == "float":
+        helpers.append("approx_equal")
+
+    return f'''# {HEADER}
+import sys
+
+sys.path.insert(0, "/opt/algoarena/python")
+from algoarena_io import {", ".join(sorted(helpers))}
+
+Solution = load_solution()
+
+
+def solve():
+    reader = TokenReader()
+    out = Emitter()
+
+    while reader.has_next():
+        try:
+{reads}        except EOFError:
+            break
+        except Exception as e:
+            out.error("Parse Error", str(e))
+            break
+
+        input_str = f"{input_str}"
+        try:
+            {call}
+        except Exception as e:
+            out.case(False, input_str, f"Runtime Error: {{str(e)}}", show(expected))
+            continue
+
+        out.case({_compare_expr(spec, "python")}, input_str, show(result), show(expected))
+
+
+if __name__ == "__main__":
+    solve()
+'''
+
+
+def cpp_driver(spec):
+    params = spec["params"]
+    # Declared once outside the loop so vectors keep their capacity between cases
+    decls = "".join(f"    {TYPES[p['type']][0]} {p['name']};\n" for p in params)
+    decls += f"    {TYPES[judged_type(spec)][0]} expected;\n"
+    reads = " && ".join([f"in.read({p['name']})" for p in params] + ["in.read(expected)"])
+    input_parts = [f'"{"" if i == 0 else ", "}{p["name"]}=" + algoarena::show({p["name"]})'
+                   for i, p in enumerate(params)]
+    input_str = " + ".join(input_parts) if input_parts else '""'
+    call = f"sol.{spec['method']}({', '.join(p['name'] for p in params)})"
+    if spec.get("output"):
+        call = f"{call};\n            const auto& result = {spec['output']};"
+    else:
+        call = f"{TYPES[spec['returns']][0]} result = {call};"
+
+    return f'''// {HEADER}
+#include <iostream>
+#include <vector>
+#include <string>
+#include <algorithm>
+#include <stdexcept>
+#include "algoarena_io.hpp"
+using namespace std;
+
+#include "solution.cpp"
+
+int main() {{
+    algoarena::Reader in;
+    algoarena::Emitter out;
+{decls}
+    while ({reads}) {{
+        string input_str = {input_str};
+        try {{
+            Solution sol;
+            {call}
+            out.report({_compare_expr(spec, "cpp")}, input_str, algoarena::show(result), algoarena::show(expected));
+        }} catch (const std::exception& e) {{
+            out.report(false, input_str, string("Runtime Error: ") + e.what(), algoarena::show(expected));
+        }}
+    }}
+    return 0;
+}}
+'''
+
+
+# --- Test data ---
+
+def _check_token(ptype, token):
+    if ptype in ("int", "long"):
+        int(token)
+    elif ptype == "double":
+        float(token)
+    elif ptype == "bool" and token not in ("true", "false"):
+        raise ValueError("expected true or false")
+    elif ptype == "char" and len(token) != 1:
+        raise ValueError("expected a single character")
+
+
+def _consume(ptype, tokens, pos):
+    """Check one value of `ptype` starting at tokens[pos]; returns the position after it."""
+    if pos >= len(tokens):
+        raise ValueError(f"expected {ptype}, got end of input")
+    if ptype.endswith("[]"):
+        count = tokens[pos][0]
+        if not count.isdigit():
+            raise ValueError(f"expected the length of a {ptype}, got '{count}'")
+        pos += 1
+        for _ in range(int(count)):
+            pos = _consume(ptype[:-2], tokens, pos)
+        return pos
+    try:
+        _check_token(ptype, tokens[pos][0])
+    except ValueError as e:
+        raise ValueError(f"bad {ptype} '{tokens[pos][0]}': {e}")
+    return pos + 1
+
+
+def check_test_data(spec, test_data):
+    """Validate test data against a spec. Returns the number of lines every case
+    takes if cases are line-aligned (usable as lines_per_case), else None."""
+    tokens = []
+    for line_no, line in enumerate(l for l in test_data.splitlines() if l.strip()):
+        tokens.extend((token, line_no) for token in line.split())
+
+    types = [p["type"] for p in spec["params"]] + [judged_type(spec)]
+    spans = []
+    pos = 0
+    while pos < len(tokens):
+        start = pos
+        for ptype in types:
+            try:
+                pos = _consume(ptype, tokens, pos)
+            except ValueError as e:
+                raise ValueError(f"case {len(spans) + 1}: {e}")
+        spans.append((tokens[start][1], tokens[pos - 1][1]))
+
+    if not spans:
+        return None
+    height = spans[0][1] - spans[0][0] + 1
+    for i, (first, last) in enumerate(spans):
+        if last - first + 1 != height or (i and first == spans[i - 1][1]):
+            return None
+    return height
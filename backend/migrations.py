@@ -0,0 +1,415 @@
+"""Versioned schema migrations.
+
+init_db() applies pending migrations on startup, in version order, and records
+each one in schema_migrations so it runs once per database. Append new
+migrations with the next version number; never edit one that has shipped.
+
+A migration is one of
+- "sql": statements run in one transaction together with its version row,
+- "indexes": (name, table, definition) triples built with CREATE INDEX
+  CONCURRENTLY, so a large submissions table stays writable while they build,
+- "python": a function(conn, log) for data changes SQL cannot express. It may
+  commit as it goes, so it must pick up where it left off if interrupted; if
+  it doesn't, it shares the transaction of the migration's "sql".
+
+Every process runs this at startup (web server and workers), so migrating is
+serialized with an advisory lock and late processes wait until it is done.
+"""
+import time
+
+import psycopg2.extras
+
+import blobs
+
+# pg_advisory_lock key shared by all AlgoArena processes
+LOCK_ID = 4_177_201
+BLOB_BACKFILL_BATCH = 2000
+
+
+def backfill_submission_blobs(conn, log, commit=True):
+    """Move inline submissions.code/output into blobs, a committed batch at a time.
+
+    With commit=False everything stays in the caller's transaction.
+    """
+    cur = conn.cursor()
+    last_id = 0
+    rows_done = inline_bytes = 0
+    while True:
+        # Rows already moved by an interrupted run are skipped
+        cur.execute("""
+            SELECT id, code, output FROM submissions
+            WHERE id > %s AND code_hash IS NULL ORDER BY id LIMIT %s
+        """, (last_id, BLOB_BACKFILL_BATCH))
+        rows = cur.fetchall()
+        if not rows:
+            break
+        texts = []
+        for _, code, output in rows:
+            texts += [code, blobs.summarize_output(output)]
+            inline_bytes += len(code.encode("utf-8")) + len((output or "").encode("utf-8"))
+        hashes = blobs.store(cur, texts)
+        psycopg2.extras.execute_values(cur,
+            """UPDATE submissions AS s SET code_hash = v.code_hash, output_hash = v.output_hash
+               FROM (VALUES %s) AS v (id, code_hash, output_hash) WHERE s.id = v.id""",
+            [(row[0], hashes[2 * i], hashes[2 * i + 1]) for i, row in enumerate(rows)],
+            template="(%s, %s::bytea, %s::bytea)")
+        if commit:
+            conn.commit()
+        last_id = rows[-1][0]
+        rows_done += len(rows)
+        if rows_done % (BLOB_BACKFILL_BATCH * 50) == 0:
+            log(f"  {rows_done:,} submissions moved to blobs")
+
+    cur.execute("SELECT COUNT(*), COALESCE(SUM(octet_length(data)), 0) FROM blobs")
+    count, stored_bytes = cur.fetchone()
+    if commit:
+        conn.commit()
+    log(f"  {rows_done:,} submissions, {inline_bytes / 2**20:.1f} MiB inline -> "
+        f"{count:,} blobs, {stored_bytes / 2**20:.1f} MiB compressed")
+
+
+def finish_submission_blobs(conn, log):
+    """Backfill rows stored inline since migration 7, in the transaction that drops the columns."""
+    cur = conn.cursor()
+    # Holds off inserts from processes still on the old code until the
+    # columns are gone (they fail from then on; see deploy.md)
+    cur.execute("LOCK TABLE submissions IN SHARE ROW EXCLUSIVE MODE")
+    backfill_submission_blobs(conn, log, commit=False)
+
+
+MIGRATIONS = [
+    {
+        "version": 1,
+        "name": "baseline schema",
+        # Idempotent, so databases created before schema_migrations existed
+        # simply record it as applied
+        "sql": [
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id SERIAL PRIMARY KEY,
+                username VARCHAR(50) UNIQUE NOT NULL,
+                password_hash TEXT NOT NULL,
+                is_admin BOOLEAN DEFAULT FALSE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS is_admin BOOLEAN DEFAULT FALSE",
+            """
+            CREATE TABLE IF NOT EXISTS problems (
+                id SERIAL PRIMARY KEY,
+                slug VARCHAR(50) UNIQUE NOT NULL,
+                title VARCHAR(100) NOT NULL,
+                description TEXT NOT NULL,
+                difficulty VARCHAR(10) DEFAULT 'Easy',
+                templates JSONB DEFAULT '{}'
+            )
+            """,
+            "ALTER TABLE problems ADD COLUMN IF NOT EXISTS templates JSONB DEFAULT '{}'",
+            """
+            CREATE TABLE IF NOT EXISTS submissions (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER REFERENCES users(id),
+                language VARCHAR(10) NOT NULL,
+                code TEXT NOT NULL,
+                problem_id VARCHAR(50),
+                status VARCHAR(20),
+                output TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            # Resource usage of the judged run
+            "ALTER TABLE submissions ADD COLUMN IF NOT EXISTS cpu_time_ms INTEGER",
+            "ALTER TABLE submissions ADD COLUMN IF NOT EXISTS peak_memory_kb INTEGER",
+            """
+            CREATE TABLE IF NOT EXISTS chat_sessions (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER REFERENCES users(id),
+                problem_id VARCHAR(50),
+                history JSONB DEFAULT '[]',
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(user_id, problem_id)
+            )
+            """,
+        ],
+    },
+    {
+        "version": 2,
+        "name": "submission hot-path indexes",
+        "indexes": [
+            # Per-user counts, the activity calendar and the newest-first
+            # submissions list; also backs the users(id) foreign key on deletes
+            ("submissions_user_created_idx", "submissions", "(user_id, created_at)"),
+            # Solved problems and pass counts per user, and the leaderboard's
+            # solved column
+            ("submissions_user_pass_idx", "submissions", "(user_id, problem_id) WHERE status = 'Pass'"),
+            # Acceptance on the problem list and admin top problems, rejudge
+            # scoping and problem deletes
+            ("submissions_problem_status_idx", "submissions", "(problem_id, status)"),
+            # Runtime/memory distribution of accepted submissions, answered
+            # from the index alone
+            ("submissions_pass_usage_idx", "submissions",
+             "(problem_id, language) INCLUDE (cpu_time_ms, peak_memory_kb) WHERE status = 'Pass'"),
+            # "Today" counters on the admin dashboard
+            ("submissions_created_idx", "submissions", "(created_at)"),
+        ],
+    },
+    {
+        "version": 3,
+        "name": "statistics counter tables",
+        # Maintained by judge_submission() as submissions are recorded; see
+        # repair_stats() in server.py for the scoped rebuild
+        "sql": [
+            """
+            CREATE TABLE user_problem_stats (
+                user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                problem_id VARCHAR(50) NOT NULL,
+                submissions INTEGER NOT NULL DEFAULT 0,
+                passes INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, problem_id)
+            )
+            """,
+            """
+            CREATE TABLE user_stats (
+                user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+                submissions INTEGER NOT NULL DEFAULT 0,
+                passes INTEGER NOT NULL DEFAULT 0,
+                attempted INTEGER NOT NULL DEFAULT 0,
+                solved INTEGER NOT NULL DEFAULT 0,
+                solved_by_difficulty JSONB NOT NULL DEFAULT '{}'
+            )
+            """,
+            """
+            CREATE TABLE problem_stats (
+                problem_id VARCHAR(50) PRIMARY KEY,
+                submissions INTEGER NOT NULL DEFAULT 0,
+                passes INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+            """
+            CREATE TABLE user_activity (
+                user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                day DATE NOT NULL,
+                submissions INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, day)
+            )
+            """,
+            # Backfill from the existing submissions
+            """
+            INSERT INTO user_problem_stats (user_id, problem_id, submissions, passes)
+            SELECT user_id, problem_id, COUNT(*), COUNT(*) FILTER (WHERE status = 'Pass')
+            FROM submissions WHERE user_id IS NOT NULL AND problem_id IS NOT NULL
+            GROUP BY user_id, problem_id
+            """,
+            """
+            INSERT INTO user_stats (user_id, submissions, passes, attempted, solved, solved_by_difficulty)
+            SELECT ups.user_id, SUM(ups.submissions), SUM(ups.passes), COUNT(*),
+                   COUNT(*) FILTER (WHERE ups.passes > 0),
+                   COALESCE((SELECT jsonb_object_agg(d.difficulty, d.solved) FROM (
+                       SELECT p.difficulty, COUNT(*) AS solved FROM user_problem_stats x
+                       JOIN problems p ON p.slug = x.problem_id
+                       WHERE x.user_id = ups.user_id AND x.passes > 0 AND p.difficulty IS NOT NULL
+                       GROUP BY p.difficulty) d), '{}')
+            FROM user_problem_stats ups
+            GROUP BY ups.user_id
+            """,
+            """
+            INSERT INTO problem_stats (problem_id, submissions, passes)
+            SELECT problem_id, COUNT(*), COUNT(*) FILTER (WHERE status = 'Pass')
+            FROM submissions WHERE problem_id IS NOT NULL
+            GROUP BY problem_id
+            """,
+            """
+            INSERT INTO user_activity (user_id, day, submissions)
+            SELECT user_id, DATE(created_at), COUNT(*)
+            FROM submissions WHERE user_id IS NOT NULL AND created_at IS NOT NULL
+            GROUP BY user_id, DATE(created_at)
+            """,
+        ],
+    },
+    {
+        "version": 4,
+        "name": "dashboard rollups",
+        # Refreshed by refresh_rollups() in server.py; the backfill below is the
+        # same aggregation over the whole history
+        "sql": [
+            """
+            CREATE TABLE hourly_rollups (
+                hour TIMESTAMP NOT NULL,
+                language VARCHAR(10) NOT NULL,
+                submissions INTEGER NOT NULL DEFAULT 0,
+                passes INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (hour, language)
+            )
+            """,
+            """
+            CREATE TABLE daily_rollups (
+                day DATE PRIMARY KEY,
+                submissions INTEGER NOT NULL DEFAULT 0,
+                passes INTEGER NOT NULL DEFAULT 0,
+                active_users INTEGER NOT NULL DEFAULT 0,
+                new_users INTEGER NOT NULL DEFAULT 0,
+                languages JSONB NOT NULL DEFAULT '{}'
+            )
+            """,
+            """
+            INSERT INTO hourly_rollups (hour, language, submissions, passes)
+            SELECT date_trunc('hour', created_at), language, COUNT(*), COUNT(*) FILTER (WHERE status = 'Pass')
+            FROM submissions WHERE created_at IS NOT NULL
+            GROUP BY 1, 2
+            """,
+            """
+            INSERT INTO daily_rollups (day, submissions, passes, active_users, new_users, languages)
+            SELECT d.day, COALESCE(h.submissions, 0), COALESCE(h.passes, 0),
+                   (SELECT COUNT(*) FROM user_activity a WHERE a.day = d.day),
+                   (SELECT COUNT(*) FROM users u WHERE u.created_at >= d.day AND u.created_at < d.day + 1),
+                   COALESCE(h.languages, '{}')
+            FROM (
+                SELECT generate_series(
+                    LEAST((SELECT MIN(created_at) FROM users), (SELECT MIN(created_at) FROM submissions))::date,
+                    CURRENT_DATE, INTERVAL '1 day')::date AS day
+            ) d
+            LEFT JOIN (
+                SELECT day, SUM(n) AS submissions, SUM(p) AS passes, jsonb_object_agg(language, n) AS languages
+                FROM (SELECT hour::date AS day, language, SUM(submissions) AS n, SUM(passes) AS p
+                      FROM hourly_rollups GROUP BY 1, 2) l
+                GROUP BY day
+            ) h ON h.day = d.day
+            """,
+            # The admin user list sorts by last activity and lists users who
+            # never submitted, so every user gets a counter row
+            "ALTER TABLE user_stats ADD COLUMN last_active DATE",
+            """
+            UPDATE user_stats s SET last_active = a.last_day
+            FROM (SELECT user_id, MAX(day) AS last_day FROM user_activity GROUP BY user_id) a
+            WHERE a.user_id = s.user_id
+            """,
+            "INSERT INTO user_stats (user_id) SELECT id FROM users ON CONFLICT (user_id) DO NOTHING",
+        ],
+    },
+    {
+        "version": 5,
+        "name": "dashboard and user list indexes",
+        "indexes": [
+            # Active and new users per day for the daily rollup
+            ("user_activity_day_idx", "user_activity", "(day)"),
+            ("users_created_idx", "users", "(created_at, id)"),
+            # Keyset pages of the admin user list, one per sort order
+            ("user_stats_submissions_idx", "user_stats", "(submissions, user_id)"),
+            ("user_stats_solved_idx", "user_stats", "(solved, user_id)"),
+            ("user_stats_last_active_idx", "user_stats", "((COALESCE(last_active, '-infinity'::date)), user_id)"),
+        ],
+    },
+    {
+        "version": 6,
+        "name": "submission blobs table",
+        "sql": [
+            """
+            CREATE TABLE blobs (
+                hash BYTEA PRIMARY KEY,
+                size INTEGER NOT NULL,
+                data BYTEA NOT NULL
+            )
+            """,
+            # Already zlib-compressed; don't let TOAST try again
+            "ALTER TABLE blobs ALTER COLUMN data SET STORAGE EXTERNAL",
+            "ALTER TABLE submissions ADD COLUMN code_hash BYTEA, ADD COLUMN output_hash BYTEA",
+        ],
+    },
+    {
+        "version": 7,
+        "name": "move submission code and output to blobs",
+        "python": backfill_submission_blobs,
+    },
+    {
+        "version": 8,
+        "name": "drop inline submission code and output",
+        # Frees no space by itself: old heap pages keep the values until the
+        # table is rewritten (`python blob_report.py --vacuum-full`)
+        "python": finish_submission_blobs,
+        "sql": [
+            "ALTER TABLE submissions ALTER COLUMN code_hash SET NOT NULL",
+            "ALTER TABLE submissions DROP COLUMN code, DROP COLUMN output",
+        ],
+    },
+]
+
+
+def _lock(conn):
+    # Poll instead of blocking in pg_advisory_lock: a session waiting inside a
+    # transaction would hold a snapshot, and CREATE INDEX CONCURRENTLY in the
+    # session holding the lock would wait for it in turn.
+    cur = conn.cursor()
+    while True:
+        cur.execute("SELECT pg_try_advisory_lock(%s)", (LOCK_ID,))
+        locked = cur.fetchone()[0]
+        conn.commit()
+        if locked:
+            return
+        time.sleep(0.5)
+
+
+def build_indexes(conn, indexes):
+    """Create `indexes` concurrently, replacing any left invalid by an interrupted build."""
+    conn.commit()
+    autocommit = conn.autocommit
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    conn.autocommit = True
+    try:
+        cur = conn.cursor()
+        for name, table, definition in indexes:
+            cur.execute("""
+                SELECT i.indisvalid FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE c.relname = %s AND pg_table_is_visible(c.oid)
+            """, (name,))
+            row = cur.fetchone()
+            if row and not row[0]:
+                cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            cur.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}")
+        for table in sorted({table for _, table, _ in indexes}):
+            cur.execute(f"ANALYZE {table}")
+    finally:
+        conn.autocommit = autocommit
+
+
+def migrate(conn, log=print):
+    """Apply pending migrations on `conn`. Returns the versions applied."""
+    _lock(conn)
+    cur = conn.cursor()
+    applied = []
+    try:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cur.execute("SELECT version FROM schema_migrations")
+        done = {row[0] for row in cur.fetchall()}
+        conn.commit()
+
+        for migration in MIGRATIONS:
+            if migration["version"] in done:
+                continue
+            log(f"Applying migration {migration['version']}: {migration['name']}")
+            start = time.time()
+            if "indexes" in migration:
+                build_indexes(conn, migration["indexes"])
+            if "python" in migration:
+                migration["python"](conn, log)
+            for statement in migration.get("sql", []):
+                cur.execute(statement)
+            cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                        (migration["version"], migration["name"]))
+            conn.commit()
+            applied.append(migration["version"])
+            log(f"Migration {migration['version']} applied in {time.time() - start:.1f}s")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.execute("SELECT pg_advisory_unlock(%s)", (LOCK_ID,))
+        conn.commit()
+    return applied
+
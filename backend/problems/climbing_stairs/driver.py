@@ -1,44 +1,36 @@
 import sys
-sys.path.append("/home/sandbox")
 
-try:
-    from solution import Solution
-except ImportError:
-    print("CASE|0|FAIL|Import Error|Could not import Solution class|N/A")
-    sys.exit(0)
+sys.path.insert(0, "/opt/algoarena/python")
+from algoarena_io import Emitter, TokenReader, load_solution
 
-def solve():
-    input_data = sys.stdin.read().split()
-    if not input_data:
-        return
-
-    iterator = iter(input_data)
-    case_id = 1
-
-    while True:
-        try:
-            n = int(next(iterator))
-            expected = int(next(iterator))
-
-            sol = Solution()
-            try:
-                result = sol.climbStairs(n)
-            except Exception as e:
-                print(f"CASE|{case_id}|FAIL|n={n}|Runtime Error: {str(e)}|{expected}")
-                case_id += 1
-                continue
+Solution = load_solution()
 
-            pass_status = (result == expected)
-            status = "PASS" if pass_status else "FAIL"
 
-            print(f"CASE|{case_id}|{status}|n={n}|{result}|{expected}")
-            case_id += 1
+def solve():
+    reader = TokenReader()
+    out = Emitter()
 
-        except StopIteration:
+    while reader.has_next():
+        try:
+            # Input format: N EXPECTED
+            n = reader.int()
+            expected_str = reader.token()
+            expected = int(expected_str)
+        except EOFError:
             break
         except Exception as e:
-            print(f"CASE|{case_id}|FAIL|Parse Error|{str(e)}|N/A")
+            out.error("Parse Error", str(e))
             break
 
+        sol = Solution()
+        try:
+            result = sol.climbStairs(n)
+        except Exception as e:
+            out.case(False, f"n={n}", f"Runtime Error: {str(e)}", expected_str)
+            continue
+
+        out.case(result == expected, f"n={n}", result, expected)
+
+
 if __name__ == "__main__":
     solve()
@@ -1,23 +1,23 @@
 #include <iostream>
+#include <vector>
 #include <string>
+#include <algorithm>
+#include "algoarena_io.hpp"
 using namespace std;
 
 #include "solution.cpp"
 
 int main() {
+    algoarena::Reader in;
+    algoarena::Emitter out;
     int n, expected;
-    int caseId = 1;
 
     // Input format: N EXPECTED
-    while (cin >> n >> expected) {
+    while (in.next_int(n) && in.next_int(expected)) {
         Solution sol;
         int result = sol.fib(n);
 
-        bool pass = (result == expected);
-
-        // Output format: CASE|ID|STATUS|INPUT|OUTPUT|EXPECTED
-        cout << "CASE|" << caseId++ << "|" << (pass ? "PASS" : "FAIL") << "|"
-             << "n=" << n << "|" << result << "|" << expected << endl;
+        out.report(result == expected, "n=" + to_string(n), result, expected);
     }
     return 0;
 }
@@ -1,20 +1,28 @@
-import sys
 import json
-sys.path.append("/home/sandbox")
-from solution import Solution
+import sys
+
+sys.path.insert(0, "/opt/algoarena/python")
+from algoarena_io import Emitter, lines, load_solution
+
+Solution = load_solution()
+
+
+def solve():
+    out = Emitter()
+    sol = Solution()
+
+    for line in lines():
+        # Input format: {"input": {"nums": [...], "target": T}, "expected": E}
+        try:
+            data = json.loads(line)
+            inp = data["input"]
+            expected = data["expected"]
+            result = sol.findFirstOccurrence(inp["nums"], inp["target"])
+        except Exception as e:
+            out.error("ERROR", str(e))
+            continue
+        out.case(result == expected, inp, result, expected)
+
 
-sol = Solution()
-case_id = 0
-for line in sys.stdin:
-    line = line.strip()
-    if not line: continue
-    case_id += 1
-    try:
-        data = json.loads(line)
-        inp = data["input"]
-        expected = data["expected"]
-        result = sol.findFirstOccurrence(inp["nums"], inp["target"])
-        status = "PASS" if result == expected else "FAIL"
-        print(f"CASE|{case_id}|{status}|{inp}|{result}|{expected}")
-    except Exception as e:
-        print(f"CASE|{case_id}|FAIL|ERROR|{e}|N/A")
\ No newline at end of file
+if __name__ == "__main__":
+    solve()
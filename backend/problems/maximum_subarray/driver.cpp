@@ -1,27 +1,24 @@
 #include <iostream>
 #include <vector>
+#include <string>
+#include <algorithm>
+#include "algoarena_io.hpp"
 using namespace std;
 
 #include "solution.cpp"
 
 int main() {
-    int n;
-    int caseId = 1;
-
-    while (cin >> n) {
-        vector<int> nums(n);
-        for (int i = 0; i < n; i++) cin >> nums[i];
-
-        int expected;
-        cin >> expected;
+    algoarena::Reader in;
+    algoarena::Emitter out;
+    int n, expected;
+    vector<int> nums;
 
+    // Input format: N, N numbers, EXPECTED
+    while (in.next_int(n) && in.next_ints(nums, n) && in.next_int(expected)) {
         Solution sol;
         int result = sol.maxSubArray(nums);
 
-        bool pass = (result == expected);
-
-        cout << "CASE|" << caseId++ << "|" << (pass ? "PASS" : "FAIL") << "|"
-             << "n=" << n << "|" << result << "|" << expected << endl;
+        out.report(result == expected, "n=" + to_string(n), result, expected);
     }
     return 0;
 }
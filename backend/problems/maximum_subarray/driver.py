@@ -1,49 +1,38 @@
 import sys
-sys.path.append("/home/sandbox")
 
-try:
-    from solution import Solution
-except ImportError:
-    print("CASE|0|FAIL|Import Error|Could not import Solution class|N/A")
-    sys.exit(0)
+sys.path.insert(0, "/opt/algoarena/python")
+from algoarena_io import Emitter, TokenReader, load_solution
 
-def solve():
-    input_data = sys.stdin.read().split()
-    if not input_data:
-        return
+Solution = load_solution()
 
-    iterator = iter(input_data)
-    case_id = 1
 
-    while True:
-        try:
-            n = int(next(iterator))
-            nums = []
-            for _ in range(n):
-                nums.append(int(next(iterator)))
-            expected = int(next(iterator))
+def solve():
+    reader = TokenReader()
+    out = Emitter()
 
-            input_str = f"nums={nums}"
+    while reader.has_next():
+        try:
+            # Input format: N, N numbers, EXPECTED
+            n = reader.int()
+            nums = reader.ints(n)
+            expected = reader.int()
+        except EOFError:
+            break
+        except Exception as e:
+            out.error("Parse Error", str(e))
+            break
 
-            sol = Solution()
-            try:
-                result = sol.maxSubArray(nums)
-            except Exception as e:
-                print(f"CASE|{case_id}|FAIL|{input_str}|Runtime Error: {str(e)}|{expected}")
-                case_id += 1
-                continue
+        input_str = f"nums={nums}"
 
-            pass_status = (result == expected)
-            status = "PASS" if pass_status else "FAIL"
+        sol = Solution()
+        try:
+            result = sol.maxSubArray(nums)
+        except Exception as e:
+            out.case(False, input_str, f"Runtime Error: {str(e)}", expected)
+            continue
 
-            print(f"CASE|{case_id}|{status}|{input_str}|{result}|{expected}")
-            case_id += 1
+        out.case(result == expected, input_str, result, expected)
 
-        except StopIteration:
-            break
-        except Exception as e:
-            print(f"CASE|{case_id}|FAIL|Parse Error|{str(e)}|N/A")
-            break
 
 if __name__ == "__main__":
     solve()
@@ -1,27 +1,26 @@
 #include <iostream>
+#include <vector>
 #include <string>
+#include <algorithm>
+#include "algoarena_io.hpp"
 using namespace std;
 
 #include "solution.cpp"
 
 int main() {
+    algoarena::Reader in;
+    algoarena::Emitter out;
     int x;
     string expectedStr;
-    int caseId = 1;
 
     // Input format: X EXPECTED_BOOL
-    while (cin >> x >> expectedStr) {
+    while (in.next_int(x) && in.next_token(expectedStr)) {
         bool expected = (expectedStr == "true");
 
         Solution sol;
         bool result = sol.isPalindrome(x);
 
-        bool pass = (result == expected);
-        string actualStr = result ? "true" : "false";
-
-        // Output format: CASE|ID|STATUS|INPUT|OUTPUT|EXPECTED
-        cout << "CASE|" << caseId++ << "|" << (pass ? "PASS" : "FAIL") << "|"
-             << "x=" << x << "|" << actualStr << "|" << expectedStr << endl;
+        out.report(result == expected, "x=" + to_string(x), algoarena::bool_str(result), expectedStr);
     }
     return 0;
 }
@@ -1,73 +1,45 @@
 import sys
-import os
 
-# Add sandbox to path to import user solution
-sys.path.append("/home/sandbox")
-print("DEBUG: Driver Started", flush=True)
+sys.path.insert(0, "/opt/algoarena/python")
+from algoarena_io import Emitter, TokenReader, load_solution
 
-try:
-    from solution import Solution
-except ImportError:
-    # Fallback or error handling if solution.py is bad
-    print("CASE|0|FAIL|Import Error|Could not import Solution class|N/A")
-    sys.exit(0)
+Solution = load_solution()
 
-def solve():
-    # Read all input from stdin (which is redirected from test_data.txt)
-    input_data = sys.stdin.read().split()
-    if not input_data:
-        return
 
-    iterator = iter(input_data)
-    case_id = 1
+def solve():
+    reader = TokenReader()
+    out = Emitter()
 
-    while True:
+    while reader.has_next():
         try:
-            # Parse N
-            n = int(next(iterator))
-            # Parse Target
-            target = int(next(iterator))
-            # Parse Expected Indices
-            exp1 = int(next(iterator))
-            exp2 = int(next(iterator))
-            
-            # Parse Array
-            nums = []
-            for _ in range(n):
-                nums.append(int(next(iterator)))
-            
-            # Format Input String for Log
-            input_str = f"nums={nums}, target={target}"
-            
-            # Run User Solution
-            sol = Solution()
-            try:
-                result = sol.twoSum(nums, target)
-            except Exception as e:
-                print(f"CASE|{case_id}|FAIL|{input_str}|Runtime Error: {str(e)}|{exp1} {exp2}")
-                case_id += 1
-                continue
+            # Input format: N TARGET EXP1 EXP2, then N numbers
+            n = reader.int()
+            target = reader.int()
+            exp1 = reader.int()
+            exp2 = reader.int()
+            nums = reader.ints(n)
+        except EOFError:
+            break
+        except Exception as e:
+            out.error("Parse Error", str(e))
+            break
 
-            # Format Actual Output
-            if result and len(result) == 2:
-                result.sort()
-                actual_str = f"{result[0]} {result[1]}"
-                pass_status = (result[0] == exp1 and result[1] == exp2)
-            else:
-                actual_str = str(result)
-                pass_status = False
+        input_str = f"nums={nums}, target={target}"
+        expected_str = f"{exp1} {exp2}"
 
-            expected_str = f"{exp1} {exp2}"
-            status = "PASS" if pass_status else "FAIL"
+        sol = Solution()
+        try:
+            result = sol.twoSum(nums, target)
+        except Exception as e:
+            out.case(False, input_str, f"Runtime Error: {str(e)}", expected_str)
+            continue
 
-            print(f"CASE|{case_id}|{status}|{input_str}|{actual_str}|{expected_str}")
-            case_id += 1
+        if result and len(result) == 2:
+            result.sort()
+            out.case(result[0] == exp1 and result[1] == exp2, input_str, f"{result[0]} {result[1]}", expected_str)
+        else:
+            out.case(False, input_str, str(result), expected_str)
 
-        except StopIteration:
-            break
-        except Exception as e:
-            print(f"CASE|{case_id}|FAIL|Parse Error|{str(e)}|N/A")
-            break
 
 if __name__ == "__main__":
     solve()
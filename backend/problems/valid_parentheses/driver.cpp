@@ -1,15 +1,19 @@
 #include <iostream>
+#include <vector>
 #include <string>
+#include <algorithm>
+#include "algoarena_io.hpp"
 using namespace std;
 
 #include "solution.cpp"
 
 int main() {
+    algoarena::Reader in;
+    algoarena::Emitter out;
     string s, expectedStr;
-    int caseId = 1;
 
     // Input format: INPUT_STRING EXPECTED_BOOL
-    while (cin >> s >> expectedStr) {
+    while (in.next_token(s) && in.next_token(expectedStr)) {
         // Handle empty string case
         if (s == "EMPTY") s = "";
 
@@ -18,12 +22,7 @@ int main() {
         Solution sol;
         bool result = sol.isValid(s);
 
-        bool pass = (result == expected);
-        string actualStr = result ? "true" : "false";
-
-        // Output format: CASE|ID|STATUS|INPUT|OUTPUT|EXPECTED
-        cout << "CASE|" << caseId++ << "|" << (pass ? "PASS" : "FAIL") << "|"
-             << "s='" << s << "'|" << actualStr << "|" << expectedStr << endl;
+        out.report(result == expected, "s='" + s + "'", algoarena::bool_str(result), expectedStr);
     }
     return 0;
 }
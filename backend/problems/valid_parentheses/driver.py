@@ -1,54 +1,38 @@
 import sys
-import os
-import json
 
-sys.path.append("/home/sandbox")
+sys.path.insert(0, "/opt/algoarena/python")
+from algoarena_io import Emitter, lines, load_solution
+
+Solution = load_solution()
 
-try:
-    from solution import Solution
-except ImportError:
-    print("CASE|0|FAIL|Import Error|Could not import Solution class|N/A")
-    sys.exit(0)
 
 def solve():
-    input_data = sys.stdin.read().splitlines()
-    if not input_data:
-        return
+    out = Emitter()
 
-    case_id = 1
-    for line in input_data:
-        if not line.strip():
-            continue
-            
+    for line in lines():
         try:
-            # Format: input_string expected_bool
+            # Input format: INPUT_STRING EXPECTED_BOOL
             parts = line.strip().split()
             s = parts[0]
             expected_str = parts[1]
             expected = expected_str.lower() == "true"
-            
-            # Input normalization for empty string case if needed
-            if s == "EMPTY":
-                s = ""
-
-            sol = Solution()
-            try:
-                result = sol.isValid(s)
-            except Exception as e:
-                print(f"CASE|{case_id}|FAIL|s='{s}'|Runtime Error: {str(e)}|{expected_str}")
-                case_id += 1
-                continue
-
-            pass_status = (result == expected)
-            status = "PASS" if pass_status else "FAIL"
-            actual_str = str(result).lower()
-
-            print(f"CASE|{case_id}|{status}|s='{s}'|{actual_str}|{expected_str}")
-            case_id += 1
+        except Exception as e:
+            out.error("Parse Error", str(e))
+            continue
+
+        # Input normalization for empty string case
+        if s == "EMPTY":
+            s = ""
 
+        sol = Solution()
+        try:
+            result = sol.isValid(s)
         except Exception as e:
-            print(f"CASE|{case_id}|FAIL|Parse Error|{str(e)}|N/A")
-            case_id += 1
+            out.case(False, f"s='{s}'", f"Runtime Error: {str(e)}", expected_str)
+            continue
+
+        out.case(result == expected, f"s='{s}'", str(result).lower(), expected_str)
+
 
 if __name__ == "__main__":
     solve()
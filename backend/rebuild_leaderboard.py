@@ -0,0 +1,26 @@
+"""Rebuild the Redis leaderboards from Postgres.
+
+Leaderboards are updated as submissions are recorded and rebuilt after a
+rejudge or a deleted problem; run this after restoring Redis or Postgres:
+
+    python rebuild_leaderboard.py                  # all time, this week, this month
+    python rebuild_leaderboard.py --window week
+"""
+import argparse
+import time
+
+import server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the Redis leaderboards from Postgres.")
+    parser.add_argument("--window", choices=server.LEADERBOARD_WINDOWS, action="append",
+                        help="window to rebuild (repeatable, default: all of them)")
+    args = parser.parse_args()
+
+    for window in args.window or server.LEADERBOARD_WINDOWS:
+        start = time.time()
+        ranked = server.rebuild_leaderboard(window)
+        if ranked is None:
+            print(f"{server.leaderboard_key(window)}: another rebuild still holds the lock, skipped")
+            continue
+        print(f"{server.leaderboard_key(window)}: {ranked} users ranked in {time.time() - start:.1f}s")
@@ -0,0 +1,41 @@
+"""Rebuild the statistics counter tables (user_stats, problem_stats, ...) and the
+dashboard rollups from submissions.
+
+The counters are kept up to date as submissions are recorded, so this is only
+needed after editing submissions by hand or restoring a backup:
+
+    python repair_stats.py                        # everything
+    python repair_stats.py --user 42 --user 7     # only these users
+    python repair_stats.py --problem two_sum      # only this problem's totals
+"""
+import argparse
+import datetime as dt
+import time
+
+import server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild statistics counter tables from submissions.")
+    parser.add_argument("--user", type=int, action="append", help="user id to repair (repeatable)")
+    parser.add_argument("--problem", action="append", help="problem slug to repair (repeatable)")
+    args = parser.parse_args()
+
+    start = time.time()
+    conn = server.get_db_connection()
+    try:
+        cur = conn.cursor()
+        server.repair_stats(cur, user_ids=args.user, problem_ids=args.problem)
+        conn.commit()
+    finally:
+        conn.close()
+
+    if not args.user and not args.problem:
+        server.refresh_rollups(dt.datetime.min)
+
+    # Cached responses were computed from the old counts
+    server.cache_delete_pattern("profile:*")
+    server.cache_delete_pattern("problems:*")
+    server.redis_client.delete("admin:stats")
+    # The all-time leaderboard is derived from user_stats
+    server.rebuild_leaderboards()
+    print(f"Statistics repaired in {time.time() - start:.1f}s")
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, g
+from flask import Flask, Response, request, jsonify, g
 from flask_cors import CORS
 import docker
 import tarfile
@@ -7,6 +7,7 @@ import os
 import re
 import threading
 import psycopg2
+import psycopg2.extras
 import time
 import json
 import shutil
@@ -21,6 +22,22 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import uuid
 import select
+import signal
+import subprocess
+import tempfile
+import atexit
+import hashlib
+import codecs
+import heapq
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from rq import Queue
+from rq.job import Job
+from rq.exceptions import NoSuchJobError
+
+import blobs
+import driver_gen
+import migrations
 
 # Load environment variables
 load_dotenv()
@@ -40,10 +57,6 @@ CORS(app, origins=[
 
 client = docker.from_env()
 
-# --- Execution Concurrency Limiter ---
-# Only allow 3 Docker containers at once to prevent OOM on t2.micro (1GB RAM)
-EXEC_SEMAPHORE = threading.Semaphore(3)
-
 # --- JWT Config ---
 JWT_SECRET = os.getenv("JWT_SECRET")
 if not JWT_SECRET:
@@ -66,6 +79,209 @@ try:
 except redis.ConnectionError:
     print("WARNING: Redis connection failed. Caching/rate-limiting will be unavailable.")
 
+# --- Execution Admission Control ---
+# Every sandbox run takes a slot from one Redis-backed pool shared by all
+# server and worker processes. Waiters queue per priority class (submit > run >
+# playground > rejudge) and, within a class, by start-time fair queuing on user
+# id: each user's next ticket sorts one round after their previous one, so a
+# user hammering Run only delays their own runs. Capacity follows the host's free
+# memory and CPU. If Redis is down, each process falls back to a local limit.
+ADMIT_PRIORITIES = ("submit", "run", "playground", "rejudge")
+ADMIT_MIN = int(os.getenv("JUDGE_ADMIT_MIN", "1"))
+ADMIT_MAX = int(os.getenv("JUDGE_ADMIT_MAX", "8"))
+ADMIT_RUN_MEM_MB = int(os.getenv("JUDGE_ADMIT_RUN_MEM_MB", "96"))     # budget per sandbox (64m limit + overhead)
+ADMIT_MEM_RESERVE_MB = int(os.getenv("JUDGE_ADMIT_MEM_RESERVE_MB", "256"))  # left for Postgres, Redis, the app
+ADMIT_RUNS_PER_CPU = float(os.getenv("JUDGE_ADMIT_RUNS_PER_CPU", "2"))
+ADMIT_HOLD_TTL = 30    # seconds a slot survives without a heartbeat from its holder
+ADMIT_WAIT_TTL = 5     # seconds a waiter survives without polling
+
+# KEYS: wait zset of the class, class vtime, per-user vtimes, waiting heartbeats
+# ARGV: ticket, user, now, wait ttl
+ADMIT_ENQUEUE_LUA = """
+local vg = tonumber(redis.call('GET', KEYS[2]) or '0')
+local vu = tonumber(redis.call('HGET', KEYS[3], ARGV[2]) or '0')
+local s = math.max(vg, vu) + 1
+redis.call('HSET', KEYS[3], ARGV[2], s)
+redis.call('EXPIRE', KEYS[3], 86400)
+redis.call('ZADD', KEYS[1], s, ARGV[1])
+redis.call('ZADD', KEYS[4], tonumber(ARGV[3]) + tonumber(ARGV[4]), ARGV[1])
+return s
+"""
+
+# KEYS: holders, waiting heartbeats, wait zsets by priority, class vtimes by priority
+# ARGV: ticket, now, hold ttl, wait ttl, capacity, index of the ticket's class
+# Returns 1 admitted, 0 keep waiting, -1 ticket expired (re-enqueue)
+ADMIT_TRY_LUA = """
+local n = (#KEYS - 2) / 2
+local ticket, now = ARGV[1], tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+for _, t in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)) do
+  for i = 3, 2 + n do redis.call('ZREM', KEYS[i], t) end
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if not redis.call('ZSCORE', KEYS[2 + tonumber(ARGV[6])], ticket) then return -1 end
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[4]), ticket)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[5]) then return 0 end
+for i = 3, 2 + n do
+  local head = redis.call('ZRANGE', KEYS[i], 0, 0, 'WITHSCORES')
+  if head[1] then
+    if head[1] ~= ticket then return 0 end
+    redis.call('ZREM', KEYS[i], ticket)
+    redis.call('ZREM', KEYS[2], ticket)
+    redis.call('SET', KEYS[i + n], head[2])
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ticket)
+    return 1
+  end
+end
+return 0
+"""
+
+# Take a slot only if one is free and nobody is waiting (extra shards).
+# KEYS: holders, wait zsets; ARGV: ticket, now, hold ttl, capacity
+ADMIT_IDLE_LUA = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', tonumber(ARGV[2]))
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[4]) then return 0 end
+for i = 2, #KEYS do
+  if redis.call('ZCARD', KEYS[i]) > 0 then return 0 end
+end
+redis.call('ZADD', KEYS[1], tonumber(ARGV[2]) + tonumber(ARGV[3]), ARGV[1])
+return 1
+"""
+
+class AdmissionController:
+    """Global, fair, priority-aware limit on concurrent sandbox runs."""
+
+    def __init__(self, r):
+        self.r = r
+        self.holders_key = "admit:holders"
+        self.waiting_key = "admit:waiting"
+        self.wait_keys = [f"admit:wait:{p}" for p in ADMIT_PRIORITIES]
+        self.vtime_keys = [f"admit:vt:{p}" for p in ADMIT_PRIORITIES]
+        self._enqueue = r.register_script(ADMIT_ENQUEUE_LUA)
+        self._try = r.register_script(ADMIT_TRY_LUA)
+        self._idle = r.register_script(ADMIT_IDLE_LUA)
+        self.local = threading.Semaphore(3)  # used only while Redis is unreachable
+        self.held = set()
+        self.lock = threading.Lock()
+        self.capacity_cache = (0, 0.0)
+        self.heartbeat = None
+
+    def capacity(self):
+        """Concurrent runs this host can take now, re-measured every 2 seconds."""
+        value, measured_at = self.capacity_cache
+        if time.time() - measured_at < 2:
+            return value
+        in_flight = self.r.zcard(self.holders_key)
+        free_mb = None
+        try:
+            with open("/proc/meminfo") as f:
+                for line in f:
+                    if line.startswith("MemAvailable:"):
+                        free_mb = int(line.split()[1]) // 1024
+        except OSError:
+            pass
+        # Running sandboxes already use part of MemAvailable, so count them back in
+        mem_cap = ADMIT_MAX if free_mb is None else in_flight + (free_mb - ADMIT_MEM_RESERVE_MB) // ADMIT_RUN_MEM_MB
+        # Load that is not ours (builds, Postgres, the app) takes CPU away from runs
+        foreign_load = max(0.0, os.getloadavg()[0] - in_flight)
+        cpu_cap = int((os.cpu_count() or 1) * ADMIT_RUNS_PER_CPU - foreign_load)
+        value = max(ADMIT_MIN, min(ADMIT_MAX, mem_cap, cpu_cap))
+        self.capacity_cache = (value, time.time())
+        return value
+
+    def acquire(self, priority, user_id, timeout=15):
+        """Wait for a slot. Returns a ticket for release(), or None on timeout."""
+        ticket = uuid.uuid4().hex
+        cls = ADMIT_PRIORITIES.index(priority)
+        deadline = time.time() + timeout
+        try:
+            self._enqueue(keys=[self.wait_keys[cls], self.vtime_keys[cls], f"admit:uvt:{priority}", self.waiting_key],
+                          args=[ticket, user_id or "anon", time.time(), ADMIT_WAIT_TTL])
+            while True:
+                admitted = self._try(keys=[self.holders_key, self.waiting_key] + self.wait_keys + self.vtime_keys,
+                                     args=[ticket, time.time(), ADMIT_HOLD_TTL, ADMIT_WAIT_TTL,
+                                           self.capacity(), cls + 1])
+                if admitted == 1:
+                    self._hold(ticket)
+                    return ticket
+                if admitted == -1:
+                    self._enqueue(keys=[self.wait_keys[cls], self.vtime_keys[cls], f"admit:uvt:{priority}",
+                                        self.waiting_key],
+                                  args=[ticket, user_id or "anon", time.time(), ADMIT_WAIT_TTL])
+                if time.time() >= deadline:
+                    self._forget(ticket)
+                    return None
+                time.sleep(0.05)
+        except redis.RedisError as e:
+            print(f"Admission control unavailable, limiting locally: {e}")
+            if self.local.acquire(timeout=max(deadline - time.time(), 0)):
+                return "local:" + ticket
+            return None
+
+    def try_acquire_idle(self):
+        """A slot if one is free right now and nobody is queued for it, else None."""
+        ticket = uuid.uuid4().hex
+        try:
+            if self._idle(keys=[self.holders_key] + self.wait_keys,
+                          args=[ticket, time.time(), ADMIT_HOLD_TTL, self.capacity()]) == 1:
+                self._hold(ticket)
+                return ticket
+            return None
+        except redis.RedisError:
+            return "local:" + ticket if self.local.acquire(blocking=False) else None
+
+    def release(self, ticket):
+        if not ticket:
+            return
+        if ticket.startswith("local:"):
+            self.local.release()
+            return
+        with self.lock:
+            if ticket not in self.held:
+                return  # already released
+            self.held.discard(ticket)
+        self._forget(ticket)
+
+    def _forget(self, ticket):
+        try:
+            pipe = self.r.pipeline()
+            pipe.zrem(self.holders_key, ticket)
+            pipe.zrem(self.waiting_key, ticket)
+            for key in self.wait_keys:
+                pipe.zrem(key, ticket)
+            pipe.execute()
+        except redis.RedisError:
+            pass  # the slot expires after ADMIT_HOLD_TTL
+
+    def _hold(self, ticket):
+        with self.lock:
+            self.held.add(ticket)
+            if self.heartbeat is None:
+                self.heartbeat = threading.Thread(target=self._renew, daemon=True)
+                self.heartbeat.start()
+
+    def _renew(self):
+        # Held slots expire unless renewed, so a crashed process cannot leak them
+        while True:
+            time.sleep(ADMIT_HOLD_TTL / 3)
+            with self.lock:
+                tickets = list(self.held)
+            if not tickets:
+                continue
+            try:
+                expiry = time.time() + ADMIT_HOLD_TTL
+                self.r.zadd(self.holders_key, {t: expiry for t in tickets}, xx=True)
+            except redis.RedisError:
+                pass
+
+    def stats(self):
+        return {
+            "capacity": self.capacity(),
+            "running": self.r.zcard(self.holders_key),
+            "waiting": {p: self.r.zcard(k) for p, k in zip(ADMIT_PRIORITIES, self.wait_keys)},
+        }
+
+admission = AdmissionController(redis_client)
 
 
 # --- Rate Limiter ---
@@ -76,23 +292,248 @@ limiter = Limiter(
     default_limits=["60/minute"]
 )
 
+# --- Judge Queue (RQ) ---
+# With JUDGE_QUEUE_ENABLED, /execute and /submit enqueue a job and return its id
+# immediately; `python worker.py` processes run the containers. RQ pickles job
+# payloads, so it needs its own connection without decode_responses.
+JUDGE_QUEUE_ENABLED = os.getenv("JUDGE_QUEUE_ENABLED", "false").lower() == "true"
+JUDGE_QUEUE_MAX_PENDING = int(os.getenv("JUDGE_QUEUE_MAX_PENDING", "200"))
+JUDGE_JOB_TIMEOUT = int(os.getenv("JUDGE_JOB_TIMEOUT", "60"))
+
+rq_redis = redis.Redis(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", "6379")),
+    db=1
+)
+# Workers listen in this order, so submissions are picked before plain runs and
+# rejudge batches and driver prebuilds only run when nothing else is waiting
+judge_queues = {
+    "submit": Queue("judge-submit", connection=rq_redis),
+    "run": Queue("judge-run", connection=rq_redis),
+    "rejudge": Queue("judge-rejudge", connection=rq_redis),
+}
+
+def enqueue_judge_job(kind, func_path, user_id, args):
+    """Queue a judge job. Returns a Flask response, or None to fall back to judging inline."""
+    queue = judge_queues[kind]
+    try:
+        if len(queue) >= JUDGE_QUEUE_MAX_PENDING:
+            return jsonify({"error": "Server busy. Too many executions queued. Please try again in a few seconds.", "status": "Queued"}), 503
+        # Enqueue by dotted path: the web process runs as __main__, workers import `server`
+        job = queue.enqueue(func_path, args=args, meta={"user_id": user_id},
+                            job_timeout=JUDGE_JOB_TIMEOUT, result_ttl=600, failure_ttl=600)
+    except redis.RedisError as e:
+        print(f"Judge queue unavailable, judging inline: {e}")
+        return None
+    return jsonify({"job_id": job.id, "status": "Queued", "position": len(queue)}), 202
+
 # Database Connection
 class DatabaseUnavailableError(Exception):
     pass
 
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(
-            host=os.getenv("DB_HOST", "localhost"),
-            database=os.getenv("DB_NAME", "contest_db"),
-            user=os.getenv("DB_USER", "user"),
-            password=os.getenv("DB_PASSWORD", "password"),
-            port=os.getenv("DB_PORT", "5433")
-        )
+# --- Database Connection Pool ---
+# Every request used to open its own connection (TCP handshake plus auth) and
+# close it again. Connections now come from a bounded pool shared by request
+# threads, the rejudge loop and the sweepers. get_db_connection() returns a
+# wrapper whose close() hands the connection back, so the usual
+# `finally: conn.close()` call sites stay as they are.
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "20"))
+# Seconds a request waits for a free connection before answering 503
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_PING_AFTER = 30    # idle seconds after which a connection is checked with SELECT 1
+DB_POOL_IDLE_TTL = 300     # idle seconds before connections above DB_POOL_MIN are closed
+
+class PgConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers which statements are prepared on it."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.last_used = time.monotonic()
+
+class ConnectionPool:
+    """Thread-safe pool of PostgreSQL connections with a checkout timeout."""
+
+    def __init__(self, minconn, maxconn, timeout):
+        self.minconn = minconn
+        self.maxconn = max(maxconn, 1)
+        self.timeout = timeout
+        self.cond = threading.Condition()
+        self.idle = []        # most recently returned last, handed out first
+        self.opened = 0       # idle + checked out + being opened
+        self.in_use = 0
+        self.counters = {"checkouts": 0, "waited": 0, "timeouts": 0, "connects": 0, "replaced": 0}
+        self.wait_ms = deque(maxlen=1000)
+        self.peak_in_use = 0
+
+    def _connect(self):
+        try:
+            conn = psycopg2.connect(
+                host=os.getenv("DB_HOST", "localhost"),
+                database=os.getenv("DB_NAME", "contest_db"),
+                user=os.getenv("DB_USER", "user"),
+                password=os.getenv("DB_PASSWORD", "password"),
+                port=os.getenv("DB_PORT", "5433"),
+                connection_factory=PgConnection,
+            )
+        except Exception as e:
+            print("Database connection failed:", e)
+            raise DatabaseUnavailableError("Database is currently unavailable")
+        with self.cond:
+            self.counters["connects"] += 1
         return conn
-    except Exception as e:
-        print("Database connection failed:", e)
-        raise DatabaseUnavailableError("Database is currently unavailable")
+
+    def _healthy(self, conn):
+        if conn.closed:
+            return False
+        if time.monotonic() - conn.last_used < DB_POOL_PING_AFTER:
+            return True
+        # Idle long enough that the server or a firewall may have dropped it
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            conn.close()
+            return False
+
+    def getconn(self):
+        start = time.monotonic()
+        conn = None
+        waited = False
+        with self.cond:
+            while True:
+                if self.idle:
+                    conn = self.idle.pop()
+                    break
+                if self.opened < self.maxconn:
+                    self.opened += 1
+                    break
+                remaining = start + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self.counters["timeouts"] += 1
+                    raise DatabaseUnavailableError("Timed out waiting for a database connection")
+                waited = True
+                self.cond.wait(remaining)
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+        try:
+            if conn is not None and not self._healthy(conn):
+                with self.cond:
+                    self.counters["replaced"] += 1
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self.cond:
+                self.opened -= 1
+                self.in_use -= 1
+                self.cond.notify()
+            raise
+
+        with self.cond:
+            self.counters["checkouts"] += 1
+            if waited:
+                self.counters["waited"] += 1
+            self.wait_ms.append(round((time.monotonic() - start) * 1000, 1))
+        return conn
+
+    def putconn(self, conn):
+        # Never hand out a connection in the middle of someone else's transaction
+        if not conn.closed:
+            try:
+                if conn.autocommit:
+                    conn.autocommit = False
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                conn.close()
+        now = time.monotonic()
+        conn.last_used = now
+        stale = []
+        with self.cond:
+            self.in_use -= 1
+            if conn.closed:
+                self.opened -= 1
+            else:
+                self.idle.append(conn)
+            # The bottom of the stack is the coldest; shrink back towards minconn
+            while self.idle and self.opened > self.minconn and now - self.idle[0].last_used > DB_POOL_IDLE_TTL:
+                stale.append(self.idle.pop(0))
+                self.opened -= 1
+            self.cond.notify()
+        for old in stale:
+            old.close()
+
+    def warm(self):
+        """Open connections up to minconn so the first requests don't pay for them."""
+        while True:
+            with self.cond:
+                if self.opened >= self.minconn:
+                    return
+                self.opened += 1
+            try:
+                conn = self._connect()
+            except DatabaseUnavailableError:
+                with self.cond:
+                    self.opened -= 1
+                return
+            with self.cond:
+                self.idle.insert(0, conn)
+                self.cond.notify()
+
+    def stats(self):
+        with self.cond:
+            waits = list(self.wait_ms)
+            return {
+                "size": self.opened,
+                "idle": len(self.idle),
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "min": self.minconn,
+                "max": self.maxconn,
+                "utilization": round(self.in_use / self.maxconn * 100, 1),
+                **self.counters,
+                "wait_avg_ms": round(sum(waits) / len(waits), 1) if waits else 0,
+                "wait_p95_ms": _percentile(waits, 95),
+            }
+
+class PooledConnection:
+    """A checked-out connection; close() returns it to the pool instead of closing it."""
+
+    _conn = None
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        # e.g. conn.autocommit = True must reach the real connection
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._conn, name, value)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.putconn(conn)
+
+    def __del__(self):
+        # A handler that forgot close() must not leak its slot
+        self.close()
+
+db_pool = ConnectionPool(DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT)
+
+def get_db_connection():
+    return PooledConnection(db_pool, db_pool.getconn())
 
 @app.errorhandler(DatabaseUnavailableError)
 def handle_db_unavailable(e):
@@ -107,6 +548,100 @@ def execute_query(cur, query, params=None):
     else:
         cur.execute(query)
 
+# Hot statements are prepared once per pooled connection and then run with
+# EXECUTE, so Postgres parses and plans them once instead of on every request.
+# Prepared statements belong to the session, so they survive rollbacks and
+# live as long as the pooled connection.
+PREPARED_STATEMENTS = {
+    # Code and output go to blobs (see blobs.py) as (hash, size, data) triples:
+    # $4-$6 the code, $8-$10 the stored output. A resubmit only adds the row.
+    "insert_submission": """
+        WITH stored AS (
+            INSERT INTO blobs (hash, size, data) VALUES ($4, $5, $6), ($8, $9, $10)
+            ON CONFLICT (hash) DO NOTHING
+        )
+        INSERT INTO submissions (user_id, problem_id, language, code_hash, status, output_hash, cpu_time_ms, peak_memory_kb)
+        VALUES ($1, $2, $3, $4, $7, $8, $11, $12) RETURNING id, created_at""",
+    # Counter tables for one new submission: $3 is 1 for a pass, $4 its day.
+    # Returns whether it was the user's first attempt at / first pass of the problem.
+    "record_submission_stats": """
+        WITH pair AS (
+            INSERT INTO user_problem_stats AS t (user_id, problem_id, submissions, passes)
+            VALUES ($1, $2, 1, $3)
+            ON CONFLICT (user_id, problem_id) DO UPDATE
+                SET submissions = t.submissions + 1, passes = t.passes + EXCLUDED.passes
+            RETURNING (t.submissions = 1)::int AS new_attempt, (t.passes = 1 AND $3 = 1)::int AS new_solve
+        ), totals AS (
+            INSERT INTO user_stats AS t (user_id, submissions, passes, attempted, solved, solved_by_difficulty, last_active)
+            SELECT $1, 1, $3, pair.new_attempt, pair.new_solve,
+                   CASE WHEN pair.new_solve = 1 AND p.difficulty IS NOT NULL
+                        THEN jsonb_build_object(p.difficulty, 1) ELSE '{}' END,
+                   $4
+            FROM pair LEFT JOIN problems p ON p.slug = $2
+            ON CONFLICT (user_id) DO UPDATE SET
+                submissions = t.submissions + 1,
+                last_active = GREATEST(t.last_active, EXCLUDED.last_active),
+                passes = t.passes + EXCLUDED.passes,
+                attempted = t.attempted + EXCLUDED.attempted,
+                solved = t.solved + EXCLUDED.solved,
+                solved_by_difficulty = CASE WHEN EXCLUDED.solved = 1 THEN t.solved_by_difficulty || COALESCE((
+                    SELECT jsonb_build_object(p.difficulty, COALESCE((t.solved_by_difficulty ->> p.difficulty)::int, 0) + 1)
+                    FROM problems p WHERE p.slug = $2 AND p.difficulty IS NOT NULL), '{}')
+                    ELSE t.solved_by_difficulty END
+        ), problem AS (
+            INSERT INTO problem_stats AS t (problem_id, submissions, passes) VALUES ($2, 1, $3)
+            ON CONFLICT (problem_id) DO UPDATE
+                SET submissions = t.submissions + 1, passes = t.passes + EXCLUDED.passes
+        ), activity AS (
+            INSERT INTO user_activity AS t (user_id, day, submissions) VALUES ($1, $4, 1)
+            ON CONFLICT (user_id, day) DO UPDATE SET submissions = t.submissions + 1
+        )
+        SELECT new_attempt, new_solve FROM pair""",
+    "user_submissions": """
+        SELECT id, problem_id, language, status, created_at, cpu_time_ms, peak_memory_kb
+        FROM submissions WHERE user_id = $1 ORDER BY created_at DESC LIMIT 50""",
+    # Everything on the profile page in one round trip. Streaks are islands of
+    # consecutive active days: day minus its row number is constant within one.
+    "user_profile": """
+        WITH activity AS (
+            SELECT day, submissions FROM user_activity
+            WHERE user_id = $1 AND day >= CURRENT_DATE - 364 AND day <= CURRENT_DATE
+        ), streaks AS (
+            SELECT MAX(day) AS last_day, COUNT(*) AS length FROM (
+                SELECT day, day - (ROW_NUMBER() OVER (ORDER BY day))::int AS island FROM activity
+            ) days
+            GROUP BY island
+        ), recent AS (
+            SELECT id, problem_id, language, status, created_at, cpu_time_ms, peak_memory_kb
+            FROM submissions WHERE user_id = $1 ORDER BY created_at DESC LIMIT 50
+        )
+        SELECT
+            (SELECT row_to_json(c) FROM (
+                SELECT submissions, passes, attempted, solved, solved_by_difficulty
+                FROM user_stats WHERE user_id = $1) c),
+            (SELECT COUNT(*) FROM problems),
+            (SELECT COALESCE(jsonb_object_agg(difficulty, n), '{}') FROM (
+                SELECT difficulty, COUNT(*) AS n FROM problems
+                WHERE difficulty IS NOT NULL GROUP BY difficulty) d),
+            (SELECT json_agg(json_build_object('date', d::date, 'count', COALESCE(a.submissions, 0)) ORDER BY d)
+             FROM generate_series(CURRENT_DATE - 364, CURRENT_DATE, INTERVAL '1 day') d
+             LEFT JOIN activity a ON a.day = d::date),
+            (SELECT COALESCE(MAX(length), 0) FROM streaks),
+            (SELECT COALESCE(MAX(length), 0) FROM streaks WHERE last_day = CURRENT_DATE),
+            (SELECT COALESCE(json_agg(r ORDER BY r.created_at DESC), '[]') FROM recent r)""",
+}
+
+def execute_prepared(cur, name, params=()):
+    """Run one of PREPARED_STATEMENTS, preparing it on this connection first if needed."""
+    conn = cur.connection
+    if name not in conn.prepared:
+        execute_query(cur, f"PREPARE {name} AS {PREPARED_STATEMENTS[name]}")
+        conn.prepared.add(name)
+    if params:
+        execute_query(cur, f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        execute_query(cur, f"EXECUTE {name}")
+
 # --- JWT Helpers ---
 def generate_token(user_id, username, is_admin=False):
     """Generate a JWT token and store it in Redis for validation."""
@@ -199,23 +734,12 @@ def get_problem(slug):
         execute_query(cur, "SELECT slug, title, description, difficulty, templates FROM problems WHERE slug = %s", (slug,))
         row = cur.fetchone()
         if row:
-            # Read driver files from disk
-            problem_dir = os.path.join(PROBLEMS_DIR, slug)
-            driver_python = ""
-            driver_cpp = ""
-            test_data = ""
-            
-            if os.path.exists(os.path.join(problem_dir, "driver.py")):
-                with open(os.path.join(problem_dir, "driver.py"), "r", encoding="utf-8") as f:
-                    driver_python = f.read()
-            
-            if os.path.exists(os.path.join(problem_dir, "driver.cpp")):
-                with open(os.path.join(problem_dir, "driver.cpp"), "r", encoding="utf-8") as f:
-                    driver_cpp = f.read()
-                    
-            if os.path.exists(os.path.join(problem_dir, "test_data.txt")):
-                with open(os.path.join(problem_dir, "test_data.txt"), "r", encoding="utf-8") as f:
-                    test_data = f.read()
+            # Driver files come from the judge's asset cache
+            assets = problem_assets.get(slug)
+            files = assets.files
+            driver_python = files.get("driver.py", b"").decode("utf-8")
+            driver_cpp = files.get("driver.cpp", b"").decode("utf-8")
+            test_data = files.get("test_data.txt", b"").decode("utf-8")
 
             result = {
                 "slug": row[0], 
@@ -225,7 +749,8 @@ def get_problem(slug):
                 "templates": row[4],
                 "driver_python": driver_python,
                 "driver_cpp": driver_cpp,
-                "test_data": test_data
+                "test_data": test_data,
+                "spec": assets.meta.get("spec"),
             }
             cache_set(cache_key, result, ttl=600)
             return jsonify(result)
@@ -248,29 +773,21 @@ def admin_stats():
     try:
         cur = conn.cursor()
 
+        # Counters and charts come from the rollup tables and problem_stats
+        # (see Dashboard Rollups), so this is the same few small reads however
+        # large users and submissions grow. "Today" lags by up to ROLLUP_INTERVAL.
+
         # --- Users ---
-        execute_query(cur, "SELECT COUNT(*) FROM users")
+        # Every user is counted on the day they joined
+        execute_query(cur, "SELECT COALESCE(SUM(new_users), 0) FROM daily_rollups")
         total_users = cur.fetchone()[0]
 
-        execute_query(cur, "SELECT COUNT(*) FROM users WHERE created_at >= CURRENT_DATE")
-        new_today = cur.fetchone()[0]
-
-        # Active today = users who submitted today
-        execute_query(cur, """
-            SELECT COUNT(DISTINCT user_id) FROM submissions
-            WHERE created_at >= CURRENT_DATE
-        """)
-        active_today = cur.fetchone()[0]
+        execute_query(cur, "SELECT new_users, active_users, submissions FROM daily_rollups WHERE day = CURRENT_DATE")
+        new_today, active_today, submissions_today = cur.fetchone() or (0, 0, 0)
 
         # --- Submissions ---
-        execute_query(cur, "SELECT COUNT(*) FROM submissions")
-        total_submissions = cur.fetchone()[0]
-
-        execute_query(cur, "SELECT COUNT(*) FROM submissions WHERE created_at >= CURRENT_DATE")
-        submissions_today = cur.fetchone()[0]
-
-        execute_query(cur, "SELECT COUNT(*) FROM submissions WHERE status = 'Pass'")
-        pass_count = cur.fetchone()[0]
+        execute_query(cur, "SELECT COALESCE(SUM(submissions), 0), COALESCE(SUM(passes), 0) FROM problem_stats")
+        total_submissions, pass_count = cur.fetchone()
 
         fail_count = total_submissions - pass_count
         acceptance_rate = round((pass_count / max(total_submissions, 1)) * 100, 1)
@@ -284,9 +801,9 @@ def admin_stats():
 
         # --- Hourly Activity (today, 24h) ---
         execute_query(cur, """
-            SELECT EXTRACT(HOUR FROM created_at)::int AS hr, COUNT(*)
-            FROM submissions
-            WHERE created_at >= CURRENT_DATE
+            SELECT EXTRACT(HOUR FROM hour)::int AS hr, SUM(submissions)
+            FROM hourly_rollups
+            WHERE hour >= CURRENT_DATE
             GROUP BY hr ORDER BY hr
         """)
         hourly_map = {row[0]: row[1] for row in cur.fetchall()}
@@ -299,19 +816,17 @@ def admin_stats():
 
         # --- Language Distribution ---
         execute_query(cur, """
-            SELECT language, COUNT(*) FROM submissions GROUP BY language ORDER BY COUNT(*) DESC
+            SELECT l.key, SUM(l.value::int) FROM daily_rollups, jsonb_each_text(languages) l
+            GROUP BY l.key ORDER BY SUM(l.value::int) DESC
         """)
         language_distribution = {row[0]: row[1] for row in cur.fetchall()}
 
         # --- Top Problems (by submission count) ---
         execute_query(cur, """
-            SELECT s.problem_id, p.title, 
-                   COUNT(*) AS total,
-                   SUM(CASE WHEN s.status = 'Pass' THEN 1 ELSE 0 END) AS passes
-            FROM submissions s
-            LEFT JOIN problems p ON s.problem_id = p.slug
-            GROUP BY s.problem_id, p.title
-            ORDER BY total DESC
+            SELECT ps.problem_id, p.title, ps.submissions, ps.passes
+            FROM problem_stats ps
+            LEFT JOIN problems p ON ps.problem_id = p.slug
+            ORDER BY ps.submissions DESC
             LIMIT 8
         """)
         top_problems = []
@@ -325,30 +840,7 @@ def admin_stats():
                 "acceptance": round((p / max(t, 1)) * 100, 1)
             })
 
-        # --- Recent Users with stats ---
-        execute_query(cur, """
-            SELECT u.id, u.username, u.created_at,
-                   COUNT(s.id) AS sub_count,
-                   COUNT(DISTINCT CASE WHEN s.status = 'Pass' THEN s.problem_id END) AS solved,
-                   MAX(s.created_at) AS last_active,
-                   COALESCE(u.is_admin, FALSE) AS is_admin
-            FROM users u
-            LEFT JOIN submissions s ON u.id = s.user_id
-            GROUP BY u.id, u.username, u.created_at, u.is_admin
-            ORDER BY sub_count DESC
-        """)
-        recent_users = []
-        for row in cur.fetchall():
-            recent_users.append({
-                "id": row[0],
-                "username": row[1],
-                "joined": row[2].isoformat() if row[2] else None,
-                "submissions": row[3],
-                "solved": row[4],
-                "last_active": row[5].isoformat() if row[5] else None,
-                "is_admin": bool(row[6])
-            })
-
+        # The per-user table is paged separately: GET /api/v1/admin/users
         result = {
             "users": {"total": total_users, "new_today": new_today, "active_today": active_today},
             "submissions": {"total": total_submissions, "today": submissions_today, "pass_count": pass_count, "fail_count": fail_count},
@@ -356,8 +848,7 @@ def admin_stats():
             "problems": {"total": total_problems, "by_difficulty": by_difficulty},
             "hourly_activity": hourly_activity,
             "language_distribution": language_distribution,
-            "top_problems": top_problems,
-            "recent_users": recent_users
+            "top_problems": top_problems
         }
         cache_set("admin:stats", result, ttl=30)
         return jsonify(result)
@@ -370,8 +861,8 @@ def admin_database():
     conn = get_db_connection()
     try:
         cur = conn.cursor()
-        ALLOWED_TABLES = {"users", "problems", "submissions", "chat_sessions"}
-        tables = [t for t in ["users", "problems", "submissions", "chat_sessions"] if t in ALLOWED_TABLES]
+        ALLOWED_TABLES = {"users", "problems", "submissions", "blobs", "chat_sessions"}
+        tables = [t for t in ["users", "problems", "submissions", "blobs", "chat_sessions"] if t in ALLOWED_TABLES]
         table_stats = []
         for table in tables:
             cur.execute(f"SELECT COUNT(*) FROM {table}")  # safe: table is from hardcoded whitelist
@@ -398,6 +889,82 @@ def admin_database():
     finally:
         conn.close()
 
+# Sort orders of the admin user list: the ordering expression and the id
+# column that breaks ties, matching one index each (migration 5) so a page is
+# a range scan from the cursor instead of sorting every user
+ADMIN_USER_SORTS = {
+    "submissions": ("s.submissions", "s.user_id"),
+    "solved": ("s.solved", "s.user_id"),
+    "last_active": ("COALESCE(s.last_active, '-infinity'::date)", "s.user_id"),
+    "joined": ("u.created_at", "u.id"),
+    "username": ("u.username", "u.id"),
+}
+ADMIN_USERS_PAGE_MAX = 100
+
+@app.route("/api/v1/admin/users", methods=["GET"])
+@require_admin
+def admin_list_users():
+    """One page of users: ?sort=submissions|solved|last_active|joined|username&order=asc|desc
+    &q=<username substring>&role=admin|user&limit=50&cursor=<next_cursor>."""
+    sort = request.args.get("sort", "submissions")
+    if sort not in ADMIN_USER_SORTS:
+        return jsonify({"error": f"sort must be one of {', '.join(ADMIN_USER_SORTS)}"}), 400
+    order = request.args.get("order", "asc" if sort == "username" else "desc")
+    if order not in ("asc", "desc"):
+        return jsonify({"error": "order must be asc or desc"}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", 50)), 1), ADMIN_USERS_PAGE_MAX)
+        cursor = int(request.args["cursor"]) if request.args.get("cursor") else None
+    except ValueError:
+        return jsonify({"error": "limit and cursor must be integers"}), 400
+
+    key, id_col = ADMIN_USER_SORTS[sort]
+    where, params = [], []
+    q = request.args.get("q", "").strip()
+    if q:
+        where.append("u.username ILIKE %s")
+        params.append("%" + re.sub(r"([\\%_])", r"\\\1", q) + "%")
+    role = request.args.get("role")
+    if role in ("admin", "user"):
+        where.append("COALESCE(u.is_admin, FALSE) = %s")
+        params.append(role == "admin")
+    if cursor is not None:
+        # The cursor is the id of the previous page's last user; its sort value
+        # is looked up in place so it never round-trips through the client
+        where.append(f"""({key}, {id_col}) {"<" if order == "desc" else ">"} (
+            (SELECT {key} FROM users u JOIN user_stats s ON s.user_id = u.id WHERE u.id = %s), %s)""")
+        params += [cursor, cursor]
+    params.append(limit + 1)
+
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        execute_query(cur, f"""
+            SELECT u.id, u.username, u.created_at, s.submissions, s.solved, s.last_active,
+                   COALESCE(u.is_admin, FALSE)
+            FROM users u JOIN user_stats s ON s.user_id = u.id
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY {key} {order}, {id_col} {order}
+            LIMIT %s
+        """, params)
+        rows = cur.fetchall()
+    finally:
+        conn.close()
+
+    users = [{
+        "id": row[0],
+        "username": row[1],
+        "joined": row[2].isoformat() if row[2] else None,
+        "submissions": row[3],
+        "solved": row[4],
+        "last_active": row[5].isoformat() if row[5] else None,
+        "is_admin": bool(row[6]),
+    } for row in rows[:limit]]
+    return jsonify({
+        "users": users,
+        "next_cursor": users[-1]["id"] if len(rows) > limit else None,
+    })
+
 @app.route("/api/v1/admin/users/<int:user_id>", methods=["PUT"])
 @require_admin
 def update_user_status(user_id):
@@ -431,11 +998,22 @@ def delete_user(user_id):
             if user and user[0]:
                 return jsonify({"error": "Cannot delete the only admin"}), 400
         
+        # Their submissions all fall after they joined; rollups are redone from there
+        execute_query(cur, "SELECT created_at FROM users WHERE id = %s", (user_id,))
+        joined = (cur.fetchone() or (None,))[0]
+
         # Need to clean up related data first
+        execute_query(cur, "SELECT problem_id FROM user_problem_stats WHERE user_id = %s", (user_id,))
+        touched_problems = [row[0] for row in cur.fetchall()]
         execute_query(cur, "DELETE FROM submissions WHERE user_id = %s", (user_id,))
         execute_query(cur, "DELETE FROM chat_sessions WHERE user_id = %s", (user_id,))
+        # The user's own counter rows go with the user (ON DELETE CASCADE)
+        repair_stats(cur, problem_ids=touched_problems)
         execute_query(cur, "DELETE FROM users WHERE id = %s", (user_id,))
         conn.commit()
+        leaderboard_forget(user_id)
+        if joined:
+            schedule_rollup_refresh(joined)
         return jsonify({"message": "User deleted"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -443,6 +1021,21 @@ def delete_user(user_id):
         redis_client.delete("admin:stats")
         conn.close()
 
+def generate_from_spec(spec, test_data):
+    """Drivers, starter templates and lines_per_case for a problem spec (see driver_gen). Raises ValueError."""
+    spec = driver_gen.load_spec(spec)
+    try:
+        lines_per_case = driver_gen.check_test_data(spec, test_data)
+    except ValueError as e:
+        raise ValueError(f"test data does not match the spec: {e}")
+    return spec, {
+        "driver_python": driver_gen.python_driver(spec),
+        "driver_cpp": driver_gen.cpp_driver(spec),
+        "python_template": driver_gen.python_template(spec),
+        "cpp_template": driver_gen.cpp_template(spec),
+        "lines_per_case": lines_per_case,
+    }
+
 @app.route("/api/v1/admin/problems", methods=["POST"])
 @require_admin
 def create_problem():
@@ -456,12 +1049,26 @@ def create_problem():
     driver_python = data.get("driver_python", "")
     driver_cpp = data.get("driver_cpp", "")
     test_data = data.get("test_data", "")
+    spec = data.get("spec")
+    lines_per_case = data.get("lines_per_case")
     
     print(f"Creating new problem: {slug}")
     
     if not slug or not title:
         return jsonify({"error": "slug and title are required"}), 400
     
+    # A spec replaces hand-written drivers; templates are generated unless given
+    if spec:
+        try:
+            spec, generated = generate_from_spec(spec, test_data)
+        except ValueError as e:
+            return jsonify({"error": f"Invalid spec: {e}"}), 400
+        driver_python = generated["driver_python"]
+        driver_cpp = generated["driver_cpp"]
+        python_template = data.get("python_template") or generated["python_template"]
+        cpp_template = data.get("cpp_template") or generated["cpp_template"]
+        lines_per_case = lines_per_case or generated["lines_per_case"]
+    
     templates = json.dumps({"python": python_template, "cpp": cpp_template})
     
     conn = get_db_connection()
@@ -491,6 +1098,18 @@ def create_problem():
             with open(os.path.join(problem_dir, "test_data.txt"), "w", encoding="utf-8") as f:
                 f.write(test_data)
         
+        # Optional: how many test data lines form one case (enables sharded judging)
+        meta = {}
+        if lines_per_case:
+            meta["lines_per_case"] = int(lines_per_case)
+        if spec:
+            meta["spec"] = spec
+        if meta:
+            save_problem_meta(slug, meta)
+        
+        if driver_cpp:
+            schedule_cpp_prebuild(slug, cpp_template)
+        
         return jsonify({"message": "Problem created", "slug": slug}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -498,6 +1117,8 @@ def create_problem():
         cache_delete_pattern("problems:*")
         cache_delete_pattern("problem:*")
         redis_client.delete("admin:stats")
+        invalidate_problem_verdicts(slug)
+        problem_assets.invalidate(slug)
         conn.close()
 
 @app.route("/api/v1/admin/problems/<slug>", methods=["PUT"])
@@ -512,22 +1133,40 @@ def update_problem(slug):
     driver_python = data.get("driver_python", "")
     driver_cpp = data.get("driver_cpp", "")
     test_data = data.get("test_data", "")
+    spec = data.get("spec")
     
     print(f"Updating problem: {slug}")
     
+    if spec:
+        try:
+            spec, generated = generate_from_spec(spec, test_data)
+        except ValueError as e:
+            return jsonify({"error": f"Invalid spec: {e}"}), 400
+        driver_python = generated["driver_python"]
+        driver_cpp = generated["driver_cpp"]
+        python_template = data.get("python_template") or generated["python_template"]
+        cpp_template = data.get("cpp_template") or generated["cpp_template"]
+    
     templates = json.dumps({"python": python_template, "cpp": cpp_template})
     
     conn = get_db_connection()
     try:
         cur = conn.cursor()
         # Check if problem exists
-        execute_query(cur, "SELECT id FROM problems WHERE slug = %s", (slug,))
-        if not cur.fetchone():
+        execute_query(cur, "SELECT difficulty FROM problems WHERE slug = %s", (slug,))
+        row = cur.fetchone()
+        if not row:
             return jsonify({"error": "Problem not found"}), 404
             
         execute_query(cur, 
             "UPDATE problems SET title = %s, description = %s, difficulty = %s, templates = %s WHERE slug = %s",
             (title, description, difficulty, templates, slug))
+        if row[0] != difficulty:
+            # Solved-by-difficulty counts of everyone who solved it move buckets
+            execute_query(cur, "SELECT user_id FROM user_problem_stats WHERE problem_id = %s AND passes > 0", (slug,))
+            solvers = [r[0] for r in cur.fetchall()]
+            if solvers:
+                repair_stats(cur, user_ids=solvers)
         conn.commit()
         
         # Update files
@@ -544,6 +1183,33 @@ def update_problem(slug):
         with open(os.path.join(problem_dir, "test_data.txt"), "w", encoding="utf-8") as f:
             f.write(test_data)
         
+        if "lines_per_case" in data or "spec" in data:
+            meta = load_problem_meta(slug)
+            if spec:
+                meta["spec"] = spec
+            else:
+                meta.pop("spec", None)
+            # Without an explicit value, a spec knows whether its cases are line-aligned
+            if "lines_per_case" in data:
+                lines_per_case = data["lines_per_case"]
+            elif spec:
+                lines_per_case = generated["lines_per_case"]
+            else:
+                lines_per_case = meta.get("lines_per_case")
+            if lines_per_case:
+                meta["lines_per_case"] = int(lines_per_case)
+            else:
+                meta.pop("lines_per_case", None)
+            save_problem_meta(slug, meta)
+        
+        if driver_cpp:
+            schedule_cpp_prebuild(slug, cpp_template)
+        
+        # Stored verdicts were judged against the old tests
+        if data.get("rejudge"):
+            progress, _ = start_rejudge(slug, {}, started_by=g.user_id, restart=True)
+            return jsonify({"message": "Problem updated", "rejudge": progress}), 200
+        
         return jsonify({"message": "Problem updated"}), 200
     except Exception as e:
         print(f"Update error: {e}")
@@ -552,6 +1218,10 @@ def update_problem(slug):
         cache_delete_pattern("problems:*")
         redis_client.delete(f"problem:{slug}")
         redis_client.delete("admin:stats")
+        invalidate_problem_verdicts(slug)
+        problem_assets.invalidate(slug)
+        # Rebuilt from the stored submissions on next use, like after a rejudge
+        cache_delete_pattern(f"usage:*:{slug}:*")
         conn.close()
 
 @app.route("/api/v1/admin/problems/<slug>", methods=["DELETE"])
@@ -565,8 +1235,13 @@ def delete_problem(slug):
         # 1. Delete associated chat sessions
         execute_query(cur, "DELETE FROM chat_sessions WHERE problem_id = %s", (slug,))
         
-        # 2. Delete associated submissions
+        # 2. Delete associated submissions and recount the users who had them
+        execute_query(cur, "SELECT user_id FROM user_problem_stats WHERE problem_id = %s", (slug,))
+        affected_users = [row[0] for row in cur.fetchall()]
+        execute_query(cur, "SELECT MIN(created_at) FROM submissions WHERE problem_id = %s", (slug,))
+        first_submission = cur.fetchone()[0]
         execute_query(cur, "DELETE FROM submissions WHERE problem_id = %s", (slug,))
+        repair_stats(cur, user_ids=affected_users, problem_ids=[slug])
 
         # 3. Delete the problem itself
         execute_query(cur, "DELETE FROM problems WHERE slug = %s RETURNING slug", (slug,))
@@ -581,7 +1256,11 @@ def delete_problem(slug):
         problem_dir = os.path.join(PROBLEMS_DIR, slug)
         if os.path.exists(problem_dir):
             shutil.rmtree(problem_dir)
-            
+
+        # Solves of this problem no longer count
+        rebuild_leaderboards()
+        if first_submission:
+            schedule_rollup_refresh(first_submission)
         return jsonify({"message": "Problem deleted"}), 200
     except Exception as e:
         print(f"Delete error: {e}")
@@ -590,6 +1269,9 @@ def delete_problem(slug):
         cache_delete_pattern("problems:*")
         redis_client.delete(f"problem:{slug}")
         redis_client.delete("admin:stats")
+        invalidate_problem_verdicts(slug)
+        problem_assets.invalidate(slug)
+        cache_delete_pattern(f"usage:*:{slug}:*")
         conn.close()
 # Initialize Database
 def init_db():
@@ -600,74 +1282,9 @@ def init_db():
             try:
                 cur = conn.cursor()
                 
-                # Users Table
-                execute_query(cur, """
-                    CREATE TABLE IF NOT EXISTS users (
-                        id SERIAL PRIMARY KEY,
-                        username VARCHAR(50) UNIQUE NOT NULL,
-                        password_hash TEXT NOT NULL,
-                        is_admin BOOLEAN DEFAULT FALSE,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    );
-                """)
-
-                # MIGRATION: Ensure 'is_admin' column exists for existing tables
-                try:
-                    execute_query(cur, "ALTER TABLE users ADD COLUMN IF NOT EXISTS is_admin BOOLEAN DEFAULT FALSE")
-                    conn.commit()
-                except Exception as ex:
-                    print("Migration warning (is_admin):", ex)
-                    conn.rollback()
-
-                # Problems Table
-                execute_query(cur, """
-                    CREATE TABLE IF NOT EXISTS problems (
-                        id SERIAL PRIMARY KEY,
-                        slug VARCHAR(50) UNIQUE NOT NULL,
-                        title VARCHAR(100) NOT NULL,
-                        description TEXT NOT NULL,
-                        difficulty VARCHAR(10) DEFAULT 'Easy',
-                        templates JSONB DEFAULT '{}'
-                    );
-                """)
-                
-                # MIGRATION: Ensure 'templates' column exists for existing tables
-                try:
-                   execute_query(cur, "ALTER TABLE problems ADD COLUMN IF NOT EXISTS templates JSONB DEFAULT '{}'")
-                   conn.commit()
-                except Exception as ex:
-                   print("Migration warning (templates):", ex)
-                   conn.rollback()
-
-
-                # Submissions Table
-                execute_query(cur, """
-                    CREATE TABLE IF NOT EXISTS submissions (
-                        id SERIAL PRIMARY KEY,
-                        user_id INTEGER REFERENCES users(id),
-                        language VARCHAR(10) NOT NULL,
-                        code TEXT NOT NULL,
-                        problem_id VARCHAR(50),
-                        status VARCHAR(20),
-                        output TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    );
-                """)
-
-                # Chat Sessions Table
-                execute_query(cur, """
-                    CREATE TABLE IF NOT EXISTS chat_sessions (
-                        id SERIAL PRIMARY KEY,
-                        user_id INTEGER REFERENCES users(id),
-                        problem_id VARCHAR(50),
-                        history JSONB DEFAULT '[]',
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE(user_id, problem_id)
-                    );
-                """)
+                # Tables and indexes are versioned in migrations.py
+                migrations.migrate(conn)
 
-                conn.commit()
-                
                 # Seed Problems
                 seed_problems(cur)
                 conn.commit()
@@ -676,7 +1293,8 @@ def init_db():
                 execute_query(cur, "SELECT id FROM users WHERE username = %s", ("admin",))
                 if not cur.fetchone():
                     hashed = generate_password_hash("admin123")
-                    execute_query(cur, "INSERT INTO users (username, password_hash, is_admin) VALUES (%s, %s, %s)", ("admin", hashed, True))
+                    execute_query(cur, "INSERT INTO users (username, password_hash, is_admin) VALUES (%s, %s, %s) RETURNING id", ("admin", hashed, True))
+                    execute_query(cur, "INSERT INTO user_stats (user_id) VALUES (%s)", (cur.fetchone()[0],))
                     print("Default user 'admin' created (password: admin123)")
                 else:
                     # Ensure existing admin user has is_admin flag
@@ -694,6 +1312,7 @@ def init_db():
                 cur.close()
                 conn.close()
                 print("Database initialized successfully.")
+                db_pool.warm()
                 return
             except Exception as e:
                 print("Error initializing database:", e)
@@ -980,6 +1599,7 @@ def register():
         cur = conn.cursor()
         execute_query(cur, "INSERT INTO users (username, password_hash) VALUES (%s, %s) RETURNING id", (username, hashed))
         user_id = cur.fetchone()[0]
+        execute_query(cur, "INSERT INTO user_stats (user_id) VALUES (%s)", (user_id,))
         conn.commit()
         print(f"User created: {username} (ID: {user_id})")
         token = generate_token(user_id, username, False)
@@ -1038,12 +1658,9 @@ def get_problems():
     try:
         cur = conn.cursor()
         execute_query(cur, """
-            SELECT p.slug, p.title, p.difficulty,
-                   COUNT(s.id) AS total_subs,
-                   COUNT(CASE WHEN s.status = 'Pass' THEN 1 END) AS pass_count
+            SELECT p.slug, p.title, p.difficulty, ps.submissions, ps.passes
             FROM problems p
-            LEFT JOIN submissions s ON p.slug = s.problem_id
-            GROUP BY p.id, p.slug, p.title, p.difficulty
+            LEFT JOIN problem_stats ps ON ps.problem_id = p.slug
             ORDER BY p.id ASC
         """)
         problems = []
@@ -1064,60 +1681,442 @@ def get_problems():
         conn.close()
 
 
-# --- Leaderboard Endpoint ---
-@app.route("/api/v1/leaderboard", methods=["GET"])
-def get_leaderboard():
-    cached = cache_get("leaderboard")
-    if cached:
-        return jsonify(cached)
+# --- Leaderboard ---
+# Rankings live in Redis sorted sets, updated as submissions are recorded, so
+# a page is a ZREVRANGE and "my rank" a ZREVRANK instead of aggregating every
+# submission. There is one set for all time and one per calendar week and
+# month. In a window, "solved" counts problems first solved during it.
+#
+# The ordering (most solved, then most accepted submissions, then fewest
+# submissions) is packed into one score so that each submission is a single
+# ZINCRBY:
+#     solved * 10^12 + passes * 10^6 + (999999 - submissions)
+# which is exact in a double while solved < 9000 and passes/submissions < 10^6.
+#
+# A rebuild holds <key>:lock and raises <key>:rebuilding before it takes its
+# Postgres snapshot. While that flag is up, leaderboard_record() also logs each
+# increment to <key>:pending, and the rebuild replays the ones its snapshot did
+# not see onto the new set before swapping it in.
+LEADERBOARD_WINDOWS = ("all", "week", "month")
+LB_SOLVED_WEIGHT = 10 ** 12
+LB_PASS_WEIGHT = 10 ** 6
+LB_SUBMISSION_BASE = 10 ** 6 - 1
+# Past windows stay readable for a while, then expire
+LEADERBOARD_TTL = {"week": 15 * 86400, "month": 62 * 86400}
+LEADERBOARD_PAGE_MAX = 100
+LEADERBOARD_LOCK_TTL = 300  # seconds; a rebuild still holding the lock after this is presumed dead
+
+def leaderboard_key(window, day=None):
+    day = day or dt.date.today()
+    if window == "week":
+        year, week, _ = day.isocalendar()
+        return f"lb:week:{year}-W{week:02d}"
+    if window == "month":
+        return f"lb:month:{day:%Y-%m}"
+    return "lb:all"
+
+def leaderboard_bounds(window, day):
+    """[start, end) dates of the window containing `day`; None for all time."""
+    if window == "week":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=7)
+    if window == "month":
+        start = day.replace(day=1)
+        return start, (start + timedelta(days=32)).replace(day=1)
+    return None
 
+def leaderboard_score(solved, passes, submissions):
+    return solved * LB_SOLVED_WEIGHT + passes * LB_PASS_WEIGHT + LB_SUBMISSION_BASE - submissions
+
+def leaderboard_decode(score):
+    score = int(score)
+    solved, rest = divmod(score, LB_SOLVED_WEIGHT)
+    passes, rest = divmod(rest, LB_PASS_WEIGHT)
+    return solved, passes, LB_SUBMISSION_BASE - rest
+
+def leaderboard_record(user_id, passed, new_solve, day, sub_id):
+    """Count one recorded submission in every window it falls in."""
+    delta = new_solve * LB_SOLVED_WEIGHT + passed * LB_PASS_WEIGHT - 1
+    keys = [leaderboard_key(window, day) for window in LEADERBOARD_WINDOWS]
+    flags = [f"{key}:rebuilding" for key in keys]
+    entry = json.dumps({"id": sub_id, "user": user_id, "delta": delta})
+    with redis_client.pipeline() as pipe:
+        while True:
+            try:
+                # A rebuild starting or finishing in between makes us look again
+                pipe.watch(*flags)
+                rebuilding = pipe.mget(flags)
+                pipe.multi()
+                for window, key, active in zip(LEADERBOARD_WINDOWS, keys, rebuilding):
+                    pipe.zadd(key, {user_id: LB_SUBMISSION_BASE}, nx=True)
+                    pipe.zincrby(key, delta, user_id)
+                    if window in LEADERBOARD_TTL:
+                        pipe.expire(key, LEADERBOARD_TTL[window])
+                    if active:
+                        pipe.rpush(f"{key}:pending", entry)
+                        pipe.expire(f"{key}:pending", LEADERBOARD_LOCK_TTL)
+                pipe.execute()
+                return
+            except redis.WatchError:
+                continue
+
+def leaderboard_forget(user_id):
+    pipe = redis_client.pipeline()
+    for window in LEADERBOARD_WINDOWS:
+        pipe.zrem(leaderboard_key(window), user_id)
+    pipe.execute()
+
+def _replay_unseen(cur, staging, entries):
+    """Apply logged increments whose submissions the rebuild's snapshot does not contain."""
+    execute_query(cur, "SELECT id FROM submissions WHERE id = ANY(%s)", ([e["id"] for e in entries],))
+    seen = {row[0] for row in cur.fetchall()}
+    pipe = redis_client.pipeline()
+    for e in entries:
+        if e["id"] not in seen:
+            pipe.zadd(staging, {e["user"]: LB_SUBMISSION_BASE}, nx=True)
+            pipe.zincrby(staging, e["delta"], e["user"])
+    pipe.execute()
+
+def rebuild_leaderboard(window, day=None, wait=True):
+    """Recompute one window from Postgres and swap it in. Returns the number of ranked users.
+
+    Submissions recorded while it runs are replayed onto the new set unless
+    its snapshot already counted them. Returns None without rebuilding if
+    another rebuild of the window holds the lock and `wait` is False (or it
+    is held for longer than LEADERBOARD_LOCK_TTL).
+    """
+    day = day or dt.date.today()
+    key = leaderboard_key(window, day)
+    bounds = leaderboard_bounds(window, day)
+    lock = redis_client.lock(f"{key}:lock", timeout=LEADERBOARD_LOCK_TTL, blocking_timeout=LEADERBOARD_LOCK_TTL)
+    if not lock.acquire(blocking=wait):
+        return None
+    flag, pending = f"{key}:rebuilding", f"{key}:pending"
+    staging = f"{key}:rebuild:{uuid.uuid4().hex[:8]}"
+    conn = None
+    try:
+        # Raised before the snapshot, so every increment it misses gets logged
+        redis_client.set(flag, 1, ex=LEADERBOARD_LOCK_TTL)
+        conn = get_db_connection()
+        cur = conn.cursor()
+        # The aggregate and the replay checks must see the same snapshot
+        execute_query(cur, "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        if bounds is None:
+            execute_query(cur, "SELECT user_id, solved, passes, submissions FROM user_stats WHERE submissions > 0")
+        else:
+            execute_query(cur, """
+                WITH activity AS (
+                    SELECT user_id, COUNT(*) AS submissions, COUNT(*) FILTER (WHERE status = 'Pass') AS passes
+                    FROM submissions
+                    WHERE user_id IS NOT NULL AND created_at >= %(start)s AND created_at < %(end)s
+                    GROUP BY user_id
+                ), first_solves AS (
+                    SELECT user_id, COUNT(*) AS solved FROM (
+                        SELECT user_id, problem_id, MIN(created_at) AS first_pass
+                        FROM submissions WHERE status = 'Pass' AND user_id IN (SELECT user_id FROM activity)
+                        GROUP BY user_id, problem_id
+                    ) f
+                    WHERE first_pass >= %(start)s AND first_pass < %(end)s
+                    GROUP BY user_id
+                )
+                SELECT a.user_id, COALESCE(f.solved, 0), a.passes, a.submissions
+                FROM activity a LEFT JOIN first_solves f ON f.user_id = a.user_id
+            """, {"start": bounds[0], "end": bounds[1]})
+        rows = cur.fetchall()
+
+        pipe = redis_client.pipeline()
+        for i in range(0, len(rows), 1000):
+            pipe.zadd(staging, {r[0]: leaderboard_score(r[1], r[2], r[3]) for r in rows[i:i + 1000]})
+        pipe.expire(staging, LEADERBOARD_LOCK_TTL)  # in case we die before the swap
+        pipe.execute()
+
+        replayed = 0
+        while True:
+            entries = [json.loads(e) for e in redis_client.lrange(pending, replayed, -1)]
+            if entries:
+                _replay_unseen(cur, staging, entries)
+                replayed += len(entries)
+                continue
+            # Swap only if nothing was logged since the last look
+            with redis_client.pipeline() as pipe:
+                try:
+                    pipe.watch(pending)
+                    if pipe.llen(pending) != replayed:
+                        continue
+                    has_rows = pipe.exists(staging)
+                    pipe.multi()
+                    if has_rows:
+                        pipe.rename(staging, key)
+                    else:
+                        pipe.delete(key)
+                    pipe.delete(flag, pending)
+                    pipe.set(f"{key}:built", int(time.time()))
+                    if window in LEADERBOARD_TTL:
+                        pipe.expire(key, LEADERBOARD_TTL[window])
+                        pipe.expire(f"{key}:built", LEADERBOARD_TTL[window])
+                    else:
+                        pipe.persist(key)
+                    pipe.execute()
+                    break
+                except redis.WatchError:
+                    continue
+        return len(rows)
+    except Exception:
+        redis_client.delete(flag, pending, staging)
+        raise
+    finally:
+        if conn is not None:
+            conn.close()
+        try:
+            lock.release()
+        except redis.exceptions.LockError as e:
+            print(f"Leaderboard lock for {key} lost during rebuild: {e}")
+
+def rebuild_leaderboards():
+    for window in LEADERBOARD_WINDOWS:
+        rebuild_leaderboard(window)
+
+def ensure_leaderboard(window):
+    """Key of the current `window`, rebuilt from Postgres the first time it is needed."""
+    key = leaderboard_key(window)
+    if not redis_client.exists(f"{key}:built"):
+        # One request builds it; the others serve the live increments meanwhile
+        rebuild_leaderboard(window, wait=False)
+    return key
+
+def leaderboard_entries(ranked, first_rank):
+    """Leaderboard rows for [(user_id, score)] starting at rank `first_rank`."""
+    if not ranked:
+        return []
+    user_ids = [int(uid) for uid, _ in ranked]
     conn = get_db_connection()
     try:
         cur = conn.cursor()
+        execute_query(cur, """
+            SELECT u.id, u.username, (SELECT MAX(day) FROM user_activity a WHERE a.user_id = u.id)
+            FROM users u WHERE u.id = ANY(%s)
+        """, (user_ids,))
+        users = {row[0]: row[1:] for row in cur.fetchall()}
+    finally:
+        conn.close()
 
-        # Get total problems count first
-        execute_query(cur, "SELECT COUNT(*) FROM problems")
-        total_problems = cur.fetchone()[0]
+    entries = []
+    for rank, (uid, score) in enumerate(ranked, start=first_rank):
+        if int(uid) not in users:
+            continue
+        username, last_active = users[int(uid)]
+        solved, passes, submissions = leaderboard_decode(score)
+        entries.append({
+            "rank": rank,
+            "user_id": int(uid),
+            "username": username,
+            "solved": solved,
+            "total_submissions": submissions,
+            "pass_rate": round((passes / submissions) * 100) if submissions > 0 else 0,
+            "last_active": str(last_active) if last_active else None,
+        })
+    return entries
 
-        execute_query(cur, """
-            SELECT 
-                u.id,
-                u.username,
-                COUNT(DISTINCT CASE WHEN s.status = 'Pass' THEN s.problem_id END) AS solved,
-                COUNT(s.id) AS total_submissions,
-                COUNT(CASE WHEN s.status = 'Pass' THEN 1 END) AS pass_count,
-                MAX(s.created_at) AS last_active
-            FROM users u
-            LEFT JOIN submissions s ON u.id = s.user_id
-            GROUP BY u.id, u.username
-            ORDER BY solved DESC, pass_count DESC, total_submissions ASC
-            LIMIT 100
-        """)
+def _leaderboard_window():
+    window = request.args.get("window", "all")
+    if window not in LEADERBOARD_WINDOWS:
+        return None
+    return window
 
-        leaderboard = []
-        rank = 0
-        for row in cur.fetchall():
-            rank += 1
-            total_subs = row[3] or 0
-            pass_ct = row[4] or 0
-            pass_rate = round((pass_ct / total_subs) * 100) if total_subs > 0 else 0
-            leaderboard.append({
-                "rank": rank,
-                "user_id": row[0],
-                "username": row[1],
-                "solved": row[2] or 0,
-                "total_submissions": total_subs,
-                "pass_rate": pass_rate,
-                "last_active": str(row[5]) if row[5] else None,
-            })
+@app.route("/api/v1/leaderboard", methods=["GET"])
+def get_leaderboard():
+    """One page of a leaderboard: ?window=all|week|month&limit=50&cursor=<next_cursor>."""
+    window = _leaderboard_window()
+    if window is None:
+        return jsonify({"error": f"window must be one of {', '.join(LEADERBOARD_WINDOWS)}"}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", 50)), 1), LEADERBOARD_PAGE_MAX)
+        cursor = max(int(request.args.get("cursor", 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit and cursor must be integers"}), 400
+
+    key = ensure_leaderboard(window)
+    pipe = redis_client.pipeline()
+    pipe.zrevrange(key, cursor, cursor + limit - 1, withscores=True)
+    pipe.zcard(key)
+    ranked, total = pipe.execute()
+    return jsonify({
+        "window": window,
+        "entries": leaderboard_entries(ranked, cursor + 1),
+        "total": total,
+        "next_cursor": cursor + limit if cursor + limit < total else None,
+    })
 
-        cache_set("leaderboard", leaderboard, ttl=120)
-        return jsonify(leaderboard)
+@app.route("/api/v1/leaderboard/me", methods=["GET"])
+@require_auth
+def get_my_rank():
+    """The caller's rank in a window, or rank null before their first submission in it."""
+    window = _leaderboard_window()
+    if window is None:
+        return jsonify({"error": f"window must be one of {', '.join(LEADERBOARD_WINDOWS)}"}), 400
+    key = ensure_leaderboard(window)
+    pipe = redis_client.pipeline()
+    pipe.zrevrank(key, g.user_id)
+    pipe.zscore(key, g.user_id)
+    pipe.zcard(key)
+    rank, score, total = pipe.execute()
+    if rank is None:
+        return jsonify({"window": window, "rank": None, "total": total})
+    entry = leaderboard_entries([(g.user_id, score)], rank + 1)
+    return jsonify({"window": window, "total": total, **(entry[0] if entry else {"rank": rank + 1})})
+
+
+# --- Statistics Counters ---
+# Per-user, per-problem and per-day counts kept next to submissions so the
+# stats, achievements and problem list endpoints read a few rows instead of
+# aggregating submission history. judge_submission() updates them in the
+# transaction that records a submission; anything that rewrites or deletes
+# submissions (rejudge, deleting a user or problem) calls repair_stats() for
+# the rows it touched. `python repair_stats.py` rebuilds them from scratch.
+STATS_TABLES = "user_problem_stats, user_stats, problem_stats, user_activity"  # lock order
+
+def repair_stats(cur, user_ids=None, problem_ids=None):
+    """Recompute counter rows from submissions: everything, or only the rows of
+    `user_ids` and `problem_ids`. Runs in the caller's transaction."""
+    full = user_ids is None and problem_ids is None
+    # Holds off concurrent judge_submission() counter updates until commit, so a
+    # new submission is either part of the rebuild or counted on top of it
+    execute_query(cur, f"LOCK TABLE {STATS_TABLES} IN SHARE ROW EXCLUSIVE MODE")
+
+    if full or user_ids:
+        scope, params = ("TRUE", None) if full else ("user_id = ANY(%s)", (list(user_ids),))
+        for table in ("user_problem_stats", "user_stats", "user_activity"):
+            execute_query(cur, f"DELETE FROM {table} WHERE {scope}", params)
+        execute_query(cur, f"""
+            INSERT INTO user_problem_stats (user_id, problem_id, submissions, passes)
+            SELECT user_id, problem_id, COUNT(*), COUNT(*) FILTER (WHERE status = 'Pass')
+            FROM submissions WHERE user_id IS NOT NULL AND problem_id IS NOT NULL AND {scope}
+            GROUP BY user_id, problem_id
+        """, params)
+        execute_query(cur, f"""
+            INSERT INTO user_activity (user_id, day, submissions)
+            SELECT user_id, DATE(created_at), COUNT(*)
+            FROM submissions WHERE user_id IS NOT NULL AND created_at IS NOT NULL AND {scope}
+            GROUP BY user_id, DATE(created_at)
+        """, params)
+        execute_query(cur, f"""
+            INSERT INTO user_stats (user_id, submissions, passes, attempted, solved, solved_by_difficulty, last_active)
+            SELECT ups.user_id, SUM(ups.submissions), SUM(ups.passes), COUNT(*),
+                   COUNT(*) FILTER (WHERE ups.passes > 0),
+                   COALESCE((SELECT jsonb_object_agg(d.difficulty, d.solved) FROM (
+                       SELECT p.difficulty, COUNT(*) AS solved FROM user_problem_stats x
+                       JOIN problems p ON p.slug = x.problem_id
+                       WHERE x.user_id = ups.user_id AND x.passes > 0 AND p.difficulty IS NOT NULL
+                       GROUP BY p.difficulty) d), '{{}}'),
+                   (SELECT MAX(day) FROM user_activity a WHERE a.user_id = ups.user_id)
+            FROM user_problem_stats ups WHERE {scope}
+            GROUP BY ups.user_id
+        """, params)
+        # Users without submissions keep a zero row (the admin user list joins on it)
+        execute_query(cur, f"""
+            INSERT INTO user_stats (user_id) SELECT id FROM users
+            WHERE {"TRUE" if full else "id = ANY(%s)"}
+            ON CONFLICT (user_id) DO NOTHING
+        """, params)
+
+    if full or problem_ids:
+        scope, params = ("TRUE", None) if full else ("problem_id = ANY(%s)", (list(problem_ids),))
+        execute_query(cur, f"DELETE FROM problem_stats WHERE {scope}", params)
+        execute_query(cur, f"""
+            INSERT INTO problem_stats (problem_id, submissions, passes)
+            SELECT problem_id, COUNT(*), COUNT(*) FILTER (WHERE status = 'Pass')
+            FROM submissions WHERE problem_id IS NOT NULL AND {scope}
+            GROUP BY problem_id
+        """, params)
+
+
+# --- Dashboard Rollups ---
+# The admin dashboard's counters and charts read pre-aggregated rows instead
+# of scanning submissions: hourly_rollups holds submissions and passes per hour
+# and language, daily_rollups the per-day totals plus active and new users.
+# rollup_refresher() recomputes the trailing ROLLUP_LOOKBACK_HOURS every
+# ROLLUP_INTERVAL seconds. Recomputing those hours, rather than adding what is
+# new since a watermark, also picks up submissions committed after the previous
+# refresh read their hour. Code that rewrites or deletes older submissions
+# (rejudge, deleting a user or problem) refreshes from the earliest one touched.
+ROLLUP_INTERVAL = int(os.getenv("ROLLUP_INTERVAL", "60"))
+ROLLUP_LOOKBACK_HOURS = 2
+ROLLUP_LOCK_ID = 4_177_202  # pg_advisory_xact_lock key; next to migrations.LOCK_ID
+
+def refresh_rollups(since=None):
+    """Recompute rollup rows from the hour containing `since` onwards.
+
+    Defaults to the last ROLLUP_LOOKBACK_HOURS, or back to the newest hourly
+    row if the refresher has not run for longer. dt.datetime.min rebuilds
+    everything.
+    """
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        # One refresh at a time across processes; the loser recomputes after it
+        execute_query(cur, "SELECT pg_advisory_xact_lock(%s)", (ROLLUP_LOCK_ID,))
+        # Never earlier than the first user or submission, so a full rebuild
+        # does not add empty days back to year 1
+        execute_query(cur, """
+            SELECT date_trunc('hour', GREATEST(
+                COALESCE(%s, LEAST(LOCALTIMESTAMP - make_interval(hours => %s),
+                                   (SELECT MAX(hour) FROM hourly_rollups))),
+                LEAST((SELECT MIN(created_at) FROM users), (SELECT MIN(created_at) FROM submissions))))
+        """, (since, ROLLUP_LOOKBACK_HOURS))
+        start = cur.fetchone()[0]
+
+        execute_query(cur, "DELETE FROM hourly_rollups WHERE hour >= %s", (start,))
+        execute_query(cur, """
+            INSERT INTO hourly_rollups (hour, language, submissions, passes)
+            SELECT date_trunc('hour', created_at), language, COUNT(*), COUNT(*) FILTER (WHERE status = 'Pass')
+            FROM submissions WHERE created_at >= %s
+            GROUP BY 1, 2
+        """, (start,))
+        # Whole days from the one containing `start`; its earlier hours are
+        # already in hourly_rollups
+        execute_query(cur, "DELETE FROM daily_rollups WHERE day >= %s::date", (start,))
+        execute_query(cur, """
+            INSERT INTO daily_rollups (day, submissions, passes, active_users, new_users, languages)
+            SELECT d.day, COALESCE(h.submissions, 0), COALESCE(h.passes, 0),
+                   (SELECT COUNT(*) FROM user_activity a WHERE a.day = d.day),
+                   (SELECT COUNT(*) FROM users u WHERE u.created_at >= d.day AND u.created_at < d.day + 1),
+                   COALESCE(h.languages, '{}')
+            FROM (SELECT generate_series(%(start)s::date, CURRENT_DATE, INTERVAL '1 day')::date AS day) d
+            LEFT JOIN (
+                SELECT day, SUM(n) AS submissions, SUM(p) AS passes, jsonb_object_agg(language, n) AS languages
+                FROM (SELECT hour::date AS day, language, SUM(submissions) AS n, SUM(passes) AS p
+                      FROM hourly_rollups WHERE hour >= %(start)s::date GROUP BY 1, 2) l
+                GROUP BY day
+            ) h ON h.day = d.day
+        """, {"start": start})
+        conn.commit()
     finally:
         conn.close()
 
+def schedule_rollup_refresh(since):
+    """refresh_rollups(since) in the background, for request handlers."""
+    def run():
+        try:
+            refresh_rollups(since)
+        except Exception as e:
+            print(f"Rollup refresh error: {e}")
+    threading.Thread(target=run, daemon=True).start()
+
+def rollup_refresher():
+    while True:
+        try:
+            refresh_rollups()
+        except Exception as e:
+            print(f"Rollup refresh error: {e}")
+        time.sleep(ROLLUP_INTERVAL)
+
+
+# --- Profile ---
+# The profile page, /stats and /achievements are all views of one payload,
+# built from a single statement over the counter tables and cached under one
+# key that judge_submission() and rejudges invalidate.
+PROFILE_TTL = 120
 
-# --- Achievements Endpoint ---
 ACHIEVEMENT_DEFS = [
     {"id": "first_steps", "title": "First Steps", "desc": "Solve your first problem", "icon": "flag"},
     {"id": "on_fire", "title": "On Fire", "desc": "Achieve a 3-day streak", "icon": "flame"},
@@ -1129,237 +2128,105 @@ ACHIEVEMENT_DEFS = [
     {"id": "perfectionist", "title": "Perfectionist", "desc": "Achieve 80%+ pass rate (min 10 subs)", "icon": "star"},
 ]
 
-@app.route("/api/v1/achievements", methods=["GET"])
-@require_auth
-def get_achievements():
-    user_id = g.user_id
-    cache_key = f"achievements:{user_id}"
-    cached = cache_get(cache_key)
-    if cached:
-        return jsonify(cached)
-
-
+def profile_key(user_id):
+    return f"profile:{user_id}"
+
+def earned_achievements(stats):
+    earned = set()
+    best_streak = max(stats["current_streak"], stats["longest_streak"])
+    pass_rate = round((stats["passes"] / stats["total_submissions"]) * 100) if stats["total_submissions"] > 0 else 0
+    if stats["solved"] > 0:
+        earned.add("first_steps")
+    if best_streak >= 3:
+        earned.add("on_fire")
+    if stats["by_difficulty"].get("Hard", {}).get("solved", 0) > 0:
+        earned.add("big_brain")
+    if stats["solved"] >= stats["total_problems"] and stats["total_problems"] > 0:
+        earned.add("champion")
+    if stats["total_submissions"] >= 100:
+        earned.add("centurion")
+    if best_streak >= 7:
+        earned.add("consistent")
+    if stats["attempted"] >= 5:
+        earned.add("tenacious")
+    if pass_rate >= 80 and stats["total_submissions"] >= 10:
+        earned.add("perfectionist")
+    return earned
+
+def build_profile(user_id):
     conn = get_db_connection()
     try:
         cur = conn.cursor()
+        execute_prepared(cur, "user_profile", (user_id,))
+        counts, total_problems, diff_totals, calendar, longest, current, recent = cur.fetchone()
+    finally:
+        conn.close()
 
-        # Solved count
-        execute_query(cur, """
-            SELECT COUNT(DISTINCT problem_id) FROM submissions
-            WHERE user_id = %s AND status = 'Pass'
-        """, (user_id,))
-        solved = cur.fetchone()[0]
-
-        # Total problems
-        execute_query(cur, "SELECT COUNT(*) FROM problems")
-        total_problems = cur.fetchone()[0]
+    counts = counts or {"submissions": 0, "passes": 0, "attempted": 0, "solved": 0, "solved_by_difficulty": {}}
+    total_submissions = counts["submissions"]
+    stats = {
+        "total_problems": total_problems,
+        "solved": counts["solved"],
+        "attempted": counts["attempted"],
+        "pass_rate": round((counts["passes"] / total_submissions) * 100, 1) if total_submissions > 0 else 0,
+        "total_submissions": total_submissions,
+        "passes": counts["passes"],
+        "by_difficulty": {
+            diff: {"total": total, "solved": counts["solved_by_difficulty"].get(diff, 0)}
+            for diff, total in diff_totals.items()
+        },
+        "recent_activity": calendar,
+        "current_streak": current,
+        "longest_streak": longest,
+        "active_days": sum(1 for day in calendar if day["count"] > 0),
+    }
+    earned = earned_achievements(stats)
+    return {
+        "stats": stats,
+        "achievements": [{**a, "earned": a["id"] in earned} for a in ACHIEVEMENT_DEFS],
+        "submissions": recent,
+    }
 
-        # Solved hard
-        execute_query(cur, """
-            SELECT COUNT(DISTINCT s.problem_id) FROM submissions s
-            JOIN problems p ON s.problem_id = p.slug
-            WHERE s.user_id = %s AND s.status = 'Pass' AND p.difficulty = 'Hard'
-        """, (user_id,))
-        solved_hard = cur.fetchone()[0]
-
-        # Total submissions & pass count
-        execute_query(cur, "SELECT COUNT(*) FROM submissions WHERE user_id = %s", (user_id,))
-        total_subs = cur.fetchone()[0]
-        execute_query(cur, "SELECT COUNT(*) FROM submissions WHERE user_id = %s AND status = 'Pass'", (user_id,))
-        pass_count = cur.fetchone()[0]
-        pass_rate = round((pass_count / total_subs) * 100) if total_subs > 0 else 0
-
-        # Attempted distinct problems
-        execute_query(cur, "SELECT COUNT(DISTINCT problem_id) FROM submissions WHERE user_id = %s", (user_id,))
-        attempted = cur.fetchone()[0]
-
-        # Streaks
-        execute_query(cur, """
-            SELECT DATE(created_at) as day, COUNT(*)
-            FROM submissions
-            WHERE user_id = %s AND created_at >= CURRENT_DATE - INTERVAL '364 days'
-            GROUP BY DATE(created_at)
-            ORDER BY day ASC
-        """, (user_id,))
-        activity_map = {str(row[0]): row[1] for row in cur.fetchall()}
-
-        today = datetime.now()
-        current_streak = 0
-        longest_streak = 0
-        streak = 0
-        for i in range(364, -1, -1):
-            day = (today - timedelta(days=i)).strftime('%Y-%m-%d')
-            if activity_map.get(day, 0) > 0:
-                streak += 1
-                longest_streak = max(longest_streak, streak)
-            else:
-                streak = 0
-        for i in range(0, 365):
-            day = (today - timedelta(days=i)).strftime('%Y-%m-%d')
-            if activity_map.get(day, 0) > 0:
-                current_streak += 1
-            else:
-                break
+def get_profile(user_id):
+    cached = cache_get(profile_key(user_id))
+    if cached:
+        return cached
+    profile = build_profile(user_id)
+    cache_set(profile_key(user_id), profile, ttl=PROFILE_TTL)
+    return profile
 
-        # Compute earned achievements
-        earned = set()
-        if solved > 0:
-            earned.add("first_steps")
-        if current_streak >= 3 or longest_streak >= 3:
-            earned.add("on_fire")
-        if solved_hard > 0:
-            earned.add("big_brain")
-        if solved >= total_problems and total_problems > 0:
-            earned.add("champion")
-        if total_subs >= 100:
-            earned.add("centurion")
-        if current_streak >= 7 or longest_streak >= 7:
-            earned.add("consistent")
-        if attempted >= 5:
-            earned.add("tenacious")
-        if pass_rate >= 80 and total_subs >= 10:
-            earned.add("perfectionist")
+@app.route("/api/v1/profile", methods=["GET"])
+@require_auth
+def get_user_profile():
+    """Stats, achievements and recent submissions of the caller in one response."""
+    return jsonify(get_profile(g.user_id))
 
-        result = {
-            "achievements": [
-                {**a, "earned": a["id"] in earned}
-                for a in ACHIEVEMENT_DEFS
-            ],
-            "stats": {
-                "solved": solved,
-                "total_problems": total_problems,
-                "total_submissions": total_subs,
-                "pass_rate": pass_rate,
-                "current_streak": current_streak,
-                "longest_streak": longest_streak,
-                "attempted": attempted,
-            }
+# --- Achievements Endpoint ---
+@app.route("/api/v1/achievements", methods=["GET"])
+@require_auth
+def get_achievements():
+    profile = get_profile(g.user_id)
+    stats = profile["stats"]
+    total_subs = stats["total_submissions"]
+    return jsonify({
+        "achievements": profile["achievements"],
+        "stats": {
+            "solved": stats["solved"],
+            "total_problems": stats["total_problems"],
+            "total_submissions": total_subs,
+            "pass_rate": round((stats["passes"] / total_subs) * 100) if total_subs > 0 else 0,
+            "current_streak": stats["current_streak"],
+            "longest_streak": stats["longest_streak"],
+            "attempted": stats["attempted"],
         }
-        cache_set(cache_key, result, ttl=120)
-        return jsonify(result)
-    finally:
-        conn.close()
+    })
 
 
 # --- Stats Endpoint ---
 @app.route("/api/v1/stats", methods=["GET"])
 @require_auth
 def get_stats():
-    user_id = g.user_id
-    
-    # Cache user stats for 2 minutes
-    cache_key = f"stats:user:{user_id}"
-    cached = cache_get(cache_key)
-    if cached:
-        return jsonify(cached)
-
-    conn = get_db_connection()
-    try:
-        cur = conn.cursor()
-
-        # Total problems
-        execute_query(cur, "SELECT COUNT(*) FROM problems")
-        total_problems = cur.fetchone()[0]
-
-        # Problems by difficulty
-        execute_query(cur, "SELECT difficulty, COUNT(*) FROM problems GROUP BY difficulty")
-        diff_totals = {row[0]: row[1] for row in cur.fetchall()}
-
-        # User's solved problems (distinct problem_ids with 'Pass' status)
-        execute_query(cur, """
-            SELECT DISTINCT problem_id FROM submissions 
-            WHERE user_id = %s AND status = 'Pass'
-        """, (user_id,))
-        solved_slugs = [row[0] for row in cur.fetchall()]
-        solved_count = len(solved_slugs)
-
-        # User's attempted problems (distinct problem_ids)
-        execute_query(cur, """
-            SELECT DISTINCT problem_id FROM submissions WHERE user_id = %s
-        """, (user_id,))
-        attempted_count = len(cur.fetchall())
-
-        # Total submissions
-        execute_query(cur, "SELECT COUNT(*) FROM submissions WHERE user_id = %s", (user_id,))
-        total_submissions = cur.fetchone()[0]
-
-        # Pass rate
-        if total_submissions > 0:
-            execute_query(cur, """
-                SELECT COUNT(*) FROM submissions 
-                WHERE user_id = %s AND status = 'Pass'
-            """, (user_id,))
-            pass_count = cur.fetchone()[0]
-            pass_rate = round((pass_count / total_submissions) * 100, 1)
-        else:
-            pass_rate = 0
-
-        # Solved by difficulty
-        by_difficulty = {}
-        for diff, total in diff_totals.items():
-            execute_query(cur, """
-                SELECT COUNT(DISTINCT s.problem_id) FROM submissions s
-                JOIN problems p ON s.problem_id = p.slug
-                WHERE s.user_id = %s AND s.status = 'Pass' AND p.difficulty = %s
-            """, (user_id, diff))
-            solved_in_diff = cur.fetchone()[0]
-            by_difficulty[diff] = {"total": total, "solved": solved_in_diff}
-
-        # Recent activity - full year (365 days)
-
-        execute_query(cur, """
-            SELECT DATE(created_at) as day, COUNT(*) 
-            FROM submissions 
-            WHERE user_id = %s AND created_at >= CURRENT_DATE - INTERVAL '364 days'
-            GROUP BY DATE(created_at) 
-            ORDER BY day ASC
-        """, (user_id,))
-        activity_map = {str(row[0]): row[1] for row in cur.fetchall()}
-        
-        today = datetime.now()
-        recent_activity = []
-        for i in range(364, -1, -1):
-            day = (today - timedelta(days=i)).strftime('%Y-%m-%d')
-            recent_activity.append({"date": day, "count": activity_map.get(day, 0)})
-
-        # Streaks
-        current_streak = 0
-        longest_streak = 0
-        streak = 0
-        for i in range(364, -1, -1):
-            day = (today - timedelta(days=i)).strftime('%Y-%m-%d')
-            if activity_map.get(day, 0) > 0:
-                streak += 1
-                longest_streak = max(longest_streak, streak)
-            else:
-                streak = 0
-        # current streak: count backwards from today
-        for i in range(0, 365):
-            day = (today - timedelta(days=i)).strftime('%Y-%m-%d')
-            if activity_map.get(day, 0) > 0:
-                current_streak += 1
-            else:
-                break
-
-        # Active days count
-        active_days = sum(1 for v in activity_map.values() if v > 0)
-
-        result = {
-            "total_problems": total_problems,
-            "solved": solved_count,
-            "attempted": attempted_count,
-            "pass_rate": pass_rate,
-            "total_submissions": total_submissions,
-            "by_difficulty": by_difficulty,
-            "recent_activity": recent_activity,
-            "current_streak": current_streak,
-            "longest_streak": longest_streak,
-            "active_days": active_days
-        }
-        cache_set(cache_key, result, ttl=120)
-        return jsonify(result)
-    finally:
-        conn.close()
+    return jsonify(get_profile(g.user_id)["stats"])
 
 # --- Submissions Endpoints ---
 @app.route("/api/v1/submissions", methods=["GET"])
@@ -1371,20 +2238,16 @@ def get_submissions():
     conn = get_db_connection()
     try:
         cur = conn.cursor()
-        execute_query(cur, """
-            SELECT id, problem_id, language, status, created_at 
-            FROM submissions 
-            WHERE user_id = %s 
-            ORDER BY created_at DESC
-            LIMIT 50
-        """, (user_id,))
+        execute_prepared(cur, "user_submissions", (user_id,))
         
         submissions = [{
             "id": row[0],
             "problem_id": row[1],
             "language": row[2],
             "status": row[3],
-            "created_at": row[4].isoformat() if row[4] else None
+            "created_at": row[4].isoformat() if row[4] else None,
+            "cpu_time_ms": row[5],
+            "peak_memory_kb": row[6]
         } for row in cur.fetchall()]
         
         return jsonify(submissions)
@@ -1444,25 +2307,1237 @@ def simplify_error_message(raw_output, lang):
     
     return raw_output
 
-# Helper: Execute code in Docker
-def execute_code_in_docker(lang, code, problem_id, user_id=None, adhoc_driver=None, adhoc_test_data=None):
-    # Wait for a slot (max 3 concurrent executions)
-    acquired = EXEC_SEMAPHORE.acquire(timeout=15)
-    if not acquired:
-        return {"error": "Server busy. Too many executions running. Please try again in a few seconds.", "status": "Queued"}
-    
-    try:
-        return _execute_code_in_docker_inner(lang, code, problem_id, user_id, adhoc_driver, adhoc_test_data)
+# --- Warm Container Pool ---
+# Creating + starting a fresh judger container costs far more than running the
+# tiny test suites we host, so keep a few network-less containers per language
+# already running. A run leases one, the pool scrubs it in the background and
+# hands it to the next run, and retires it after JUDGE_POOL_MAX_USES runs.
+JUDGE_IMAGE = "judger:latest"
+JUDGE_POOL_SIZE = int(os.getenv("JUDGE_POOL_SIZE", "2"))            # idle containers kept per language
+JUDGE_POOL_MAX_USES = int(os.getenv("JUDGE_POOL_MAX_USES", "20"))   # runs before a container is recycled
+JUDGE_POOL_IDLE_TTL = int(os.getenv("JUDGE_POOL_IDLE_TTL", "300"))  # seconds an idle container may sit unused
+JUDGE_POOL_LANGUAGES = ("python", "cpp")
+JUDGE_POOL_ID = uuid.uuid4().hex[:12]  # marks containers owned by this process
+JUDGE_POOL_MAX_AGE = int(os.getenv("JUDGE_POOL_MAX_AGE", "3600"))  # seconds before a warm container is recycled
+JUDGE_PIDS_LIMIT = int(os.getenv("JUDGE_PIDS_LIMIT", "64"))          # processes per judge container
+
+# Container labels, read by the reaper (see Container Reaper)
+LABEL_ROLE = "algoarena.role"          # judge | playground
+LABEL_OWNER = "algoarena.owner"        # JUDGE_POOL_ID of the creating process
+LABEL_RUN = "algoarena.run"            # pool container id or playground session id
+LABEL_DEADLINE = "algoarena.deadline"  # unix time after which the container may be removed
+
+def container_labels(role, run_id, deadline, **extra):
+    labels = {LABEL_ROLE: role, LABEL_OWNER: JUDGE_POOL_ID, LABEL_RUN: run_id,
+              LABEL_DEADLINE: str(int(deadline))}
+    labels.update(extra)
+    return labels
+
+# Kills everything in the container except PID 1 and wipes the workspace. Runs
+# as root; submissions run as `sandbox`, which can write nowhere else (the
+# image is mounted read-only), so nothing a run leaves behind survives this.
+POOL_SCRUB_CMD = "/bin/bash -c 'kill -9 -1 2>/dev/null; find /home/sandbox /tmp -mindepth 1 -delete'"
+
+class PooledContainer:
+    def __init__(self, con, lang, deadline):
+        self.con = con
+        self.lang = lang
+        self.uses = 0
+        self.created_at = time.time()
+        self.idle_since = self.created_at
+        self.deadline = deadline
+
+class ContainerPool:
+    """Per-language pool of pre-started judger containers."""
+
+    def __init__(self, languages, size, max_uses, idle_ttl):
+        self.size = size
+        self.max_uses = max_uses
+        self.idle_ttl = idle_ttl
+        self.lock = threading.Lock()
+        self.idle = {lang: [] for lang in languages}
+        self.starting = {lang: 0 for lang in languages}
+        self.dirty = []       # released containers waiting to be scrubbed
+        self.retiring = []    # containers waiting to be removed
+        self.wake = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.size <= 0 or self.thread:
+            return
+        self.thread = threading.Thread(target=self._maintain, daemon=True)
+        self.thread.start()
+
+    def _create(self, lang):
+        deadline = time.time() + JUDGE_POOL_MAX_AGE
+        con = client.containers.create(
+            image=JUDGE_IMAGE,
+            command=["/bin/bash", "-c", "sleep infinity"],
+            mem_limit="64m",
+            network_mode="none",
+            pids_limit=JUDGE_PIDS_LIMIT,
+            user="sandbox",
+            read_only=True,
+            # The workspace is an anonymous volume rather than a tmpfs because
+            # put_archive cannot write into tmpfs mounts
+            mounts=[docker.types.Mount("/home/sandbox", None, type="volume")],
+            # USAGE_DIR is root-only, so a submission cannot forge its own usage
+            tmpfs={"/tmp": "rw,nosuid,nodev,size=16m",
+                   USAGE_DIR: "rw,nosuid,nodev,noexec,size=64k,mode=0700"},
+            labels=container_labels("judge", uuid.uuid4().hex[:12], deadline, **{"algoarena.lang": lang}),
+            detach=True
+        )
+        try:
+            con.start()
+        except Exception:
+            con.remove(force=True, v=True)
+            raise
+        return PooledContainer(con, lang, deadline)
+
+    def lease(self, lang):
+        """Take a ready container for `lang`, creating one on a pool miss."""
+        wait_start = time.time()
+        pc = None
+        with self.lock:
+            while self.idle.get(lang) and pc is None:
+                pc = self.idle[lang].pop()
+                if time.time() > pc.deadline:
+                    self.retiring.append(pc)
+                    pc = None
+        hit = pc is not None
+        if not hit:
+            pc = self._create(lang)
+        self.wake.set()
+
+        wait_ms = round((time.time() - wait_start) * 1000, 1)
+        try:
+            redis_client.incr("pool:hits" if hit else "pool:misses")
+            redis_client.lpush("pool:lease_wait", wait_ms)
+            redis_client.ltrim("pool:lease_wait", 0, 999)  # Keep last 1000
+        except redis.RedisError:
+            pass
+        return pc
+
+    def release(self, pc, healthy=True):
+        """Hand a container back after a run. Unhealthy ones (TLE, errors) are retired."""
+        pc.uses += 1
+        with self.lock:
+            if (healthy and pc.uses < self.max_uses and time.time() < pc.deadline
+                    and self.size > 0 and pc.lang in self.idle):
+                self.dirty.append(pc)
+            else:
+                self.retiring.append(pc)
+        self.wake.set()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "idle": {lang: len(q) for lang, q in self.idle.items()},
+                "starting": dict(self.starting),
+                "scrubbing": len(self.dirty),
+                "size": self.size,
+                "max_uses": self.max_uses,
+                "idle_ttl": self.idle_ttl,
+            }
+
+    def discard(self, container_id):
+        """Forget an idle or scrubbing container (it exited). True if it was ours and not leased."""
+        with self.lock:
+            for q in list(self.idle.values()) + [self.dirty]:
+                for pc in q:
+                    if pc.con.id == container_id:
+                        q.remove(pc)
+                        return True
+        return False
+
+    def drain(self):
+        with self.lock:
+            victims = [pc for q in self.idle.values() for pc in q] + self.dirty + self.retiring
+            for q in self.idle.values():
+                q.clear()
+            self.dirty = []
+            self.retiring = []
+        for pc in victims:
+            self._remove(pc)
+
+    def _remove(self, pc):
+        try:
+            pc.con.remove(force=True, v=True)
+        except Exception:
+            pass
+
+    def _scrub(self, pc):
+        try:
+            code, _ = pc.con.exec_run(POOL_SCRUB_CMD, user="root")
+            return code == 0
+        except Exception:
+            return False
+
+    def _maintain(self):
+        while True:
+            self.wake.wait(timeout=5)
+            self.wake.clear()
+            try:
+                self._maintain_once()
+            except Exception as e:
+                print("Container pool maintenance error:", e)
+
+    def _maintain_once(self):
+        now = time.time()
+        with self.lock:
+            dirty, self.dirty = self.dirty, []
+            retiring, self.retiring = self.retiring, []
+            for lang, q in self.idle.items():
+                fresh = [pc for pc in q if now - pc.idle_since <= self.idle_ttl and now < pc.deadline]
+                retiring.extend(pc for pc in q if pc not in fresh)
+                self.idle[lang] = fresh
+
+        for pc in retiring:
+            self._remove(pc)
+
+        for pc in dirty:
+            if self._scrub(pc):
+                pc.idle_since = time.time()
+                with self.lock:
+                    if len(self.idle[pc.lang]) < self.size:
+                        self.idle[pc.lang].append(pc)
+                        continue
+            self._remove(pc)
+
+        for lang in self.idle:
+            with self.lock:
+                missing = self.size - len(self.idle[lang]) - self.starting[lang]
+                if missing <= 0:
+                    continue
+                self.starting[lang] += missing
+            for _ in range(missing):
+                try:
+                    pc = self._create(lang)
+                    with self.lock:
+                        self.idle[lang].append(pc)
+                except Exception as e:
+                    print(f"Container pool: failed to start {lang} container:", e)
+                finally:
+                    with self.lock:
+                        self.starting[lang] -= 1
+
+judge_pool = ContainerPool(JUDGE_POOL_LANGUAGES, JUDGE_POOL_SIZE, JUDGE_POOL_MAX_USES, JUDGE_POOL_IDLE_TTL)
+
+def _percentile(values, pct):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+@app.route("/api/v1/admin/judge", methods=["GET"])
+@require_admin
+def admin_judge_stats():
+    """Judge health: execution counters, run latency and warm pool effectiveness."""
+    exec_times = [float(v) for v in redis_client.lrange("exec:times", 0, -1)]
+    lease_waits = [float(v) for v in redis_client.lrange("pool:lease_wait", 0, -1)]
+    hits = int(redis_client.get("pool:hits") or 0)
+    misses = int(redis_client.get("pool:misses") or 0)
+    return jsonify({
+        "executions": {
+            "active": int(redis_client.get("exec:active") or 0),
+            "total": int(redis_client.get("exec:total") or 0),
+            "avg_seconds": round(sum(exec_times) / len(exec_times), 3) if exec_times else 0,
+            "p95_seconds": _percentile(exec_times, 95),
+        },
+        "executor": {"backend": judge_executor.name, **judge_executor.stats()},
+        "admission": admission.stats(),
+        "pool": {
+            **judge_pool.stats(),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / max(hits + misses, 1) * 100, 1),
+            "lease_wait_avg_ms": round(sum(lease_waits) / len(lease_waits), 1) if lease_waits else 0,
+            "lease_wait_p95_ms": _percentile(lease_waits, 95),
+        },
+        "cpp_compile_ms": {
+            layout: {
+                "samples": len(samples),
+                "avg": round(sum(samples) / len(samples)) if samples else 0,
+                "p95": _percentile(samples, 95),
+            }
+            for layout in ("full", "full+pch", "split", "split+pch")
+            for samples in [[float(v) for v in redis_client.lrange(f"judge:compile_ms:{layout}", 0, -1)]]
+        },
+        "asset_cache": problem_assets.stats(),
+        "binary_cache": {
+            **binary_cache.stats(),
+            "hits": int(redis_client.get("bincache:hits") or 0),
+            "misses": int(redis_client.get("bincache:misses") or 0),
+        },
+        "reaper": dict(reaper_stats),
+        "playground": playground_stats(),
+        "database": db_pool.stats(),
+    })
+
+# --- Compiled Binary Cache ---
+# Re-running unchanged C++ code should not pay for g++ again. Binaries are keyed
+# by a hash of everything that affects compilation and kept in a size-bounded
+# LRU directory on the judge host (shared by all server/worker processes).
+CPP_FLAGS = os.getenv("JUDGE_CPP_FLAGS", "-std=gnu++17")
+JUDGE_BIN_CACHE_DIR = os.getenv("JUDGE_BIN_CACHE_DIR", os.path.join(BASE_DIR, ".cache", "binaries"))
+JUDGE_BIN_CACHE_MAX_MB = int(os.getenv("JUDGE_BIN_CACHE_MAX_MB", "256"))
+
+class CompiledBinaryCache:
+    """Content-addressed, size-bounded LRU store of compiled binaries.
+
+    Every process sharing the directory evicts from it, so its size is measured
+    on disk rather than counted per process. A file's mtime is its last use.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._evict()
+
+    @staticmethod
+    def key(source, driver, flags, image_id):
+        h = hashlib.sha256()
+        for part in (source, driver, flags.encode("utf-8"), image_id.encode("utf-8")):
+            h.update(len(part).to_bytes(8, "big"))
+            h.update(part)
+        return h.hexdigest()
+
+    def _scan(self):
+        """[(mtime, name, size)] of the cached binaries, least recently used first."""
+        found = []
+        for entry in os.scandir(self.directory):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue  # removed by another process meanwhile
+            if entry.name.endswith(".tmp"):
+                # Left behind by a process that died mid-write
+                if time.time() - st.st_mtime > 3600:
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+                continue
+            found.append((st.st_mtime, entry.name, st.st_size))
+        return sorted(found)
+
+    def get(self, key):
+        path = os.path.join(self.directory, key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # marks it recently used for every process
+            return data
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        path = os.path.join(self.directory, key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        entries = self._scan()
+        total = sum(size for _, _, size in entries)
+        for _, name, size in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass  # another process evicted it first
+            total -= size
+
+    def stats(self):
+        entries = self._scan()
+        return {"entries": len(entries), "bytes": sum(size for _, _, size in entries), "max_bytes": self.max_bytes}
+
+binary_cache = CompiledBinaryCache(JUDGE_BIN_CACHE_DIR, JUDGE_BIN_CACHE_MAX_MB * 1024 * 1024)
+
+# --- Problem Asset Cache ---
+# Drivers, test data and prebuilt objects are read once per process instead of
+# on every run. Each entry remembers the mtime/size of the files it was loaded
+# from and reloads when any of them changes (admin edits also drop the entry
+# explicitly). Entries keep ready-made tar members per (language, layout) so a
+# run only appends its solution file. LRU-bounded by JUDGE_ASSET_CACHE_MB.
+JUDGE_ASSET_CACHE_MB = int(os.getenv("JUDGE_ASSET_CACHE_MB", "64"))
+ASSET_FILES = ("driver.py", "driver.cpp", "test_data.txt", "problem.json",
+               "build/meta.json", "build/driver.o", "build/user_tu.cpp")
+TAR_END = b"\0" * (2 * tarfile.BLOCKSIZE)
+
+def tar_member(name, data, mode=0o644):
+    """One tar member (header + padded data) that can be concatenated with others."""
+    info = tarfile.TarInfo(name=name)
+    info.size = len(data)
+    info.mode = mode
+    info.mtime = int(time.time())
+    padding = -len(data) % tarfile.BLOCKSIZE
+    return info.tobuf(tarfile.GNU_FORMAT) + data + b"\0" * padding
+
+def driver_name(lang):
+    return "driver.py" if lang == "python" else "driver.cpp"
+
+class ProblemAssets:
+    def __init__(self, problem_id, files, stamp):
+        self.problem_id = problem_id
+        self.files = files
+        self.stamp = stamp
+        self.prefixes = {}
+        self.records = None  # per-case split of test_data.txt for sharding; not counted in size
+        try:
+            self.meta = json.loads(files.get("problem.json") or b"{}")
+        except ValueError as e:
+            print(f"  WARNING: Bad problem.json for {problem_id}: {e}")
+            self.meta = {}
+
+    @property
+    def size(self):
+        return sum(len(v) for v in self.files.values()) + sum(len(v) for v in self.prefixes.values())
+
+    def driver(self, lang):
+        return self.files.get(driver_name(lang), b"")
+
+    def cpp_build(self, image_id):
+        """(driver.o, user_tu.cpp) if the prebuilt driver matches the current driver/flags/image."""
+        try:
+            meta = json.loads(self.files["build/meta.json"])
+            if (meta.get("driver_sha256") != _sha256(self.files["driver.cpp"])
+                    or meta.get("flags") != f"{CPP_FLAGS} {CPP_PCH_FLAGS}"
+                    or meta.get("image") != image_id):
+                return None
+            return self.files["build/driver.o"], self.files["build/user_tu.cpp"]
+        except (KeyError, ValueError):
+            return None
+
+    def tar_prefix(self, lang, with_tests=True, split=False):
+        """Tar members for the driver (+ test data, + prebuilt objects); no end-of-archive marker."""
+        key = (lang, with_tests, split)
+        prefix = self.prefixes.get(key)
+        if prefix is None:
+            parts = []
+            if driver_name(lang) in self.files:
+                parts.append(tar_member(driver_name(lang), self.driver(lang)))
+            if with_tests and "test_data.txt" in self.files:
+                parts.append(tar_member("test_data.txt", self.files["test_data.txt"]))
+            if split:
+                parts.append(tar_member("driver.o", self.files["build/driver.o"]))
+                parts.append(tar_member("user_tu.cpp", self.files["build/user_tu.cpp"]))
+            prefix = self.prefixes[key] = b"".join(parts)
+        return prefix
+
+class ProblemAssetCache:
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # problem_id -> ProblemAssets
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _stamp(self, problem_id):
+        stamp = []
+        for name in ASSET_FILES:
+            try:
+                st = os.stat(os.path.join(self.root, problem_id, name))
+                stamp.append((name, st.st_mtime_ns, st.st_size))
+            except OSError:
+                pass
+        return tuple(stamp)
+
+    def get(self, problem_id):
+        stamp = self._stamp(problem_id)
+        with self.lock:
+            entry = self.entries.get(problem_id)
+            if entry is not None and entry.stamp == stamp:
+                self.entries.move_to_end(problem_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        if not stamp:
+            # Unknown problem: not cached, or every bogus problem_id would take a slot
+            return ProblemAssets(problem_id, {}, stamp)
+        files = {}
+        for name, _, _ in stamp:
+            try:
+                with open(os.path.join(self.root, problem_id, name), "rb") as f:
+                    files[name] = f.read()
+            except OSError:
+                pass
+        entry = ProblemAssets(problem_id, files, stamp)
+        with self.lock:
+            self._drop(problem_id)
+            self.entries[problem_id] = entry
+            self.total += entry.size
+            self._evict()
+        return entry
+
+    def prefix(self, entry, lang, with_tests=True, split=False):
+        """entry.tar_prefix(), accounted against the cache size."""
+        with self.lock:
+            before = entry.size
+            prefix = entry.tar_prefix(lang, with_tests, split)
+            if self.entries.get(entry.problem_id) is entry:
+                self.total += entry.size - before
+                self._evict()
+            return prefix
+
+    def invalidate(self, problem_id):
+        with self.lock:
+            self._drop(problem_id)
+
+    def _drop(self, problem_id):
+        old = self.entries.pop(problem_id, None)
+        if old is not None:
+            self.total -= old.size
+
+    def _evict(self):
+        # The newest entry stays even if it alone is over budget; it is in use
+        while self.total > self.max_bytes and len(self.entries) > 1:
+            _, old = self.entries.popitem(last=False)
+            self.total -= old.size
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": self.total, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+problem_assets = ProblemAssetCache(PROBLEMS_DIR, JUDGE_ASSET_CACHE_MB * 1024 * 1024)
+
+# --- Prebuilt C++ Drivers ---
+# driver.cpp files `#include "solution.cpp"`, so every submission used to compile
+# the driver and its headers from scratch. The judger image ships a precompiled
+# header for the common STL set, and when a problem is created or updated its
+# driver is compiled once into build/driver.o against a generated stand-in for
+# `Solution` that forwards to a free function. A submission then only compiles
+# its own translation unit (solution + that function) and links.
+JUDGE_CPP_PCH = os.getenv("JUDGE_CPP_PCH", "true").lower() == "true"
+# The driver runtime (algoarena_io.hpp) lives next to the PCH, so the include
+# path is needed with or without it.
+CPP_RUNTIME_FLAGS = "-I/opt/algoarena/include"
+CPP_PCH_FLAGS = f"{CPP_RUNTIME_FLAGS} -include judge_pch.h" if JUDGE_CPP_PCH else CPP_RUNTIME_FLAGS
+CPP_PRELUDE = "#include <iostream>\n#include <vector>\n#include <string>\n#include <algorithm>\nusing namespace std;\n"
+CPP_METHOD_RE = re.compile(r"public:\s*(?P<ret>[\w:<>,\s\*&]*?[\w>\*&])\s*\b(?P<name>\w+)\s*\((?P<params>[^)]*)\)\s*\{")
+
+# A driver that fails to prebuild is remembered until the driver, flags or image
+# change, so submissions don't lease a container to fail the same build again.
+PREBUILD_FAILURE_TTL = 86400
+# With the judge queue, prebuilds are jobs for the workers: the web process
+# does not run the pool loop that recycles the containers it releases.
+PREBUILD_QUEUED_TTL = 600  # seconds a queued prebuild holds off duplicates
+
+_prebuilds_running = set()
+_prebuilds_lock = threading.Lock()
+
+def parse_cpp_method(cpp_template):
+    """Extract (return type, method name, [(param type, param name)]) from a one-method C++ template."""
+    m = CPP_METHOD_RE.search(cpp_template or "")
+    if not m:
+        return None
+    params = []
+    depth = 0
+    current = ""
+    for ch in m.group("params") + ",":
+        if ch == "<":
+            depth += 1
+        elif ch == ">":
+            depth -= 1
+        if ch == "," and depth == 0:
+            if current.strip():
+                name = re.search(r"(\w+)\s*$", current)
+                if not name:
+                    return None
+                params.append((current[:name.start()].strip(), name.group(1)))
+            current = ""
+        else:
+            current += ch
+    return m.group("ret").strip(), m.group("name"), params
+
+def generate_cpp_split_sources(cpp_template):
+    """Return (stand-in solution.cpp for the driver, per-submission translation unit), or None."""
+    parsed = parse_cpp_method(cpp_template)
+    if not parsed:
+        return None
+    ret, name, params = parsed
+    signature = ", ".join(f"{ptype} {pname}" for ptype, pname in params)
+    args = ", ".join(pname for _, pname in params)
+    forward = f"{ret} algoarena_{name}({signature})"
+    stand_in = (
+        f"{CPP_PRELUDE}\n"
+        f"{forward};\n\n"
+        "namespace {\n"
+        "struct Solution {\n"
+        f"    {ret} {name}({signature}) {{ return algoarena_{name}({args}); }}\n"
+        "};\n"
+        "}\n"
+    )
+    user_tu = (
+        f"{CPP_PRELUDE}\n"
+        '#include "solution.cpp"\n\n'
+        f"{forward} {{\n"
+        "    Solution sol;\n"
+        f"    return sol.{name}({args});\n"
+        "}\n"
+    )
+    return stand_in, user_tu
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def prebuild_failure_key(slug):
+    return f"prebuild:failed:{slug}"
+
+def record_prebuild_failure(slug, driver, image_id=None):
+    """Remember a failed prebuild; image_id None means it fails on any image (e.g. unparseable template)."""
+    cache_set(prebuild_failure_key(slug),
+              {"driver_sha256": _sha256(driver), "flags": f"{CPP_FLAGS} {CPP_PCH_FLAGS}", "image": image_id},
+              ttl=PREBUILD_FAILURE_TTL)
+
+def prebuild_failed(slug, driver, image_id):
+    """True if this driver already failed to prebuild with the current flags on this image."""
+    failure = cache_get(prebuild_failure_key(slug))
+    return bool(failure) and (failure.get("driver_sha256") == _sha256(driver)
+                              and failure.get("flags") == f"{CPP_FLAGS} {CPP_PCH_FLAGS}"
+                              and failure.get("image") in (None, image_id))
+
+def prebuild_cpp_driver(slug, cpp_template=None):
+    """Compile a problem's driver.cpp once into build/driver.o (runs inside a judger container)."""
+    problem_dir = os.path.join(PROBLEMS_DIR, slug)
+    driver_path = os.path.join(problem_dir, "driver.cpp")
+    if not os.path.exists(driver_path):
+        return False
+    if cpp_template is None:
+        conn = get_db_connection()
+        try:
+            cur = conn.cursor()
+            execute_query(cur, "SELECT templates FROM problems WHERE slug = %s", (slug,))
+            row = cur.fetchone()
+        finally:
+            conn.close()
+        templates = (row[0] if row else None) or {}
+        if isinstance(templates, str):
+            templates = json.loads(templates)
+        cpp_template = templates.get("cpp", "")
+
+    with open(driver_path, "rb") as f:
+        driver = f.read()
+    sources = generate_cpp_split_sources(cpp_template)
+    if not sources:
+        print(f"  C++ template of {slug} not understood; keeping single-unit builds")
+        record_prebuild_failure(slug, driver)
+        return False
+    stand_in, user_tu = sources
+
+    box = judge_executor.lease("cpp")
+    healthy = False
+    try:
+        stream = io.BytesIO()
+        with tarfile.open(fileobj=stream, mode="w") as t:
+            for fname, payload in (("driver.cpp", driver), ("solution.cpp", stand_in.encode("utf-8"))):
+                info = tarfile.TarInfo(name=fname)
+                info.size = len(payload)
+                t.addfile(info, io.BytesIO(payload))
+        stream.seek(0)
+        box.put_archive(stream)
+
+        compile_start = time.time()
+        code, out, _ = box.exec_stream(
+            f"/bin/bash -c 'g++ {CPP_FLAGS} {CPP_PCH_FLAGS} -c driver.cpp -o driver.o -I/home/sandbox'"
+        )
+        compile_ms = round((time.time() - compile_start) * 1000)
+        if code != 0:
+            print(f"  Driver prebuild failed for {slug}: {out.decode('utf-8', errors='replace')[:500]}")
+            record_prebuild_failure(slug, driver, box.image_id)
+            healthy = True
+            return False
+        driver_obj = box.read_file("driver.o")
+        healthy = True
     finally:
-        EXEC_SEMAPHORE.release()
+        box.release(healthy=healthy)
+
+    build_dir = os.path.join(problem_dir, "build")
+    os.makedirs(build_dir, exist_ok=True)
+    with open(os.path.join(build_dir, "driver.o"), "wb") as f:
+        f.write(driver_obj)
+    with open(os.path.join(build_dir, "user_tu.cpp"), "w", encoding="utf-8") as f:
+        f.write(user_tu)
+    save_json = {
+        "driver_sha256": _sha256(driver),
+        "flags": f"{CPP_FLAGS} {CPP_PCH_FLAGS}",
+        "image": box.image_id,
+        "driver_compile_ms": compile_ms,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(os.path.join(build_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(save_json, f, indent=4)
+    redis_client.delete(prebuild_failure_key(slug))
+    print(f"  Prebuilt C++ driver for {slug} in {compile_ms} ms")
+    return True
+
+def prebuild_queued_key(slug):
+    return f"prebuild:queued:{slug}"
+
+def prebuild_job(slug):
+    """RQ entry point: reads the template when it runs, so one queued job covers later edits."""
+    redis_client.delete(prebuild_queued_key(slug))
+    prebuild_cpp_driver(slug)
+
+def schedule_cpp_prebuild(slug, cpp_template=None):
+    """Prebuild a driver in the background (at most one build per problem at a time)."""
+    if JUDGE_QUEUE_ENABLED:
+        try:
+            if redis_client.set(prebuild_queued_key(slug), 1, nx=True, ex=PREBUILD_QUEUED_TTL):
+                judge_queues["rejudge"].enqueue("server.prebuild_job", args=(slug,), job_timeout=JUDGE_JOB_TIMEOUT,
+                                                result_ttl=60, failure_ttl=3600)
+        except redis.RedisError as e:
+            print(f"  Judge queue unavailable, not prebuilding {slug}: {e}")
+        return
+
+    with _prebuilds_lock:
+        if slug in _prebuilds_running:
+            return
+        _prebuilds_running.add(slug)
+
+    def run():
+        try:
+            prebuild_cpp_driver(slug, cpp_template)
+        except Exception as e:
+            print(f"  Driver prebuild error for {slug}: {e}")
+        finally:
+            with _prebuilds_lock:
+                _prebuilds_running.discard(slug)
 
-def _execute_code_in_docker_inner(lang, code, problem_id, user_id=None, adhoc_driver=None, adhoc_test_data=None):
-    # Track execution in Redis for monitoring
-    redis_client.incr("exec:active")
-    redis_client.incr("exec:total")
-    start_time = time.time()
+    threading.Thread(target=run, daemon=True).start()
+
+def record_compile_time(layout, ms):
+    try:
+        redis_client.lpush(f"judge:compile_ms:{layout}", ms)
+        redis_client.ltrim(f"judge:compile_ms:{layout}", 0, 199)  # Keep last 200
+    except redis.RedisError:
+        pass
+
+# --- Streaming Execution ---
+# Output is read from the exec stream as it is produced instead of being
+# buffered whole by the Docker SDK. Past JUDGE_OUTPUT_LIMIT bytes the run is
+# stopped, and in fail-fast mode the first failing case stops it as well.
+JUDGE_OUTPUT_LIMIT = int(os.getenv("JUDGE_OUTPUT_LIMIT", str(256 * 1024)))
+JUDGE_FAIL_FAST_SUBMIT = os.getenv("JUDGE_FAIL_FAST_SUBMIT", "true").lower() == "true"
+FAILED_CASE_RE = re.compile(rb"CASE\|\d+\|FAIL\|")
+
+# --- Run Usage Accounting ---
+# CPU time (user + sys) and peak memory of the solution run itself, excluding
+# sandbox setup and compilation. Docker reads CPU from the container's cgroup;
+# pooled containers outlive a run, so their cgroup high-water mark cannot be
+# reset and peak memory comes from the kernel's max RSS accounting instead.
+# Namespace runs get a cgroup of their own when JUDGE_NS_CGROUP is set.
+# In Docker the accounting runs as root and writes to USAGE_DIR, out of reach
+# of the submission it measures.
+USAGE_DIR = "/run/algoarena"
+USAGE_FILE = f"{USAGE_DIR}/usage"
+CPU_BASELINE_FILE = f"{USAGE_DIR}/cpu0"
+
+def shell_quote(cmd):
+    """`cmd` as one single-quoted bash word."""
+    return "'" + cmd.replace("'", "'\\''") + "'"
+
+def parse_cpu_stat(text):
+    """user_usec + system_usec from a cgroup v2 cpu.stat, or None."""
+    fields = dict(line.split(None, 1) for line in text.splitlines() if len(line.split(None, 1)) == 2)
+    try:
+        return int(fields["user_usec"]) + int(fields["system_usec"])
+    except (KeyError, ValueError):
+        return None
+
+class OutputCollector:
+    """Accumulates a run's output, enforcing the byte cap and the fail-fast stop.
+
+    `feed` returns False once the run should be stopped; `stopped` then says why
+    ("output_limit" or "fail_fast").
+    """
+
+    def __init__(self, output_limit=JUDGE_OUTPUT_LIMIT, fail_fast=False):
+        self.output_limit = output_limit
+        self.fail_fast = fail_fast
+        self.out = bytearray()
+        self.stopped = None
+
+    def feed(self, chunk):
+        room = self.output_limit - len(self.out)
+        if len(chunk) > room:
+            self.out += chunk[:max(room, 0)]
+            self.stopped = "output_limit"
+            return False
+        scan_from = max(len(self.out) - 32, 0)  # a marker may straddle two chunks
+        self.out += chunk
+        if self.fail_fast:
+            m = FAILED_CASE_RE.search(self.out, scan_from)
+            if m:
+                # Keep the output up to the end of the failing case's line
+                line_end = self.out.find(b"\n", m.end())
+                if line_end != -1:
+                    del self.out[line_end + 1:]
+                self.stopped = "fail_fast"
+                return False
+        return True
+
+# --- Executor Backends ---
+# Everything the judge does to a sandbox goes through a small interface so the
+# isolation mechanism is a per-deployment choice (JUDGE_EXECUTOR):
+#
+#   docker     pooled judger:latest containers (default)
+#   namespace  unprivileged user/PID/mount/net namespaces chrooted into a
+#              read-only copy of the judger image's filesystem; no daemon
+#              round-trips, so a run starts in milliseconds
+#
+# Both run the same toolchain and report through OutputCollector, so verdicts
+# do not depend on the backend.
+JUDGE_EXECUTOR = os.getenv("JUDGE_EXECUTOR", "docker")
+JUDGE_NS_ROOTFS = os.getenv("JUDGE_NS_ROOTFS", "/var/lib/algoarena/judger-rootfs")
+JUDGE_NS_WORKDIR = os.getenv("JUDGE_NS_WORKDIR", "/tmp/algoarena-sandboxes")
+# Required: rlimits cannot reproduce the Docker executor's 64 MB memory limit
+# (an address-space cap counts mappings, not memory) or its process limit
+JUDGE_NS_CGROUP = os.getenv("JUDGE_NS_CGROUP", "")  # delegated cgroup v2 dir
+JUDGE_NS_MEMORY_MB = int(os.getenv("JUDGE_NS_MEMORY_MB", "64"))     # cgroup memory.max, like mem_limit
+JUDGE_NS_PIDS_MAX = int(os.getenv("JUDGE_NS_PIDS_MAX", "64"))
+
+class DockerSandbox:
+    """A leased pool container."""
+
+    def __init__(self, pool, pc):
+        self.pool = pool
+        self.pc = pc
+        self.con = pc.con
+
+    @property
+    def image_id(self):
+        return self.con.attrs.get("Image", JUDGE_IMAGE)
+
+    def put_archive(self, stream):
+        self.con.put_archive("/home/sandbox", stream)
+
+    def read_file(self, name):
+        """Fetch a single file's bytes out of the workspace."""
+        bits, _ = self.con.get_archive(f"/home/sandbox/{name}")
+        with tarfile.open(fileobj=io.BytesIO(b"".join(bits))) as t:
+            return t.extractfile(t.next()).read()
+
+    def exec_stream(self, cmd, output_limit=JUDGE_OUTPUT_LIMIT, fail_fast=False, user=""):
+        """Run `cmd` while reading its output incrementally.
+
+        Returns (exit_code, output, stopped) where `stopped` is None, "output_limit"
+        or "fail_fast" when the run was cut short.
+        """
+        exec_id = client.api.exec_create(self.con.id, cmd, stdout=True, stderr=True,
+                                         workdir="/home/sandbox", user=user)["Id"]
+        collector = OutputCollector(output_limit, fail_fast)
+        chunks = client.api.exec_start(exec_id, stream=True)
+        try:
+            for chunk in chunks:
+                if not collector.feed(chunk):
+                    break
+        finally:
+            if collector.stopped:
+                self.stop_processes()
+            chunks.close()
+        exit_code = client.api.exec_inspect(exec_id).get("ExitCode")
+        return (0 if exit_code is None else exit_code), bytes(collector.out), collector.stopped
+
+    def exec_measured(self, cmd, output_limit=JUDGE_OUTPUT_LIMIT, fail_fast=False):
+        """exec_stream() the solution run (a shell command) so read_usage() can report what it consumed.
+
+        time and the CPU baseline run as root; only the command itself drops to `sandbox`.
+        """
+        measured = (f"cat /sys/fs/cgroup/cpu.stat > {CPU_BASELINE_FILE} 2>/dev/null; "
+                    f"/usr/bin/time -q -f '%M %U %S' -o {USAGE_FILE} "
+                    "setpriv --reuid=sandbox --regid=sandbox --init-groups --reset-env --no-new-privs "
+                    f"/bin/bash -c {shell_quote(cmd)}")
+        return self.exec_stream(f"/bin/bash -c {shell_quote(measured)}", output_limit, fail_fast, user="root")
+
+    def read_usage(self):
+        try:
+            _, out = self.con.exec_run(
+                f"/bin/bash -c 'cat /sys/fs/cgroup/cpu.stat; echo ---; cat {CPU_BASELINE_FILE}; echo ---; cat {USAGE_FILE}'",
+                user="root",
+            )
+            after, before, rusage = out.decode("utf-8", errors="replace").split("---", 2)
+            max_rss_kb, user_s, sys_s = rusage.split()[-3:]
+        except Exception:
+            return None
+        cpu_after, cpu_before = parse_cpu_stat(after), parse_cpu_stat(before)
+        if cpu_after is not None and cpu_before is not None:
+            cpu_ms = (cpu_after - cpu_before) // 1000
+        else:
+            cpu_ms = round((float(user_s) + float(sys_s)) * 1000)  # cgroup v1 host
+        return {"cpu_time_ms": cpu_ms, "peak_memory_kb": int(max_rss_kb)}
+
+    def stop_processes(self):
+        """Kill everything running in the container except its init, leaving it reusable."""
+        try:
+            self.con.exec_run("/bin/bash -c 'kill -9 -1'", user="root")
+        except Exception:
+            self.kill()
+
+    def kill(self):
+        try:
+            self.con.kill()
+        except Exception:
+            pass
+
+    def release(self, healthy=True):
+        self.pool.release(self.pc, healthy=healthy)
+
+class DockerExecutor:
+    name = "docker"
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def start(self):
+        self.pool.start()
+
+    def drain(self):
+        self.pool.drain()
+
+    def lease(self, lang):
+        return DockerSandbox(self.pool, self.pool.lease(lang))
+
+    def stats(self):
+        return self.pool.stats()
+
+# Runs as root of the new user namespace: assemble the sandbox's view of the
+# filesystem, then chroot into it with every capability dropped.
+# $1 rootfs, $2 mount point, $3 workspace, $4 command
+NS_SETUP_SCRIPT = r'''set -e
+mount --rbind "$1" "$2"
+mount -o remount,bind,ro "$2"
+mount --bind "$3" "$2/home/sandbox"
+mount -t tmpfs -o size=16m tmpfs "$2/tmp"
+mount -t proc proc "$2/proc"
+cd /
+# Not exec'd: this shell stays PID 1, so the program keeps default signal handling
+chroot "$2" /usr/bin/setpriv --no-new-privs --inh-caps=-all --bounding-set=-all \
+    /usr/bin/env -i PATH=/usr/local/bin:/usr/bin:/bin HOME=/home/sandbox LANG=C.UTF-8 \
+    /bin/bash -c 'cd /home/sandbox && eval "exec $1"' sandbox "$4"
+'''
+
+class NamespaceSandbox:
+    """A throwaway workspace whose commands run in fresh Linux namespaces."""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.base = tempfile.mkdtemp(prefix="run-", dir=JUDGE_NS_WORKDIR)
+        self.work = os.path.join(self.base, "sandbox")
+        self.root = os.path.join(self.base, "root")
+        os.mkdir(self.work)
+        os.mkdir(self.root)
+        self.cgroup = None
+        self.cgroups = 0
+        self.proc = None
+        self.usage = None
+        self.lock = threading.Lock()
+
+    @property
+    def image_id(self):
+        return self.executor.image_id
+
+    def put_archive(self, stream):
+        # Archives are only ever built by the judge itself
+        with tarfile.open(fileobj=stream) as t:
+            t.extractall(self.work)
+
+    def read_file(self, name):
+        with open(os.path.join(self.work, name), "rb") as f:
+            return f.read()
+
+    def _create_cgroup(self):
+        # One per command, so usage of a run is not mixed with its compile
+        self.cgroups += 1
+        path = os.path.join(JUDGE_NS_CGROUP, f"{os.path.basename(self.base)}-{self.cgroups}")
+        os.mkdir(path)
+        for fname, value in (("memory.max", f"{JUDGE_NS_MEMORY_MB}M"), ("memory.swap.max", "0"),
+                             ("pids.max", str(JUDGE_NS_PIDS_MAX))):
+            try:
+                with open(os.path.join(path, fname), "w") as f:
+                    f.write(value)
+            except OSError as e:
+                os.rmdir(path)
+                raise RuntimeError(f"Namespace sandbox: could not set {fname}: {e}")
+        return path
+
+    def exec_stream(self, cmd, output_limit=JUDGE_OUTPUT_LIMIT, fail_fast=False):
+        """Same contract as DockerSandbox.exec_stream."""
+        self._remove_cgroup()
+        self.cgroup = self._create_cgroup()
+        argv = ["prlimit", "--core=0", f"--fsize={16 * 1024 * 1024}", "--nofile=256",
+                "unshare", "--user", "--map-root-user", "--pid", "--fork", "--kill-child",
+                "--mount", "--net", "--ipc", "--uts",
+                "/bin/sh", "-c", NS_SETUP_SCRIPT, "ns-setup", JUDGE_NS_ROOTFS, self.root, self.work, cmd]
+        # Join the run's cgroup before anything else starts so every descendant is accounted
+        argv = ["/bin/sh", "-c", 'echo $$ > "$0/cgroup.procs" && exec "$@"', self.cgroup] + argv
+
+        collector = OutputCollector(output_limit, fail_fast)
+        with self.lock:
+            self.proc = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                         stderr=subprocess.STDOUT, start_new_session=True)
+        proc = self.proc
+        try:
+            while True:
+                chunk = os.read(proc.stdout.fileno(), 65536)
+                if not chunk or not collector.feed(chunk):
+                    break
+        finally:
+            if collector.stopped:
+                self.stop_processes()
+            proc.stdout.close()
+        # wait4 rather than wait(): the rusage covers the whole process tree,
+        # since each parent in the chain waits for its children
+        _, status, rusage = os.wait4(proc.pid, 0)
+        exit_code = proc.returncode = os.waitstatus_to_exitcode(status)
+        self.usage = {
+            "cpu_time_ms": round((rusage.ru_utime + rusage.ru_stime) * 1000),
+            "peak_memory_kb": rusage.ru_maxrss,
+        }
+        try:
+            with open(os.path.join(self.cgroup, "cpu.stat")) as f:
+                cpu_usec = parse_cpu_stat(f.read())
+            with open(os.path.join(self.cgroup, "memory.peak")) as f:
+                peak_bytes = int(f.read())
+            if cpu_usec is not None:
+                self.usage = {"cpu_time_ms": cpu_usec // 1000, "peak_memory_kb": peak_bytes // 1024}
+        except (OSError, ValueError):
+            pass  # memory.peak needs Linux 5.19; keep the rusage figures
+        if exit_code < 0:
+            exit_code = 128 - exit_code  # killed by a signal; report it the way a shell does
+        return exit_code, bytes(collector.out), collector.stopped
+
+    def exec_measured(self, cmd, output_limit=JUDGE_OUTPUT_LIMIT, fail_fast=False):
+        # Every command is accounted on its own already, from outside the namespaces
+        return self.exec_stream(f"/bin/bash -c {shell_quote(cmd)}", output_limit, fail_fast)
+
+    def read_usage(self):
+        return self.usage
+
+    def _remove_cgroup(self):
+        if self.cgroup:
+            try:
+                os.rmdir(self.cgroup)
+            except OSError as e:
+                print(f"  Namespace sandbox: could not remove cgroup {self.cgroup}: {e}")
+            self.cgroup = None
+
+    def stop_processes(self):
+        # The child of unshare is PID 1 of the run's namespace; killing the
+        # session takes it down, and the kernel kills everything else inside
+        with self.lock:
+            proc = self.proc
+        if proc and proc.poll() is None:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def kill(self):
+        self.stop_processes()
+
+    def release(self, healthy=True):
+        self.stop_processes()
+        if self.proc and self.proc.returncode is None:
+            self.proc.wait()
+        self._remove_cgroup()
+        shutil.rmtree(self.base, ignore_errors=True)
+
+class NamespaceExecutor:
+    name = "namespace"
+
+    def __init__(self, rootfs):
+        self.rootfs = rootfs
+        self.image_id = None
+        self.runs = 0
+
+    def start(self):
+        if not os.path.isdir(os.path.join(self.rootfs, "home", "sandbox")):
+            raise RuntimeError(f"JUDGE_NS_ROOTFS {self.rootfs} does not look like an exported judger image")
+        try:
+            with open(os.path.join(JUDGE_NS_CGROUP, "cgroup.subtree_control")) as f:
+                controllers = f.read().split()
+        except OSError:
+            controllers = []
+        if not JUDGE_NS_CGROUP or not {"memory", "pids"} <= set(controllers):
+            raise RuntimeError("The namespace executor needs JUDGE_NS_CGROUP: a delegated cgroup v2 directory "
+                               "with the memory and pids controllers enabled in cgroup.subtree_control")
+        os.makedirs(JUDGE_NS_WORKDIR, exist_ok=True)
+        # Written at export time so compiled binaries and prebuilt drivers stay
+        # interchangeable with the Docker backend's
+        try:
+            with open(os.path.join(self.rootfs, ".image-id"), "r") as f:
+                self.image_id = f.read().strip()
+        except OSError:
+            self.image_id = f"rootfs:{self.rootfs}:{os.stat(self.rootfs).st_mtime_ns}"
+
+    def drain(self):
+        pass
+
+    def lease(self, lang):
+        if self.image_id is None:
+            self.start()
+        self.runs += 1
+        return NamespaceSandbox(self)
+
+    def stats(self):
+        return {"rootfs": self.rootfs, "cgroup": JUDGE_NS_CGROUP, "runs": self.runs}
+
+def make_executor(name):
+    if name == "docker":
+        return DockerExecutor(judge_pool)
+    if name == "namespace":
+        return NamespaceExecutor(JUDGE_NS_ROOTFS)
+    raise ValueError(f"Unknown JUDGE_EXECUTOR: {name}")
+
+judge_executor = make_executor(JUDGE_EXECUTOR)
+atexit.register(judge_executor.drain)
+
+JUDGE_LANGUAGES = ("python", "cpp")
+
+# Helper: Execute code in Docker
+def execute_code_in_docker(lang, code, problem_id, user_id=None, adhoc_driver=None, adhoc_test_data=None,
+                           fail_fast=False, priority="run"):
+    # Rejected before taking any slots, so neither path below has to
+    if lang not in JUDGE_LANGUAGES:
+        return {"error": f"Unsupported language: {lang}"}
+
+    # Wait for a slot in the global admission queue
+    ticket = admission.acquire(priority, user_id, timeout=15)
+    if not ticket:
+        return {"error": "Server busy. Too many executions running. Please try again in a few seconds.", "status": "Queued"}
+    
+    extra_tickets = []
+    try:
+        records = None
+        if problem_id and not (adhoc_driver and adhoc_test_data):
+            records = load_test_records(problem_id)
+        # Big suites fan out over extra sandboxes, but only if slots are free right now
+        if records and len(records) >= 2 * JUDGE_SHARD_MIN_CASES:
+            wanted = min(JUDGE_MAX_SHARDS, len(records) // JUDGE_SHARD_MIN_CASES) - 1
+            while len(extra_tickets) < wanted:
+                extra = admission.try_acquire_idle()
+                if not extra:
+                    break
+                extra_tickets.append(extra)
+        if extra_tickets:
+            return _execute_sharded(lang, code, problem_id, user_id, records, len(extra_tickets) + 1, fail_fast)
+        return _execute_code_in_docker_inner(lang, code, problem_id, user_id, adhoc_driver, adhoc_test_data,
+                                             fail_fast=fail_fast)
+    finally:
+        for t in [ticket] + extra_tickets:
+            admission.release(t)
+
+# --- Sharded Execution ---
+# A problem's problem.json declares how many test_data.txt lines make up one
+# case ("lines_per_case"), which lets a large suite be cut into contiguous
+# shards that run in separate sandboxes at the same time.
+JUDGE_MAX_SHARDS = int(os.getenv("JUDGE_MAX_SHARDS", "4"))
+JUDGE_SHARD_MIN_CASES = int(os.getenv("JUDGE_SHARD_MIN_CASES", "50"))  # smallest shard worth a container
+
+def load_problem_meta(problem_id):
+    return dict(problem_assets.get(problem_id).meta)
+
+def save_problem_meta(problem_id, meta):
+    with open(os.path.join(PROBLEMS_DIR, problem_id, "problem.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=4)
+        f.write("\n")
+    problem_assets.invalidate(problem_id)
+
+def load_test_records(problem_id):
+    """Split a problem's test data into per-case records, or None if its format is unknown."""
+    assets = problem_assets.get(problem_id)
+    if assets.records is None:
+        assets.records = _split_test_records(problem_id, assets)
+    return assets.records or None
+
+def _split_test_records(problem_id, assets):
+    lines_per_case = assets.meta.get("lines_per_case")
+    test_data = assets.files.get("test_data.txt")
+    if not lines_per_case or test_data is None:
+        return []
+    lines = [line for line in test_data.splitlines() if line.strip()]
+    if len(lines) % lines_per_case:
+        print(f"  WARNING: {problem_id} test data is not a multiple of {lines_per_case} lines; not sharding")
+        return []
+    return [b"\n".join(lines[i:i + lines_per_case]) + b"\n" for i in range(0, len(lines), lines_per_case)]
+
+def _execute_sharded(lang, code, problem_id, user_id, records, shard_count, fail_fast=False):
+    """Run contiguous slices of the test records concurrently and merge them into one verdict.
+
+    In fail-fast mode the first shard to hit a failing case cancels the others.
+    """
+    per_shard = -(-len(records) // shard_count)
+    shards = [records[i:i + per_shard] for i in range(0, len(records), per_shard)]
+    print(f"  Sharding {len(records)} cases of {problem_id} over {len(shards)} sandboxes")
+    cancel = threading.Event() if fail_fast else None
+
+    with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+        futures = [
+            executor.submit(_execute_code_in_docker_inner, lang, code, problem_id, user_id,
+                            test_data_override=b"".join(shard), fail_fast=fail_fast, cancel=cancel)
+            for shard in shards
+        ]
+        results = [f.result() for f in futures]
+
+    # Errors, TLEs and crashes/compile errors decide the verdict for the whole run
+    for r in results:
+        if "error" in r:
+            return r
+    for r in results:
+        if r["status"] == "Fail" and r.get("stopped_early") == "output_limit":
+            return r
+    for r in results:
+        if r["status"] == "TLE":
+            return r
+    for r in results:
+        if r["exit_code"] != 0:
+            return r
+
+    # Each shard numbers its cases from 1; shift them back to their global ids
+    merged = []
+    offset = 0
+    for shard, r in zip(shards, results):
+        if r.get("cancelled"):
+            offset += len(shard)
+            continue
+        for line in r["output"].split("\n"):
+            if line.startswith("CASE|"):
+                parts = line.split("|", 2)
+                if len(parts) == 3 and parts[1].isdigit() and int(parts[1]) > 0:
+                    line = f"CASE|{int(parts[1]) + offset}|{parts[2]}"
+            merged.append(line)
+        offset += len(shard)
+    output = "\n".join(merged)
+
+    result = {
+        "status": "Fail" if "FAIL" in output else "Pass",
+        "output": output,
+        "exit_code": 0
+    }
+    # Shards run in parallel: CPU time adds up, memory is per sandbox
+    if all("cpu_time_ms" in r for r in results):
+        result["cpu_time_ms"] = sum(r["cpu_time_ms"] for r in results)
+        result["peak_memory_kb"] = max(r["peak_memory_kb"] for r in results)
+    if any(r.get("cancelled") or r.get("stopped_early") for r in results):
+        result["stopped_early"] = "fail_fast"
+    return result
+
+def _execute_code_in_docker_inner(lang, code, problem_id, user_id=None, adhoc_driver=None, adhoc_test_data=None,
+                                  test_data_override=None, fail_fast=False, cancel=None):
     fname = "solution.py"
     cmd = ""
+    compile_cmd = None
 
     if lang == "python":
         fname = "solution.py"
@@ -1473,108 +3548,126 @@ def _execute_code_in_docker_inner(lang, code, problem_id, user_id=None, adhoc_dr
             
     elif lang == "cpp":
         fname = "solution.cpp"
+        # Compiled separately from the run so the binary can be cached
         if problem_id != "" or adhoc_driver:
-            cmd = "g++ -o solution driver.cpp -I/home/sandbox && ./solution < test_data.txt"
+            compile_cmd = f"g++ {CPP_FLAGS} {CPP_PCH_FLAGS} -o solution driver.cpp -I/home/sandbox"
+            cmd = "./solution < test_data.txt"
         else:
-            cmd = "g++ -o solution solution.cpp && ./solution"
+            compile_cmd = f"g++ {CPP_FLAGS} {CPP_PCH_FLAGS} -o solution solution.cpp"
+            cmd = "./solution"
     else:
-        return {"error": "bad language"}, 400
-
-    my_config = {
-        "image": "judger:latest",
-        "command": ["/bin/bash", "-c", "sleep 600"],
-        "mem_limit": "64m",
-        "network_mode": "none",
-        "detach": True
-    }
+        return {"error": f"Unsupported language: {lang}"}
 
+    # Track execution in Redis for monitoring
+    redis_client.incr("exec:active")
+    redis_client.incr("exec:total")
+    start_time = time.time()
+    box = None
     try:
-        con = client.containers.create(**my_config)
-        con.start()
+        box = judge_executor.lease(lang)
         
-        stream = io.BytesIO()
-        t = tarfile.open(fileobj=stream, mode='w')
-        
-        info = tarfile.TarInfo(name=fname)
         b_code = code.encode('utf-8')
-        info.size = len(b_code)
-        t.addfile(info, io.BytesIO(b_code))
+        d_data = b""
+        assets = None
+        members = []
         
-        # Use ad-hoc driver/test data if provided, otherwise load from disk
+        # Use ad-hoc driver/test data if provided, otherwise the cached problem files
         if adhoc_driver and adhoc_test_data:
             print("  Using ad-hoc driver and test data")
-            d_name = "driver.py" if lang == "python" else "driver.cpp"
             d_data = adhoc_driver.encode('utf-8')
-            info2 = tarfile.TarInfo(name=d_name)
-            info2.size = len(d_data)
-            t.addfile(info2, io.BytesIO(d_data))
-            
-            t_data = adhoc_test_data.encode('utf-8')
-            info3 = tarfile.TarInfo(name="test_data.txt")
-            info3.size = len(t_data)
-            t.addfile(info3, io.BytesIO(t_data))
+            members.append(tar_member(driver_name(lang), d_data))
+            members.append(tar_member("test_data.txt", adhoc_test_data.encode('utf-8')))
         elif problem_id != "":
-            p_path = os.path.join(PROBLEMS_DIR, problem_id)
-            print(f"Loading problem files from: {p_path}")
-             
-            if lang == "python":
-                d_name = "driver.py"
-            else:
-                d_name = "driver.cpp"
-                
-            driver_path = os.path.join(p_path, d_name)
-            if os.path.exists(driver_path):
-                print(f"  Found driver: {driver_path}")
-                with open(driver_path, "rb") as f:
-                    d_data = f.read()
-                    info2 = tarfile.TarInfo(name=d_name)
-                    info2.size = len(d_data)
-                    t.addfile(info2, io.BytesIO(d_data))
-            else:
-                print(f"  WARNING: Driver not found: {driver_path}")
-
-            test_path = os.path.join(p_path, "test_data.txt")
-            if os.path.exists(test_path):
-                print(f"  Found test data: {test_path}")
-                with open(test_path, "rb") as f:
-                    t_data = f.read()
-                    info3 = tarfile.TarInfo(name="test_data.txt")
-                    info3.size = len(t_data)
-                    t.addfile(info3, io.BytesIO(t_data))
-            else:
-                print(f"  WARNING: Test data not found: {test_path}")
+            assets = problem_assets.get(problem_id)
+            d_data = assets.driver(lang)
+            if not d_data:
+                print(f"  WARNING: Driver not found: {problem_id}/{driver_name(lang)}")
+            if test_data_override is None and "test_data.txt" not in assets.files:
+                print(f"  WARNING: Test data not found: {problem_id}/test_data.txt")
         
-        t.close()
-        stream.seek(0)
-        con.put_archive("/home/sandbox", stream)
+        # C++ from the problem catalog: compile only the submission against the prebuilt driver
+        compile_layout = "full"
+        image_id = box.image_id
+        if compile_cmd and assets and d_data:
+            if assets.cpp_build(image_id):
+                compile_layout = "split"
+                compile_cmd = (f"g++ {CPP_FLAGS} {CPP_PCH_FLAGS} -c user_tu.cpp -o user.o -I/home/sandbox"
+                               f" && g++ {CPP_FLAGS} driver.o user.o -o solution")
+            elif not prebuild_failed(problem_id, d_data, image_id):
+                schedule_cpp_prebuild(problem_id)
+        if assets:
+            members.append(problem_assets.prefix(assets, lang, with_tests=test_data_override is None,
+                                                 split=compile_layout == "split"))
+            if test_data_override is not None:
+                members.append(tar_member("test_data.txt", test_data_override))
+        members.append(tar_member(fname, b_code))
+
+        # C++: reuse the binary if this exact source/driver/flags/image was compiled before
+        bin_key = None
+        if compile_cmd:
+            bin_key = CompiledBinaryCache.key(b_code, d_data, f"{CPP_FLAGS} {CPP_PCH_FLAGS} {compile_layout}", image_id)
+            binary = binary_cache.get(bin_key)
+            redis_client.incr("bincache:hits" if binary is not None else "bincache:misses")
+            if binary is not None:
+                print("  Compiled binary cache hit")
+                members.append(tar_member("solution", binary, mode=0o755))
+                compile_cmd = None
+        
+        members.append(TAR_END)
+        box.put_archive(io.BytesIO(b"".join(members)))
        
-        res = {"code": None, "msg": "", "is_tle": False}
+        res = {"code": None, "msg": b"", "is_tle": False, "stopped": None, "usage": None}
         
         def run_thread():
             try:
-                escaped_cmd = cmd.replace("'", "'\\''")
-                c, out = con.exec_run(
-                    cmd=f"/bin/bash -c '{escaped_cmd}'",
-                    workdir="/home/sandbox"
-                )
+                compile_out = b""
+                if compile_cmd:
+                    escaped_cmd = compile_cmd.replace("'", "'\\''")
+                    compile_start = time.time()
+                    c, compile_out, stopped = box.exec_stream(f"/bin/bash -c '{escaped_cmd}'")
+                    if c == 0:
+                        record_compile_time(compile_layout + ("+pch" if JUDGE_CPP_PCH else ""),
+                                            round((time.time() - compile_start) * 1000))
+                    if c != 0 or stopped:
+                        res["code"] = c
+                        res["msg"] = compile_out
+                        res["stopped"] = stopped
+                        return
+                    try:
+                        binary_cache.put(bin_key, box.read_file("solution"))
+                    except Exception as e:
+                        print("  Could not cache compiled binary:", e)
+                c, out, stopped = box.exec_measured(cmd, fail_fast=fail_fast,
+                                                    output_limit=JUDGE_OUTPUT_LIMIT - len(compile_out))
                 res["code"] = c
-                res["msg"] = out
+                res["msg"] = compile_out + out
+                res["stopped"] = stopped
+                if not stopped:
+                    res["usage"] = box.read_usage()
+                if stopped == "fail_fast" and cancel is not None:
+                    cancel.set()  # sibling shards can stop too
             except:
                 print("exec run failed")
 
         worker = threading.Thread(target=run_thread)
         worker.start()
         
-        worker.join(timeout=10)
+        # Wait for the run, the time limit, or a sibling shard calling it off
+        deadline = time.time() + 10
+        while worker.is_alive() and time.time() < deadline:
+            worker.join(timeout=0.05)
+            if cancel is not None and cancel.is_set() and worker.is_alive():
+                box.stop_processes()
+                worker.join()
+                box.release()
+                redis_client.decr("exec:active")
+                return {"status": "Cancelled", "output": "", "exit_code": 0, "cancelled": True}
         
         if worker.is_alive():
             res["is_tle"] = True
-            try:
-                con.kill() 
-            except:
-                pass
+            box.kill()
             worker.join()
-            con.remove(force=True)
+            box.release(healthy=False)
             redis_client.decr("exec:active")
             return {
                 "status": "TLE", 
@@ -1582,12 +3675,19 @@ def _execute_code_in_docker_inner(lang, code, problem_id, user_id=None, adhoc_dr
                 "exit_code": 124
             }
             
-        con.remove(force=True)
+        box.release()
         
-        execution_output = res["msg"].decode('utf-8') if res["msg"] else ""
+        execution_output = res["msg"].decode('utf-8', errors='replace') if res["msg"] else ""
         
         # Determine Pass/Fail based on test output
-        if res["code"] != 0:
+        if res["stopped"] == "output_limit":
+            exec_status = "Fail"
+            execution_output += f"\n\nOutput Limit Exceeded: stopped after {JUDGE_OUTPUT_LIMIT // 1024} KB of output."
+        elif res["stopped"] == "fail_fast":
+            # Stopped on purpose at the first failing case
+            exec_status = "Fail"
+            res["code"] = 0
+        elif res["code"] != 0:
             exec_status = "Fail"
             execution_output = simplify_error_message(execution_output, lang)
         elif "FAIL" in execution_output:
@@ -1601,21 +3701,85 @@ def _execute_code_in_docker_inner(lang, code, problem_id, user_id=None, adhoc_dr
         redis_client.lpush("exec:times", round(elapsed, 3))
         redis_client.ltrim("exec:times", 0, 99)  # Keep last 100
         
-        return {
+        result = {
             "status": exec_status,
             "output": execution_output,
             "exit_code": res["code"]
         }
+        if res["usage"]:
+            result.update(res["usage"])
+        if res["stopped"]:
+            result["stopped_early"] = res["stopped"]
+        return result
 
     except Exception as e:
-        print("Docker Error:", e)
+        print(f"Executor Error ({judge_executor.name}):", e)
         redis_client.decr("exec:active")
-        # Always try to clean up the container
+        # Never hand a container in an unknown state back to the pool
+        if box:
+            box.release(healthy=False)
+        return {"error": str(e)}
+
+# --- Verdict Cache ---
+# Byte-identical code (templates, copied editorials, repeated clicks) gets the
+# same verdict, so Pass/Fail results are memoized per problem test version.
+# TLEs and infrastructure errors are never cached: they depend on host load.
+VERDICT_CACHE_TTL = int(os.getenv("VERDICT_CACHE_TTL", "86400"))
+
+def normalize_code(code):
+    """CRLF to LF only: other whitespace can change what code does (a backslash-space, a triple-quoted string)."""
+    return code.replace("\r\n", "\n")
+
+def problem_test_version(problem_id, lang):
+    """Changes whenever an admin edit or a deploy touches what the judge runs for this problem."""
+    counter = redis_client.get(f"judge:version:{problem_id}") or "0"
+    p_path = os.path.join(PROBLEMS_DIR, problem_id)
+    d_name = "driver.py" if lang == "python" else "driver.cpp"
+    stamp = 0
+    for fname in (d_name, "test_data.txt", "problem.json"):
         try:
-            con.remove(force=True)
-        except:
+            stamp ^= os.stat(os.path.join(p_path, fname)).st_mtime_ns
+        except OSError:
             pass
-        return {"error": str(e)}
+    return f"{counter}.{stamp:x}"
+
+def verdict_cache_key(problem_id, lang, code, mode="full"):
+    code_hash = hashlib.sha256(normalize_code(code).encode("utf-8")).hexdigest()
+    return f"verdict:{problem_id}:{lang}:{problem_test_version(problem_id, lang)}:{mode}:{code_hash}"
+
+def verdict_cache_get(problem_id, lang, code, fail_fast=False):
+    """A full verdict answers any request; a fail-fast one only answers fail-fast requests."""
+    if not problem_id or not code:
+        return None
+    try:
+        cached = cache_get(verdict_cache_key(problem_id, lang, code))
+        if cached is None and fail_fast:
+            cached = cache_get(verdict_cache_key(problem_id, lang, code, "failfast"))
+        return cached
+    except redis.RedisError:
+        return None
+
+def verdict_cache_put(problem_id, lang, code, result):
+    if not problem_id or result.get("status") not in ("Pass", "Fail"):
+        return
+    if result.get("stopped_early") == "output_limit":
+        return
+    mode = "failfast" if result.get("stopped_early") == "fail_fast" else "full"
+    try:
+        cache_set(verdict_cache_key(problem_id, lang, code, mode), result, ttl=VERDICT_CACHE_TTL)
+    except redis.RedisError:
+        pass
+
+def invalidate_problem_verdicts(problem_id):
+    redis_client.incr(f"judge:version:{problem_id}")
+    cache_delete_pattern(f"verdict:{problem_id}:*")
+
+def judge_run(lang, code, problem_id, user_id, adhoc_driver=None, adhoc_test_data=None, fail_fast=False):
+    """Run code against a problem's tests. Returns (payload, http_status)."""
+    result = execute_code_in_docker(lang, code, problem_id, user_id, adhoc_driver, adhoc_test_data, fail_fast)
+    if not (adhoc_driver and adhoc_test_data):
+        verdict_cache_put(problem_id, lang, code, result)
+    return result, 500 if "error" in result else 200
 
 @app.route("/api/v1/execute", methods=["POST"])
 @require_auth
@@ -1630,29 +3794,284 @@ def run_code():
     # Optional ad-hoc driver/test data
     adhoc_driver = data.get("driver_code")
     adhoc_test_data = data.get("test_data")
+    # Stop at the first failing case instead of running the whole suite
+    fail_fast = bool(data.get("fail_fast", False))
     
     print(f"Execution request: Lang={lang}, Problem={pid}, User={user_id}")
 
-    result = execute_code_in_docker(lang, user_code, pid, user_id, adhoc_driver, adhoc_test_data)
-    
-    if "error" in result:
-        return jsonify(result), 500 if "error" in result else 200
-        
-    return jsonify(result)
+    if not (adhoc_driver and adhoc_test_data):
+        cached = verdict_cache_get(pid, lang, user_code, fail_fast)
+        if cached:
+            print("  Verdict cache hit")
+            return jsonify({**cached, "cached": True})
+
+    if JUDGE_QUEUE_ENABLED:
+        queued = enqueue_judge_job("run", "server.judge_run", user_id,
+                                   (lang, user_code, pid, user_id, adhoc_driver, adhoc_test_data, fail_fast))
+        if queued:
+            return queued
+
+    result, status_code = judge_run(lang, user_code, pid, user_id, adhoc_driver, adhoc_test_data, fail_fast)
+    return jsonify(result), status_code
 
 # --- PLAYGROUND INTERACTIVE ENDPOINTS ---
+# Each session has one reader thread that owns the exec socket: it collects
+# output as it arrives and inspects the exec exactly once, when the socket
+# closes. Clients either stream the session (Server-Sent Events) or poll it;
+# neither touches Docker. Input is written straight to the exec socket.
+# Time limits, idle timeouts and the removal of finished sessions all run off
+# one scheduler thread instead of a sleeping thread per session.
+
+PLAYGROUND_TIMEOUT = 60        # seconds a session may run
+PLAYGROUND_IDLE_TIMEOUT = int(os.getenv("PLAYGROUND_IDLE_TIMEOUT", "20"))  # seconds without a client
+PLAYGROUND_LINGER = 30         # seconds a finished session's output stays readable
+PLAYGROUND_KEEPALIVE = 15      # seconds between SSE comments on a quiet stream
+PLAYGROUND_BUFFER_CHARS = int(os.getenv("PLAYGROUND_BUFFER_KB", "256")) * 1024  # unread output held per session
+PLAYGROUND_OUTPUT_LIMIT = int(os.getenv("PLAYGROUND_OUTPUT_LIMIT_KB", "4096")) * 1024  # total output per session
+PLAYGROUND_STALL_TIMEOUT = 10  # seconds output may sit unread in a full buffer before the session is stopped
+PLAYGROUND_MAX_DELIVERY = 64 * 1024  # characters per poll response / stream event
 
 active_playground_sessions = {}
+playground_counters = {"started": 0, "finished": 0, "timed_out": 0, "idle_killed": 0}
+
+class DeadlineScheduler:
+    """Runs callbacks at given times from a single thread, ordered by a heap."""
+
+    def __init__(self, name):
+        self.name = name
+        self.heap = []
+        self.seq = 0
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def schedule(self, when, fn, *args):
+        with self.cond:
+            self.seq += 1
+            heapq.heappush(self.heap, (when, self.seq, fn, args))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self.thread.start()
+            if self.heap[0][1] == self.seq:
+                self.cond.notify()  # new earliest deadline
+
+    def pending(self):
+        with self.cond:
+            return len(self.heap)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.heap or self.heap[0][0] > time.time():
+                    self.cond.wait(timeout=self.heap[0][0] - time.time() if self.heap else None)
+                _, _, fn, args = heapq.heappop(self.heap)
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"{self.name}: {fn.__name__} failed: {e}")
+
+class OutputRing:
+    """Bounded buffer between a session's socket reader and its clients.
+
+    Positions are absolute character offsets into the session's output. Each
+    client (an open stream, or /poll) has its own position; text is dropped
+    once every client has read it. When the slowest client is a full buffer
+    behind, the socket reader stops reading, the TTY fills up, and the program
+    blocks on its next write until the client catches up.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.chunks = deque()  # (offset, text)
+        self.start = 0         # offset of the oldest retained character
+        self.end = 0           # offset after the newest
+        self.readers = {}      # reader id -> next offset to deliver
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def _floor(self):
+        return min(self.readers.values(), default=self.start)
+
+    def _trim(self):
+        floor = self._floor()
+        while self.chunks and self.chunks[0][0] + len(self.chunks[0][1]) <= floor:
+            offset, text = self.chunks.popleft()
+            self.start = offset + len(text)
+
+    def write(self, text):
+        with self.cond:
+            self.chunks.append((self.end, text))
+            self.end += len(text)
+            self.cond.notify_all()
+
+    def close(self, tail=""):
+        with self.cond:
+            if tail:
+                self.chunks.append((self.end, tail))
+                self.end += len(tail)
+            self.closed = True
+            self.cond.notify_all()
+
+    def wait_for_room(self, timeout):
+        """Block the writer while the buffer is full. False if it stayed full for `timeout` seconds."""
+        deadline = time.time() + timeout
+        with self.cond:
+            while self.end - self._floor() >= self.capacity:
+                remaining = deadline - time.time()
+                if remaining <= 0 or self.closed:
+                    return False
+                self.cond.wait(timeout=remaining)
+            return True
+
+    def add_reader(self, reader_id):
+        with self.cond:
+            self.readers.setdefault(reader_id, self.start)
+
+    def remove_reader(self, reader_id):
+        with self.cond:
+            self.readers.pop(reader_id, None)
+            self._trim()
+            self.cond.notify_all()
+
+    def read(self, reader_id, max_chars, wait=0):
+        """(text, finished): up to `max_chars` unread characters, waiting up to `wait`
+        seconds for some; `finished` once the writer closed and everything was read."""
+        with self.cond:
+            pos = self.readers.setdefault(reader_id, self.start)
+            if pos == self.end and not self.closed and wait:
+                self.cond.wait(timeout=wait)
+            parts = []
+            size = 0
+            for offset, text in self.chunks:
+                if offset + len(text) <= pos:
+                    continue
+                piece = text[max(pos - offset, 0):max(pos - offset, 0) + max_chars - size]
+                parts.append(piece)
+                size += len(piece)
+                if size >= max_chars:
+                    break
+            self.readers[reader_id] = pos + size
+            self._trim()
+            self.cond.notify_all()  # room for the writer
+            return "".join(parts), self.closed and pos + size == self.end
+
+    def buffered(self):
+        with self.cond:
+            return self.end - self.start
 
-def playground_timeout_killer(con, sid):
-    # Enforces a 1 minute timeout limit for playground sessions
-    time.sleep(60.0)
-    if sid in active_playground_sessions:
-        active_playground_sessions[sid]["is_tle"] = True
+playground_scheduler = DeadlineScheduler("playground-deadlines")
+# Container removal is a Docker round trip; keep it off the scheduler thread
+playground_cleanup = ThreadPoolExecutor(max_workers=4)
+
+def _kill_playground(s):
+    def remove():
         try:
-            con.remove(force=True)
+            s["con"].remove(force=True)  # closes the socket; the reader finishes the session
+        except Exception:
+            pass
+    playground_cleanup.submit(remove)
+
+def playground_expire(sid):
+    """Deadline: stop a session that is still running after PLAYGROUND_TIMEOUT."""
+    s = active_playground_sessions.get(sid)
+    if s and not s["done"] and not s["is_tle"]:
+        s["is_tle"] = True
+        playground_counters["timed_out"] += 1
+        _kill_playground(s)
+
+def playground_idle_check(sid):
+    """Stop a session nobody is watching; otherwise check again when it could next go idle."""
+    s = active_playground_sessions.get(sid)
+    if not s or s["done"] or s["is_tle"]:
+        return
+    if s["watchers"] == 0 and time.time() - s["last_seen"] >= PLAYGROUND_IDLE_TIMEOUT:
+        s["is_idle"] = True
+        playground_counters["idle_killed"] += 1
+        _kill_playground(s)
+        return
+    playground_scheduler.schedule(max(s["last_seen"] + PLAYGROUND_IDLE_TIMEOUT, time.time() + 1),
+                                  playground_idle_check, sid)
+
+def playground_forget(sid):
+    active_playground_sessions.pop(sid, None)
+
+def playground_stats():
+    live = sum(1 for s in list(active_playground_sessions.values()) if not s["done"])
+    return {
+        "live": live,
+        "finished_lingering": len(active_playground_sessions) - live,
+        "buffered_chars": sum(s["output"].buffered() for s in list(active_playground_sessions.values())),
+        "scheduled_deadlines": playground_scheduler.pending(),
+        **playground_counters,
+    }
+
+def playground_reader(sid):
+    s = active_playground_sessions[sid]
+    sock_fd = s["sock"]
+    ring = s["output"]
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    notice = ""
+    while True:
+        # Backpressure: stop reading while clients are a full buffer behind
+        if not ring.wait_for_room(PLAYGROUND_STALL_TIMEOUT):
+            notice = "\n\nError: Stopped because the output was not being read."
+            break
+        if ring.end >= PLAYGROUND_OUTPUT_LIMIT:
+            notice = f"\n\n[output truncated at {PLAYGROUND_OUTPUT_LIMIT // 1024} KB; program stopped]"
+            break
+        try:
+            ready, _, _ = select.select([sock_fd], [], [], 1.0)
+            if not ready:
+                continue
+            chunk = sock_fd.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            continue
+        except Exception:
+            break
+        if not chunk:
+            break
+        text = decoder.decode(chunk)
+        if text:
+            ring.write(text)
+
+    tail = decoder.decode(b"", final=True)
+    exit_code = None
+    if notice:
+        tail += notice
+        exit_code = 124
+        try:
+            s["con"].kill()
         except Exception:
             pass
+    else:
+        try:
+            exit_code = client.api.exec_inspect(s["exec_id"]).get("ExitCode")
+        except Exception:
+            exit_code = -1
+    if s["is_tle"]:
+        tail += "\n\nError: Time Limit Exceeded (1 minute)."
+        exit_code = 124
+    elif s["is_idle"]:
+        tail += "\n\nError: Stopped because no client was connected."
+        exit_code = 124
+    try:
+        s["con"].remove(force=True)
+    except Exception:
+        pass
+    admission.release(s.get("ticket"))
+    s["exit_code"] = -1 if exit_code is None else exit_code
+    s["execution_time"] = round(time.time() - s["start_time"], 3)
+    s["done"] = True
+    ring.close(tail)
+    playground_counters["finished"] += 1
+    playground_scheduler.schedule(time.time() + PLAYGROUND_LINGER, playground_forget, sid)
+
+def playground_session(sid):
+    """The caller's session, or None."""
+    s = active_playground_sessions.get(sid)
+    if not s or s["user_id"] != g.user_id:
+        return None
+    s["last_seen"] = time.time()
+    return s
 
 @app.route("/api/v1/playground/start", methods=["POST"])
 @require_auth
@@ -1679,15 +4098,23 @@ def playground_start():
     else:
         return jsonify({"error": "bad language"}), 400
 
+    # Interactive sessions hold a slot for their whole lifetime, behind judging
+    ticket = admission.acquire("playground", g.user_id, timeout=10)
+    if not ticket:
+        return jsonify({"error": "Server busy. Too many executions running. Please try again in a few seconds."}), 503
+
+    sid = str(uuid.uuid4())
     my_config = {
         "image": "judger:latest",
         "command": ["/bin/bash", "-c", "sleep 120"],
         "mem_limit": "64m",
         "network_mode": "none",
+        "labels": container_labels("playground", sid, time.time() + PLAYGROUND_TIMEOUT),
         "detach": True,
         "tty": True
     }
 
+    con = None
     try:
         con = client.containers.create(**my_config)
         con.start()
@@ -1719,77 +4146,90 @@ def playground_start():
         sock_fd = sock._sock if hasattr(sock, '_sock') else sock
         sock_fd.setblocking(False)
         
-        sid = str(uuid.uuid4())
         active_playground_sessions[sid] = {
             "con": con,
             "sock": sock_fd,
             "exec_id": exec_id,
+            "user_id": g.user_id,
             "is_tle": False,
-            "start_time": time.time()
+            "is_idle": False,
+            "start_time": time.time(),
+            "last_seen": time.time(),
+            "watchers": 0,         # open /stream responses
+            "ticket": ticket,
+            "output": OutputRing(PLAYGROUND_BUFFER_CHARS),
+            "done": False,
         }
         
-        # Start timeout killer thread
-        threading.Thread(target=playground_timeout_killer, args=(con, sid), daemon=True).start()
+        threading.Thread(target=playground_reader, args=(sid,), daemon=True).start()
+        playground_counters["started"] += 1
+        playground_scheduler.schedule(time.time() + PLAYGROUND_TIMEOUT, playground_expire, sid)
+        playground_scheduler.schedule(time.time() + PLAYGROUND_IDLE_TIMEOUT, playground_idle_check, sid)
         
         return jsonify({"session_id": sid})
         
     except Exception as e:
         print("Playground start error:", e)
+        admission.release(ticket)
         try:
             con.remove(force=True)
         except:
             pass
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/v1/playground/stream/<sid>", methods=["GET"])
+@require_auth
+@limiter.exempt
+def playground_stream(sid):
+    """Push a session's output as Server-Sent Events: `output` chunks, then one `exit`."""
+    s = playground_session(sid)
+    if not s:
+        return jsonify({"error": "Session not found or expired"}), 404
+
+    ring = s["output"]
+    reader_id = uuid.uuid4().hex
+
+    def events():
+        ring.add_reader(reader_id)
+        with ring.cond:
+            s["watchers"] += 1
+        try:
+            while True:
+                text, finished = ring.read(reader_id, PLAYGROUND_MAX_DELIVERY, wait=PLAYGROUND_KEEPALIVE)
+                if text:
+                    yield f"event: output\ndata: {json.dumps(text)}\n\n"
+                if finished:
+                    yield ("event: exit\ndata: "
+                           + json.dumps({"exit_code": s["exit_code"], "execution_time": s["execution_time"]})
+                           + "\n\n")
+                    return
+                if not text:
+                    yield ": keepalive\n\n"
+        finally:
+            with ring.cond:
+                s["watchers"] -= 1
+            s["last_seen"] = time.time()
+            ring.remove_reader(reader_id)
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.route("/api/v1/playground/poll/<sid>", methods=["GET"])
 @require_auth
 def playground_poll(sid):
-    s = active_playground_sessions.get(sid)
+    s = playground_session(sid)
     if not s:
         return jsonify({"error": "Session not found or expired"}), 404
-        
-    sock_fd = s["sock"]
-    output = ""
-    try:
-        # Read available bytes from the socket
-        while True:
-            ready = select.select([sock_fd], [], [], 0.0)
-            if ready[0]:
-                chunk = sock_fd.recv(4096)
-                if not chunk:
-                    break
-                output += chunk.decode('utf-8', errors='replace')
-            else:
-                break
-    except Exception as e:
-        pass
-        
-    try:
-        res = client.api.exec_inspect(s["exec_id"])
-        running = res['Running']
-        exit_code = res.get('ExitCode')
-    except Exception:
-        running = False
-        exit_code = -1
-        
-    if s["is_tle"]:
-        running = False
-        output += "\n\nError: Time Limit Exceeded (1 minute)."
-        exit_code = 124
-        
-    if not running:
-        elapsed = round(time.time() - s["start_time"], 3)
-        try:
-            s["con"].remove(force=True)
-        except:
-            pass
-        if sid in active_playground_sessions:
-            del active_playground_sessions[sid]
+
+    output, finished = s["output"].read("poll", PLAYGROUND_MAX_DELIVERY)
+
+    if finished:
+        active_playground_sessions.pop(sid, None)
         return jsonify({
             "output": output, 
             "running": False, 
-            "exit_code": exit_code,
-            "execution_time": elapsed
+            "exit_code": s["exit_code"],
+            "execution_time": s["execution_time"]
         })
         
     return jsonify({
@@ -1800,8 +4240,8 @@ def playground_poll(sid):
 @app.route("/api/v1/playground/input/<sid>", methods=["POST"])
 @require_auth
 def playground_input(sid):
-    s = active_playground_sessions.get(sid)
-    if not s:
+    s = playground_session(sid)
+    if not s or s["done"]:
         return jsonify({"error": "Session not found"}), 404
         
     val = request.json.get("input", "")
@@ -1814,27 +4254,120 @@ def playground_input(sid):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route("/api/v1/submit", methods=["POST"])
-@require_auth
-@limiter.limit("5/minute")
-def submit_code():
-    data = request.json
-    user_id = g.user_id
-    problem_id = data.get("problem_id")
-    language = data.get("language")
-    code = data.get("code")
-    
-    print(f"Submission: User={user_id}, Problem={problem_id}")
-    
-    if not all([problem_id, language, code]):
-        return jsonify({"error": "Missing required fields"}), 400
-    
+# --- Runtime Distributions ---
+# Accepted submissions' CPU time and peak memory live in one Redis sorted set
+# per (metric, problem, language), scored by the metric, so "faster than X%"
+# is two O(log n) counts instead of a scan of the submissions table. A set is
+# rebuilt from the database the first time it is needed.
+USAGE_METRICS = ("cpu_time_ms", "peak_memory_kb")
+
+def usage_key(metric, problem_id, lang):
+    return f"usage:{metric}:{problem_id}:{lang}"
+
+def ensure_usage_index(problem_id, lang):
+    loaded_key = f"usage:loaded:{problem_id}:{lang}"
+    if redis_client.exists(loaded_key):
+        return
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        execute_query(cur, """
+            SELECT id, cpu_time_ms, peak_memory_kb FROM submissions
+            WHERE problem_id = %s AND language = %s AND status = 'Pass' AND cpu_time_ms IS NOT NULL
+        """, (problem_id, lang))
+        rows = cur.fetchall()
+    finally:
+        conn.close()
+    pipe = redis_client.pipeline()
+    for sub_id, cpu_ms, mem_kb in rows:
+        pipe.zadd(usage_key("cpu_time_ms", problem_id, lang), {sub_id: cpu_ms})
+        if mem_kb is not None:
+            pipe.zadd(usage_key("peak_memory_kb", problem_id, lang), {sub_id: mem_kb})
+    pipe.set(loaded_key, 1)
+    pipe.execute()
+
+def record_accepted_usage(problem_id, lang, sub_id, result, memoized=False):
+    """Index an accepted submission and return where it ranks, e.g. {"cpu_time_ms": 87.5}.
+
+    A memoized verdict is only ranked: its usage is that of a run already indexed.
+    """
+    ensure_usage_index(problem_id, lang)
+    pipe = redis_client.pipeline()
+    metrics = [m for m in USAGE_METRICS if result.get(m) is not None]
+    added = 0 if memoized else len(metrics)
+    if not memoized:
+        for m in metrics:
+            pipe.zadd(usage_key(m, problem_id, lang), {sub_id: result[m]})
+    for m in metrics:
+        pipe.zcard(usage_key(m, problem_id, lang))
+        pipe.zcount(usage_key(m, problem_id, lang), f"({result[m]}", "+inf")
+    counts = pipe.execute()[added:]
+    # Share of accepted submissions that used strictly more
+    return {
+        m: round(counts[2 * i + 1] / counts[2 * i] * 100, 1) if counts[2 * i] else 0
+        for i, m in enumerate(metrics)
+    }
+
+@app.route("/api/v1/problems/<slug>/distribution", methods=["GET"])
+def get_usage_distribution(slug):
+    """Runtime and memory distribution of accepted submissions for one language."""
+    lang = request.args.get("language", "python")
+    # Checked before ensure_usage_index so unknown names never create keys
+    if lang not in JUDGE_LANGUAGES:
+        return jsonify({"error": "Unknown language"}), 404
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        execute_query(cur, "SELECT 1 FROM problems WHERE slug = %s", (slug,))
+        if cur.fetchone() is None:
+            return jsonify({"error": "Problem not found"}), 404
+    finally:
+        conn.close()
+    ensure_usage_index(slug, lang)
+    payload = {"problem_id": slug, "language": lang}
+    for m in USAGE_METRICS:
+        key = usage_key(m, slug, lang)
+        count = redis_client.zcard(key)
+        if not count:
+            payload[m] = {"count": 0}
+            continue
+        lo = redis_client.zrange(key, 0, 0, withscores=True)[0][1]
+        hi = redis_client.zrange(key, -1, -1, withscores=True)[0][1]
+        ranks = [int(pct / 100.0 * (count - 1)) for pct in (50, 90)]
+        p50, p90 = (redis_client.zrange(key, r, r, withscores=True)[0][1] for r in ranks)
+        # Ten equal-width buckets between the fastest and slowest
+        width = max((hi - lo) / 10.0, 1)
+        pipe = redis_client.pipeline()
+        for i in range(10):
+            upper = f"({lo + (i + 1) * width}" if i < 9 else "+inf"
+            pipe.zcount(key, lo + i * width, upper)
+        payload[m] = {
+            "count": count,
+            "min": lo,
+            "p50": p50,
+            "p90": p90,
+            "max": hi,
+            "histogram": [
+                {"from": round(lo + i * width, 1), "count": c} for i, c in enumerate(pipe.execute())
+            ],
+        }
+    return jsonify(payload)
+
+def judge_submission(user_id, problem_id, language, code, result=None):
+    """Judge a submission and record it. Returns (payload, http_status).
+
+    `result` short-circuits execution with a memoized verdict.
+    """
     # 1. Execute the code to get status
-    print("Verifying submission...")
-    result = execute_code_in_docker(language, code, problem_id, user_id)
+    memoized = result is not None
+    if not memoized:
+        print("Verifying submission...")
+        result = execute_code_in_docker(language, code, problem_id, user_id, fail_fast=JUDGE_FAIL_FAST_SUBMIT,
+                                        priority="submit")
+        verdict_cache_put(problem_id, language, code, result)
     
     if "error" in result:
-         return jsonify(result), 500
+        return result, 500
 
     status = result["status"]
     output = result["output"]
@@ -1843,32 +4376,392 @@ def submit_code():
     conn = get_db_connection()
     try:
         cur = conn.cursor()
-        execute_query(cur, 
-            "INSERT INTO submissions (user_id, problem_id, language, code, status, output) VALUES (%s, %s, %s, %s, %s, %s) RETURNING id",
-            (user_id, problem_id, language, code, status, output)
+        execute_prepared(cur, "insert_submission",
+            (user_id, problem_id, language, *blobs.pack(code), status,
+             *blobs.pack(blobs.summarize_output(output or "")),
+             result.get("cpu_time_ms"), result.get("peak_memory_kb"))
         )
-        sub_id = cur.fetchone()[0]
+        sub_id, created_at = cur.fetchone()
+        execute_prepared(cur, "record_submission_stats",
+            (user_id, problem_id, 1 if status == "Pass" else 0, created_at.date()))
+        _, new_solve = cur.fetchone()
         conn.commit()
         print(f"Submission saved with ID: {sub_id}, Status: {status}")
         
         # Invalidate user stats and admin stats caches
-        redis_client.delete(f"stats:user:{user_id}")
+        redis_client.delete(profile_key(user_id))
         redis_client.delete("admin:stats")
+        try:
+            leaderboard_record(user_id, 1 if status == "Pass" else 0, new_solve, created_at.date(), sub_id)
+        except redis.RedisError as e:
+            print(f"Leaderboard update error: {e}")
+
+        beats = {}
+        if status == "Pass" and result.get("cpu_time_ms") is not None:
+            try:
+                beats = record_accepted_usage(problem_id, language, sub_id, result, memoized=memoized)
+            except redis.RedisError as e:
+                print(f"Usage index error: {e}")
         
         # Return the execution result so frontend can show it
-        return jsonify({
+        return {
             "message": "Submitted successfully", 
             "submission_id": sub_id,
             "status": status,
             "output": output,
-            "exit_code": result.get("exit_code")
-        }), 201
+            "exit_code": result.get("exit_code"),
+            "cpu_time_ms": result.get("cpu_time_ms"),
+            "peak_memory_kb": result.get("peak_memory_kb"),
+            "faster_than_pct": beats.get("cpu_time_ms"),
+            "less_memory_than_pct": beats.get("peak_memory_kb")
+        }, 201
     except Exception as e:
         print(f"Submit error: {e}")
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
+    finally:
+        conn.close()
+
+@app.route("/api/v1/submit", methods=["POST"])
+@require_auth
+@limiter.limit("5/minute")
+def submit_code():
+    data = request.json
+    user_id = g.user_id
+    problem_id = data.get("problem_id")
+    language = data.get("language")
+    code = data.get("code")
+    
+    print(f"Submission: User={user_id}, Problem={problem_id}")
+    
+    if not all([problem_id, language, code]):
+        return jsonify({"error": "Missing required fields"}), 400
+
+    cached = verdict_cache_get(problem_id, language, code, JUDGE_FAIL_FAST_SUBMIT)
+    if cached:
+        print("  Verdict cache hit")
+        result, status_code = judge_submission(user_id, problem_id, language, code, result=cached)
+        return jsonify(result), status_code
+
+    if JUDGE_QUEUE_ENABLED:
+        queued = enqueue_judge_job("submit", "server.judge_submission", user_id,
+                                   (user_id, problem_id, language, code))
+        if queued:
+            return queued
+
+    result, status_code = judge_submission(user_id, problem_id, language, code)
+    return jsonify(result), status_code
+
+# --- Bulk Rejudge ---
+# After an admin changes a problem's tests, stored verdicts are stale. A rejudge
+# walks the problem's submissions in id order (bounded by the highest id when it
+# started), judges them in batches at the lowest admission priority and writes
+# each batch back with one UPDATE. Progress lives in the Redis hash
+# rejudge:<slug>, and the cursor only moves after a batch is committed, so a
+# restart resumes where it stopped (repeating at most one batch). A lease key
+# keeps two processes from working the same rejudge; the sweeper resumes runs
+# whose lease expired and whose next step is not queued.
+REJUDGE_BATCH = int(os.getenv("JUDGE_REJUDGE_BATCH", "20"))
+REJUDGE_PARALLEL = int(os.getenv("JUDGE_REJUDGE_PARALLEL", "2"))
+REJUDGE_LEASE_TTL = 300
+
+_rejudge_threads = {}
+_rejudge_threads_lock = threading.Lock()
+
+def rejudge_key(slug):
+    return f"rejudge:{slug}"
+
+def rejudge_progress(slug):
+    state = redis_client.hgetall(rejudge_key(slug))
+    if not state:
+        return None
+    total, done = int(state.get("total", 0)), int(state.get("done", 0))
+    started = float(state.get("started_at", 0))
+    end = float(state.get("finished_at") or time.time())
+    rate = done / max(end - started, 1)
+    eta = round((total - done) / rate) if state["status"] == "running" and rate > 0 else None
+    return {
+        "id": state["id"],
+        "status": state["status"],
+        "filters": json.loads(state.get("filters", "{}")),
+        "total": total,
+        "done": done,
+        "changed": int(state.get("changed", 0)),
+        "errors": int(state.get("errors", 0)),
+        "percent": round(100 * done / total, 1) if total else 100.0,
+        "per_minute": round(rate * 60, 1),
+        "eta_seconds": eta,
+        "started_at": datetime.fromtimestamp(started, timezone.utc).isoformat(),
+        "finished_at": (datetime.fromtimestamp(float(state["finished_at"]), timezone.utc).isoformat()
+                        if state.get("finished_at") else None),
+    }
+
+def _rejudge_where(slug, filters, max_id):
+    where = "problem_id = %s AND id <= %s"
+    params = [slug, max_id]
+    if filters.get("language"):
+        where += " AND language = %s"
+        params.append(filters["language"])
+    if filters.get("status"):
+        where += " AND status = ANY(%s)"
+        params.append(list(filters["status"]))
+    return where, params
+
+def start_rejudge(slug, filters, started_by=None, restart=False):
+    """Create a rejudge run for a problem. Returns (progress, error).
+
+    A running rejudge is an error unless `restart`, which supersedes it.
+    """
+    key = rejudge_key(slug)
+    if redis_client.hget(key, "status") == "running" and not restart:
+        return rejudge_progress(slug), "A rejudge is already running for this problem"
+
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        execute_query(cur, "SELECT COALESCE(MAX(id), 0) FROM submissions WHERE problem_id = %s", (slug,))
+        max_id = cur.fetchone()[0]
+        where, params = _rejudge_where(slug, filters, max_id)
+        execute_query(cur, f"SELECT COUNT(*) FROM submissions WHERE {where}", params)
+        total = cur.fetchone()[0]
     finally:
         conn.close()
 
+    run_id = uuid.uuid4().hex[:12]
+    pipe = redis_client.pipeline()
+    pipe.delete(key)
+    pipe.hset(key, mapping={
+        "id": run_id, "status": "running", "filters": json.dumps(filters), "started_by": started_by or "",
+        "total": total, "done": 0, "changed": 0, "errors": 0, "cursor": 0, "max_id": max_id,
+        "started_at": time.time(), "finished_at": "",
+    })
+    pipe.execute()
+    print(f"Rejudge {run_id} of {slug}: {total} submissions")
+    schedule_rejudge(slug, run_id)
+    return rejudge_progress(slug), None
+
+def schedule_rejudge(slug, run_id):
+    """Hand the next batch to a judge worker, or to a thread here without the queue."""
+    if JUDGE_QUEUE_ENABLED:
+        try:
+            job = judge_queues["rejudge"].enqueue("server.rejudge_job", args=(slug, run_id),
+                                                  job_timeout=REJUDGE_LEASE_TTL, result_ttl=60, failure_ttl=3600)
+            redis_client.hset(rejudge_key(slug), "job_id", job.id)
+            return
+        except redis.RedisError as e:
+            print(f"Judge queue unavailable, rejudging inline: {e}")
+    with _rejudge_threads_lock:
+        thread = _rejudge_threads.get(slug)
+        if thread and thread.is_alive():
+            return
+        thread = threading.Thread(target=_rejudge_loop, args=(slug, run_id), daemon=True)
+        _rejudge_threads[slug] = thread
+        thread.start()
+
+def _rejudge_loop(slug, run_id):
+    while rejudge_step(slug, run_id):
+        pass
+
+def rejudge_job(slug, run_id):
+    """RQ entry point: one batch per job, so user submissions queued meanwhile go first."""
+    if rejudge_step(slug, run_id):
+        schedule_rejudge(slug, run_id)
+
+def _rejudge_one(slug, run_id, lease_key, sub_id, language, code):
+    """Judge one stored submission. Returns the result, or None if it could not be judged."""
+    result = verdict_cache_get(slug, language, code, JUDGE_FAIL_FAST_SUBMIT)
+    while result is None:
+        result = execute_code_in_docker(language, code, slug, f"rejudge:{slug}", fail_fast=JUDGE_FAIL_FAST_SUBMIT,
+                                        priority="rejudge")
+        if result.get("status") != "Queued":
+            verdict_cache_put(slug, language, code, result)
+            break
+        # Lowest priority: wait for a slot as long as the run is still wanted
+        if redis_client.hmget(rejudge_key(slug), "id", "status") != [run_id, "running"]:
+            return None
+        redis_client.expire(lease_key, REJUDGE_LEASE_TTL)
+        result = None
+    redis_client.expire(lease_key, REJUDGE_LEASE_TTL)
+    if "error" in result:
+        print(f"  Rejudge of submission {sub_id} failed: {result['error']}")
+        return None
+    return result
+
+def rejudge_step(slug, run_id):
+    """Judge and store the next batch. Returns True while more batches remain."""
+    key = rejudge_key(slug)
+    lease_key = f"rejudge-lease:{slug}"
+    owner = uuid.uuid4().hex
+    if not redis_client.set(lease_key, owner, nx=True, ex=REJUDGE_LEASE_TTL):
+        return False  # another process is on it
+    try:
+        state = redis_client.hgetall(key)
+        if state.get("id") != run_id or state.get("status") != "running":
+            return False
+
+        filters = json.loads(state.get("filters", "{}"))
+        where, params = _rejudge_where(slug, filters, int(state["max_id"]))
+        conn = get_db_connection()
+        try:
+            cur = conn.cursor()
+            execute_query(cur,
+                "SELECT id, user_id, language, (SELECT data FROM blobs WHERE hash = code_hash), status "
+                f"FROM submissions WHERE {where} AND id > %s ORDER BY id LIMIT %s",
+                params + [int(state["cursor"]), REJUDGE_BATCH])
+            rows = [(sub_id, user_id, language, blobs.unpack(code), status)
+                    for sub_id, user_id, language, code, status in cur.fetchall()]
+        finally:
+            conn.close()
+
+        if not rows:
+            conn = get_db_connection()
+            try:
+                cur = conn.cursor()
+                # Not `where`: a status filter no longer matches the verdicts that changed
+                execute_query(cur, "SELECT MIN(created_at) FROM submissions WHERE problem_id = %s AND id <= %s",
+                              (slug, int(state["max_id"])))
+                first_rejudged = cur.fetchone()[0]
+            finally:
+                conn.close()
+            if first_rejudged:
+                refresh_rollups(first_rejudged)
+            redis_client.hset(key, mapping={"status": "done", "finished_at": time.time()})
+            # Accepted-runtime distributions are rebuilt from the new verdicts on next use
+            cache_delete_pattern(f"usage:*:{slug}:*")
+            cache_delete_pattern("problems:*")
+            redis_client.delete("admin:stats")
+            rebuild_leaderboards()
+            print(f"Rejudge {run_id} of {slug} finished")
+            return False
+
+        with ThreadPoolExecutor(max_workers=REJUDGE_PARALLEL) as pool:
+            results = list(pool.map(lambda r: _rejudge_one(slug, run_id, lease_key, r[0], r[2], r[3]), rows))
+
+        updates = []
+        changed_users = set()
+        changed = errors = 0
+        for (sub_id, user_id, _, _, old_status), result in zip(rows, results):
+            if result is None:
+                errors += 1
+                continue
+            updates.append((sub_id, result["status"], result.get("output", ""),
+                            result.get("cpu_time_ms"), result.get("peak_memory_kb")))
+            if result["status"] != old_status:
+                changed += 1
+                changed_users.add(user_id)
+
+        # A cancel while this batch ran still records what was judged
+        if updates:
+            conn = get_db_connection()
+            try:
+                cur = conn.cursor()
+                output_hashes = blobs.store(cur, [blobs.summarize_output(u[2] or "") for u in updates])
+                psycopg2.extras.execute_values(cur,
+                    """UPDATE submissions AS s
+                       SET status = v.status, output_hash = v.output_hash, cpu_time_ms = v.cpu, peak_memory_kb = v.mem
+                       FROM (VALUES %s) AS v (id, status, output_hash, cpu, mem)
+                       WHERE s.id = v.id""",
+                    [(sub_id, status, output_hash, cpu, mem)
+                     for (sub_id, status, _, cpu, mem), output_hash in zip(updates, output_hashes)],
+                    template="(%s, %s, %s::bytea, %s::integer, %s::integer)")
+                if changed_users:
+                    repair_stats(cur, user_ids=changed_users, problem_ids=[slug])
+                conn.commit()
+            finally:
+                conn.close()
+
+        pipe = redis_client.pipeline()
+        pipe.hset(key, "cursor", rows[-1][0])
+        pipe.hincrby(key, "done", len(rows))
+        pipe.hincrby(key, "changed", changed)
+        pipe.hincrby(key, "errors", errors)
+        # Recent submissions on a profile show verdicts and usage, changed or not
+        for user_id in {row[1] for row in rows}:
+            pipe.delete(profile_key(user_id))
+        pipe.execute()
+        return redis_client.hget(key, "status") == "running"
+    finally:
+        if redis_client.get(lease_key) == owner:
+            redis_client.delete(lease_key)
+
+def rejudge_sweeper():
+    """Resume rejudges left behind by a restart or a crashed worker."""
+    while True:
+        try:
+            for key in redis_client.scan_iter("rejudge:*"):
+                state = redis_client.hgetall(key)
+                slug = key.split(":", 1)[1]
+                if state.get("status") != "running" or redis_client.exists(f"rejudge-lease:{slug}"):
+                    continue
+                if JUDGE_QUEUE_ENABLED and state.get("job_id"):
+                    try:
+                        if Job.fetch(state["job_id"], connection=rq_redis).get_status() in (
+                                "queued", "started", "deferred", "scheduled"):
+                            continue
+                    except NoSuchJobError:
+                        pass
+                print(f"Resuming rejudge {state['id']} of {slug}")
+                schedule_rejudge(slug, state["id"])
+        except redis.RedisError as e:
+            print(f"Rejudge sweeper error: {e}")
+        time.sleep(30)
+
+@app.route("/api/v1/admin/problems/<slug>/rejudge", methods=["POST"])
+@require_admin
+def admin_start_rejudge(slug):
+    """Rejudge a problem's submissions; optional filters: {"language": "cpp", "status": ["Pass"]}."""
+    data = request.get_json(silent=True) or {}
+    filters = {}
+    if data.get("language"):
+        filters["language"] = data["language"]
+    if data.get("status"):
+        filters["status"] = data["status"] if isinstance(data["status"], list) else [data["status"]]
+    if not os.path.isdir(os.path.join(PROBLEMS_DIR, slug)):
+        return jsonify({"error": "Problem not found"}), 404
+    progress, error = start_rejudge(slug, filters, started_by=g.user_id)
+    if error:
+        return jsonify({"error": error, "rejudge": progress}), 409
+    return jsonify(progress), 202
+
+@app.route("/api/v1/admin/problems/<slug>/rejudge", methods=["GET"])
+@require_admin
+def admin_rejudge_progress(slug):
+    progress = rejudge_progress(slug)
+    if not progress:
+        return jsonify({"error": "No rejudge for this problem"}), 404
+    return jsonify(progress)
+
+@app.route("/api/v1/admin/problems/<slug>/rejudge", methods=["DELETE"])
+@require_admin
+def admin_cancel_rejudge(slug):
+    key = rejudge_key(slug)
+    if redis_client.hget(key, "status") != "running":
+        return jsonify({"error": "No running rejudge for this problem"}), 404
+    redis_client.hset(key, mapping={"status": "cancelled", "finished_at": time.time()})
+    return jsonify(rejudge_progress(slug))
+
+# --- Judge Job Status ---
+@app.route("/api/v1/jobs/<job_id>", methods=["GET"])
+@require_auth
+@limiter.exempt
+def get_judge_job(job_id):
+    """Poll a queued run/submission. Finished jobs carry the same payload the sync endpoints return."""
+    try:
+        job = Job.fetch(job_id, connection=rq_redis)
+    except (NoSuchJobError, ValueError):
+        return jsonify({"error": "Job not found or expired"}), 404
+    if job.meta.get("user_id") != g.user_id:
+        return jsonify({"error": "Job not found or expired"}), 404
+
+    state = job.get_status()
+    if state == "finished":
+        payload, status_code = job.result
+        return jsonify({"job_id": job_id, "state": "finished", "http_status": status_code, "result": payload})
+    if state in ("failed", "stopped", "canceled"):
+        return jsonify({"job_id": job_id, "state": "failed", "http_status": 500,
+                        "result": {"error": "Judging failed. Please try again."}})
+    position = job.get_position() if state == "queued" else None
+    return jsonify({"job_id": job_id, "state": "running" if state == "started" else "queued", "position": position})
+
 # --- Chat Endpoints ---
 @app.route("/api/v1/chat/<problem_id>", methods=["GET"])
 @require_auth
@@ -1934,28 +4827,123 @@ def save_chat_history():
     finally:
         conn.close()
 
-# --- Orphaned Container Cleanup Thread ---
-def cleanup_orphaned_containers():
-    """Periodically kill Docker containers older than 10 minutes to prevent RAM leaks."""
+# --- Container Reaper ---
+# Every judge and playground container carries labels set at creation: its role,
+# the owning process (JUDGE_POOL_ID, kept alive as a Redis heartbeat), a run id
+# and a deadline. The reaper asks Docker only for labelled containers, in one
+# call, and removes those whose owner stopped heartbeating, and its own ones
+# past their deadline. Containers of a live owner are left to that owner's
+# reaper, since only it knows whether one is leased. A Docker events
+# subscription reacts to container exits as they happen instead of waiting for
+# the next sweep.
+REAPER_INTERVAL = 30
+REAPER_GRACE = 60           # seconds past a deadline before a container is removed
+OWNER_HEARTBEAT_TTL = 90
+reaper_stats = {"sweeps": 0, "reaped": 0, "events": 0, "last_sweep": None}
+
+def owner_alive_key(owner):
+    return f"judge:owner:{owner}"
+
+def _reap(container_id, why):
+    try:
+        client.api.remove_container(container_id, force=True, v=True)
+        reaper_stats["reaped"] += 1
+        print(f"Reaped container {container_id[:12]} ({why})")
+    except docker.errors.NotFound:
+        pass
+    except Exception as e:
+        print(f"Could not remove container {container_id[:12]}: {e}")
+
+def _dead_owners(owners):
+    """Owners without a heartbeat; empty when Redis cannot tell."""
+    owners = [o for o in owners if o and o != JUDGE_POOL_ID]
+    if not owners:
+        return set()
+    try:
+        pipe = redis_client.pipeline()
+        for owner in owners:
+            pipe.exists(owner_alive_key(owner))
+        return {o for o, alive in zip(owners, pipe.execute()) if not alive}
+    except redis.RedisError:
+        return set()
+
+def reap_containers():
+    """One sweep over labelled containers."""
+    containers = client.api.containers(all=True, filters={"label": LABEL_ROLE})
+    now = time.time()
+    dead = _dead_owners({(c.get("Labels") or {}).get(LABEL_OWNER) for c in containers})
+    for c in containers:
+        labels = c.get("Labels") or {}
+        try:
+            deadline = float(labels.get(LABEL_DEADLINE, 0))
+        except ValueError:
+            deadline = 0
+        if labels.get(LABEL_OWNER) in dead:
+            _reap(c["Id"], f"owner {labels.get(LABEL_OWNER)} is gone")
+        elif labels.get(LABEL_OWNER) == JUDGE_POOL_ID and deadline and now > deadline + REAPER_GRACE:
+            _reap(c["Id"], f"{labels.get(LABEL_ROLE)} {labels.get(LABEL_RUN)} past its deadline")
+    reaper_stats["sweeps"] += 1
+    reaper_stats["last_sweep"] = datetime.now(timezone.utc).isoformat()
+
+def reap_unlabelled_containers():
+    """Stopped judger containers left from before labels existed; checked once at startup.
+
+    Running ones may belong to a process on the old code during a rolling deploy,
+    so they are left alone.
+    """
+    try:
+        stopped = client.api.containers(all=True, filters={"ancestor": JUDGE_IMAGE, "status": ["exited", "dead"]})
+        for c in stopped:
+            if LABEL_ROLE not in (c.get("Labels") or {}):
+                _reap(c["Id"], "unlabelled")
+    except Exception as e:
+        print(f"Unlabelled container sweep failed: {e}")
+
+def on_container_exit(event):
+    attrs = event.get("Actor", {}).get("Attributes", {})
+    container_id = event.get("Actor", {}).get("ID") or event.get("id")
+    reaper_stats["events"] += 1
+    owner = attrs.get(LABEL_OWNER)
+    if owner == JUDGE_POOL_ID:
+        # A warm container that died while idle can never be leased; a leased
+        # one is retired by the run that notices the failure
+        if attrs.get(LABEL_ROLE) == "judge" and judge_pool.discard(container_id):
+            _reap(container_id, "exited while idle")
+    elif owner in _dead_owners([owner]):
+        _reap(container_id, f"exited, owner {owner} is gone")
+
+def watch_container_events():
     while True:
-        time.sleep(60)
         try:
-            for con in client.containers.list():
-                # Only clean up judger containers
-                if con.image.tags and "judger:latest" in con.image.tags:
-                    created = con.attrs.get("Created", "")
-                    if created:
-                        from datetime import datetime, timezone
-                        created_dt = datetime.fromisoformat(created.replace("Z", "+00:00"))
-                        age = (datetime.now(timezone.utc) - created_dt).total_seconds()
-                        if age > 120:  # 2 minutes
-                            print(f"Cleaning orphaned container {con.short_id} (age: {int(age)}s)")
-                            con.remove(force=True)
+            events = client.events(decode=True, filters={
+                "type": "container", "event": ["die", "oom"], "label": LABEL_ROLE,
+            })
+            for event in events:
+                on_container_exit(event)
         except Exception as e:
-            pass  # Silently handle any Docker API errors
-
-cleanup_thread = threading.Thread(target=cleanup_orphaned_containers, daemon=True)
-cleanup_thread.start()
+            print(f"Container event stream error: {e}")
+        time.sleep(5)
 
-print("Server starting on 9000...")
-app.run(host="0.0.0.0", port=9000)
+def container_reaper():
+    reap_unlabelled_containers()
+    while True:
+        try:
+            redis_client.set(owner_alive_key(JUDGE_POOL_ID), 1, ex=OWNER_HEARTBEAT_TTL)
+        except redis.RedisError:
+            pass
+        try:
+            reap_containers()
+        except Exception as e:
+            print(f"Container reaper error: {e}")
+        time.sleep(REAPER_INTERVAL)
+
+threading.Thread(target=container_reaper, daemon=True).start()
+threading.Thread(target=watch_container_events, daemon=True).start()
+if __name__ == "__main__":
+    # With the judge queue enabled, runs happen in worker.py processes instead
+    if not JUDGE_QUEUE_ENABLED:
+        judge_executor.start()
+    threading.Thread(target=rejudge_sweeper, daemon=True).start()
+    threading.Thread(target=rollup_refresher, daemon=True).start()
+    print("Server starting on 9000...")
+    app.run(host="0.0.0.0", port=9000)
@@ -0,0 +1,20 @@
+"""Judge worker: executes queued /execute and /submit jobs.
+
+Run any number of these next to the web server (they need Docker and the
+same .env), then set JUDGE_QUEUE_ENABLED=true for the web process:
+
+    python worker.py
+"""
+from rq import SimpleWorker
+
+import server
+
+if __name__ == "__main__":
+    # SimpleWorker runs jobs in this process instead of forking per job, so the
+    # warm container pool and DB/Redis connections are reused across jobs.
+    server.judge_executor.start()
+    worker = SimpleWorker(
+        [server.judge_queues["submit"], server.judge_queues["run"], server.judge_queues["rejudge"]],
+        connection=server.rq_redis,
+    )
+    worker.work()
@@ -0,0 +1,346 @@
+// Shared runtime for the problem drivers in backend/problems.
+//
+// Installed in the judger image at /opt/algoarena/include. Drivers read test
+// data through algoarena::Reader and report cases through algoarena::Emitter,
+// which writes the judge's result protocol:
+//
+//     CASE|<id>|<PASS|FAIL>|<input>|<actual>|<expected>
+#pragma once
+
+#include <algorithm>
+#include <chrono>
+#include <cmath>
+#include <csignal>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <string>
+#include <type_traits>
+#include <vector>
+#include <unistd.h>
+
+namespace algoarena {
+
+// Buffered reader over stdin with whitespace tokens, integers and lines.
+class Reader {
+public:
+    explicit Reader(std::FILE* in = stdin) : in_(in) {}
+
+    // Next integer; false at end of input or if the next token is not a number
+    template <class T>
+    bool next_int(T& out) {
+        int c = skip_space();
+        bool neg = false;
+        if (c == '-' || c == '+') {
+            neg = (c == '-');
+            ++pos_;
+            c = peek();
+        }
+        if (c < '0' || c > '9') return false;
+        T value = 0;
+        while ((c = peek()) >= '0' && c <= '9') {
+            value = value * 10 + (c - '0');
+            ++pos_;
+        }
+        out = neg ? -value : value;
+        return true;
+    }
+
+    // `n` integers into `out`; false if the input ends early
+    template <class T>
+    bool next_ints(std::vector<T>& out, std::size_t n) {
+        out.resize(n);
+        for (std::size_t i = 0; i < n; i++)
+            if (!next_int(out[i])) return false;
+        return true;
+    }
+
+    // Next whitespace-separated token
+    bool next_token(std::string& out) {
+        int c = skip_space();
+        if (c == EOF) return false;
+        out.clear();
+        while ((c = peek()) != EOF && !is_space(c)) {
+            out.push_back(static_cast<char>(c));
+            ++pos_;
+        }
+        return true;
+    }
+
+    // Next line without its line ending; false at end of input
+    bool next_line(std::string& out) {
+        if (peek() == EOF) return false;
+        out.clear();
+        int c;
+        while ((c = peek()) != EOF) {
+            ++pos_;
+            if (c == '\n') break;
+            out.push_back(static_cast<char>(c));
+        }
+        if (!out.empty() && out.back() == '\r') out.pop_back();
+        return true;
+    }
+
+    // Typed reads for generated drivers: scalars are one token (strings use
+    // "" for the empty string), vectors are a length followed by elements.
+    bool read(int& v) { return next_int(v); }
+    bool read(long long& v) { return next_int(v); }
+    bool read(double& v) {
+        if (!next_token(tok_)) return false;
+        char* end;
+        v = std::strtod(tok_.c_str(), &end);
+        return end != tok_.c_str();
+    }
+    bool read(bool& v) {
+        if (!next_token(tok_)) return false;
+        v = (tok_ == "true");
+        return true;
+    }
+    bool read(char& v) {
+        if (!next_token(tok_)) return false;
+        v = tok_[0];
+        return true;
+    }
+    bool read(std::string& v) {
+        if (!next_token(v)) return false;
+        if (v == "\"\"") v.clear();
+        return true;
+    }
+    template <class T>
+    bool read(std::vector<T>& v) {
+        long long n;
+        if (!next_int(n) || n < 0) return false;
+        v.resize(static_cast<std::size_t>(n));
+        for (auto& x : v)
+            if (!read(x)) return false;
+        return true;
+    }
+
+private:
+    static bool is_space(int c) { return c == ' ' || c == '\n' || c == '\r' || c == '\t' || c == '\v' || c == '\f'; }
+
+    int peek() {
+        if (pos_ == len_) {
+            len_ = std::fread(buf_, 1, sizeof(buf_), in_);
+            pos_ = 0;
+            if (len_ == 0) return EOF;
+        }
+        return static_cast<unsigned char>(buf_[pos_]);
+    }
+
+    int skip_space() {
+        int c;
+        while ((c = peek()) != EOF && is_space(c)) ++pos_;
+        return c;
+    }
+
+    std::FILE* in_;
+    char buf_[1 << 16];
+    std::size_t pos_ = 0;
+    std::size_t len_ = 0;
+    std::string tok_;
+};
+
+inline std::string field(const std::string& s) { return s; }
+inline std::string field(const char* s) { return s; }
+inline std::string field(char c) { return std::string(1, c); }
+template <class T, class = typename std::enable_if<std::is_integral<T>::value && !std::is_same<T, bool>::value>::type>
+inline std::string field(T value) { return std::to_string(value); }
+inline std::string bool_str(bool b) { return b ? "true" : "false"; }
+
+// "[1,2,3]"
+template <class T>
+std::string int_array_str(const std::vector<T>& v) {
+    std::string s = "[";
+    for (std::size_t i = 0; i < v.size(); i++) {
+        if (i) s += ',';
+        s += std::to_string(v[i]);
+    }
+    return s + "]";
+}
+
+// "[\"a\",\"b\"]"
+inline std::string char_array_str(const std::vector<char>& v) {
+    std::string s = "[";
+    for (std::size_t i = 0; i < v.size(); i++) {
+        if (i) s += ',';
+        s += '"';
+        s += v[i];
+        s += '"';
+    }
+    return s + "]";
+}
+
+// Integers of the first [...] at or after `from`; `from` is moved past it
+template <class T = int>
+std::vector<T> parse_int_array(const std::string& s, std::size_t& from) {
+    std::vector<T> out;
+    std::size_t i = s.find('[', from);
+    if (i == std::string::npos) return out;
+    std::size_t end = s.find(']', i);
+    if (end == std::string::npos) end = s.size();
+    const char* p = s.c_str() + i + 1;
+    const char* stop = s.c_str() + end;
+    while (p < stop) {
+        char* next;
+        long long value = std::strtoll(p, &next, 10);
+        if (next == p) {
+            ++p;
+            continue;
+        }
+        out.push_back(static_cast<T>(value));
+        p = next;
+    }
+    from = end + 1;
+    return out;
+}
+
+// One-character strings of the first [...] at or after `from`: ["h","i"]
+inline std::vector<char> parse_char_array(const std::string& s, std::size_t& from) {
+    std::vector<char> out;
+    std::size_t i = s.find('[', from);
+    if (i == std::string::npos) return out;
+    for (i = i + 1; i < s.size() && s[i] != ']'; i++) {
+        if (s[i] == '"' && i + 2 < s.size() && s[i + 2] == '"') {
+            out.push_back(s[i + 1]);
+            i += 2;
+        }
+    }
+    from = i + 1;
+    return out;
+}
+
+// Position just past "key": in a flat JSON object, or npos
+inline std::size_t json_key(const std::string& s, const char* key) {
+    std::string quoted = std::string("\"") + key + "\"";
+    std::size_t i = s.find(quoted);
+    if (i == std::string::npos) return i;
+    i = s.find(':', i + quoted.size());
+    return i == std::string::npos ? i : i + 1;
+}
+
+// JSON-like rendering of values for the input/actual/expected fields
+template <class T, class = typename std::enable_if<std::is_integral<T>::value && !std::is_same<T, bool>::value
+                                                   && !std::is_same<T, char>::value>::type>
+inline std::string show(T value) { return std::to_string(value); }
+inline std::string show(bool b) { return bool_str(b); }
+inline std::string show(char c) { return std::string("\"") + c + "\""; }
+inline std::string show(const std::string& s) { return "\"" + s + "\""; }
+inline std::string show(double d) {
+    char buf[32];
+    std::snprintf(buf, sizeof(buf), "%.10g", d);
+    return buf;
+}
+template <class T>
+std::string show(const std::vector<T>& v) {
+    std::string s = "[";
+    for (std::size_t i = 0; i < v.size(); i++) {
+        if (i) s += ',';
+        s += show(v[i]);
+    }
+    return s + "]";
+}
+
+// Same elements in any order
+template <class T>
+bool same_elements(std::vector<T> actual, std::vector<T> expected) {
+    std::sort(actual.begin(), actual.end());
+    std::sort(expected.begin(), expected.end());
+    return actual == expected;
+}
+
+// Within `tolerance`, absolute below 1 and relative above
+inline bool approx_equal(double actual, double expected, double tolerance) {
+    return std::fabs(actual - expected) <= tolerance * std::max(1.0, std::fabs(expected));
+}
+template <class T>
+bool approx_equal(const std::vector<T>& actual, const std::vector<T>& expected, double tolerance) {
+    if (actual.size() != expected.size()) return false;
+    for (std::size_t i = 0; i < actual.size(); i++)
+        if (!approx_equal(actual[i], expected[i], tolerance)) return false;
+    return true;
+}
+
+// Buffered writer for CASE lines. Output is flushed at exit (also on crashes),
+// every 64 KB, every 250 ms, and right after a failing case so the judge can
+// stop early.
+class Emitter {
+public:
+    Emitter() {
+        instance() = this;
+        std::atexit(flush_instance);
+        for (int sig : {SIGSEGV, SIGABRT, SIGFPE, SIGBUS, SIGILL}) std::signal(sig, on_crash);
+        last_flush_ = std::chrono::steady_clock::now();
+    }
+
+    ~Emitter() {
+        flush();
+        instance() = nullptr;
+    }
+
+    // Report the next case; ids are assigned in order starting at 1
+    template <class I, class A, class E>
+    void report(bool passed, const I& input, const A& actual, const E& expected) {
+        write(++case_id_, passed ? "PASS" : "FAIL", field(input), field(actual), field(expected));
+    }
+
+    void write(long long case_id, const char* status, const std::string& input,
+               const std::string& actual, const std::string& expected) {
+        buf_ += "CASE|";
+        buf_ += std::to_string(case_id);
+        buf_ += '|';
+        buf_ += status;
+        buf_ += '|';
+        buf_ += input;
+        buf_ += '|';
+        buf_ += actual;
+        buf_ += '|';
+        buf_ += expected;
+        buf_ += '\n';
+        auto now = std::chrono::steady_clock::now();
+        if (status[0] == 'F' || buf_.size() >= (1 << 16) || now - last_flush_ >= std::chrono::milliseconds(250)) {
+            flush();
+            last_flush_ = now;
+        }
+    }
+
+    void flush() {
+        std::size_t done = 0;
+        while (done < buf_.size()) {
+            ssize_t n = ::write(1, buf_.data() + done, buf_.size() - done);
+            if (n <= 0) break;
+            done += static_cast<std::size_t>(n);
+        }
+        buf_.clear();
+    }
+
+private:
+    static Emitter*& instance() {
+        static Emitter* current = nullptr;
+        return current;
+    }
+
+    static void flush_instance() {
+        if (instance()) instance()->flush();
+    }
+
+    static void on_crash(int sig) {
+        // Only write(2) here: keep the cases reported before the crash
+        if (Emitter* e = instance()) {
+            std::size_t done = 0;
+            while (done < e->buf_.size()) {
+                ssize_t n = ::write(1, e->buf_.data() + done, e->buf_.size() - done);
+                if (n <= 0) break;
+                done += static_cast<std::size_t>(n);
+            }
+        }
+        std::signal(sig, SIG_DFL);
+        std::raise(sig);
+    }
+
+    std::string buf_;
+    long long case_id_ = 0;
+    std::chrono::steady_clock::time_point last_flush_;
+};
+
+}  // namespace algoarena
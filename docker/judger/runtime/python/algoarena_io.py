@@ -0,0 +1,195 @@
+"""Shared runtime for the problem drivers in backend/problems.
+
+Installed in the judger image at /opt/algoarena/python. Drivers read test data
+through TokenReader / lines() and report cases through Emitter, which writes
+the judge's result protocol:
+
+    CASE|<id>|<PASS|FAIL>|<input>|<actual>|<expected>
+"""
+import atexit
+import sys
+import time
+
+SANDBOX_DIR = "/home/sandbox"
+CHUNK_SIZE = 1 << 16
+
+
+def load_solution():
+    """Import the user's Solution class, or report the import failure and exit."""
+    sys.path.append(SANDBOX_DIR)
+    try:
+        from solution import Solution
+    except ImportError:
+        print("CASE|0|FAIL|Import Error|Could not import Solution class|N/A", flush=True)
+        sys.exit(0)
+    return Solution
+
+
+class TokenReader:
+    """Whitespace-separated tokens from a binary stream, read in chunks."""
+
+    def __init__(self, stream=None, chunk_size=CHUNK_SIZE):
+        self.stream = stream if stream is not None else sys.stdin.buffer
+        self.chunk_size = chunk_size
+        self.tokens = []
+        self.pos = 0
+        self.partial = b""
+        self.eof = False
+
+    def _fill(self, count):
+        """Make sure `count` tokens are buffered. Returns False at end of input."""
+        while len(self.tokens) - self.pos < count:
+            if self.eof:
+                return False
+            chunk = self.stream.read(self.chunk_size)
+            if not chunk:
+                self.eof = True
+                chunk = b" "
+            data = self.partial + chunk
+            parts = data.split()
+            # A token cut by the chunk boundary is completed by the next read
+            if parts and not data[-1:].isspace():
+                self.partial = parts.pop()
+            else:
+                self.partial = b""
+            # Drop the consumed prefix only once it is most of the buffer, so
+            # a long read appends in amortized linear time
+            if self.pos > len(self.tokens) // 2:
+                del self.tokens[:self.pos]
+                self.pos = 0
+            self.tokens.extend(parts)
+        return True
+
+    def has_next(self):
+        return self._fill(1)
+
+    def token(self):
+        if not self._fill(1):
+            raise EOFError("no more input")
+        self.pos += 1
+        return self.tokens[self.pos - 1].decode()
+
+    def int(self):
+        if not self._fill(1):
+            raise EOFError("no more input")
+        self.pos += 1
+        return int(self.tokens[self.pos - 1])
+
+    def ints(self, n):
+        """The next `n` tokens as a list of ints, converted in bulk."""
+        if not self._fill(n):
+            raise EOFError("no more input")
+        start = self.pos
+        self.pos += n
+        return list(map(int, self.tokens[start:self.pos]))
+
+    def float(self):
+        return float(self.token())
+
+    def floats(self, n):
+        if not self._fill(n):
+            raise EOFError("no more input")
+        start = self.pos
+        self.pos += n
+        return list(map(float, self.tokens[start:self.pos]))
+
+    def bool(self):
+        return self.token() == "true"
+
+    def string(self):
+        """One token; `""` stands for the empty string."""
+        token = self.token()
+        return "" if token == '""' else token
+
+    def strings(self, n):
+        if not self._fill(n):
+            raise EOFError("no more input")
+        start = self.pos
+        self.pos += n
+        return ["" if t == b'""' else t.decode() for t in self.tokens[start:self.pos]]
+
+
+def lines(stream=None):
+    """Non-blank input lines, without their line endings."""
+    stream = stream if stream is not None else sys.stdin
+    for line in stream:
+        line = line.rstrip("\r\n")
+        if line.strip():
+            yield line
+
+
+def show(value):
+    """JSON-like rendering of a value for the input/actual/expected fields."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return f'"{value}"'
+    if isinstance(value, float):
+        return f"{value:.10g}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(map(show, value)) + "]"
+    if value is None:
+        return "null"
+    return str(value)
+
+
+def same_elements(actual, expected):
+    """Same elements in any order."""
+    try:
+        return sorted(actual) == sorted(expected)
+    except TypeError:
+        return False
+
+
+def approx_equal(actual, expected, tolerance=1e-6):
+    """Numbers (or lists of numbers) within `tolerance`, absolute below 1 and relative above."""
+    if isinstance(expected, list):
+        return (isinstance(actual, (list, tuple)) and len(actual) == len(expected)
+                and all(approx_equal(a, e, tolerance) for a, e in zip(actual, expected)))
+    try:
+        return abs(actual - expected) <= tolerance * max(1.0, abs(expected))
+    except TypeError:
+        return False
+
+
+class Emitter:
+    """Buffered writer for CASE lines.
+
+    Output is flushed at exit, every `max_buffer` bytes, every `max_delay`
+    seconds, and right after a failing case so the judge can stop early.
+    """
+
+    def __init__(self, stream=None, max_buffer=CHUNK_SIZE, max_delay=0.25):
+        self.stream = stream if stream is not None else sys.stdout
+        self.max_buffer = max_buffer
+        self.max_delay = max_delay
+        self.parts = []
+        self.size = 0
+        self.last_flush = time.monotonic()
+        self.case_id = 0
+        atexit.register(self.flush)
+
+    def case(self, passed, input_str, actual, expected):
+        """Report the next case; ids are assigned in order starting at 1."""
+        self.case_id += 1
+        self.write(self.case_id, "PASS" if passed else "FAIL", input_str, actual, expected)
+
+    def error(self, input_str, message, expected="N/A"):
+        """Report the next case as failed because it could not be run."""
+        self.case(False, input_str, message, expected)
+
+    def write(self, case_id, status, input_str, actual, expected):
+        line = f"CASE|{case_id}|{status}|{input_str}|{actual}|{expected}\n"
+        self.parts.append(line)
+        self.size += len(line)
+        if (status == "FAIL" or self.size >= self.max_buffer
+                or time.monotonic() - self.last_flush >= self.max_delay):
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            self.stream.write("".join(self.parts))
+            self.parts = []
+            self.size = 0
+        self.stream.flush()
+        self.last_flush = time.monotonic()
@@ -25,15 +25,18 @@ const API_ROUTES = [
   { method: "GET", badge: "get", path: "/api/v1/problems/:slug", desc: "Get problem details (cached 10min)", auth: "No" },
   { method: "POST", badge: "post", path: "/api/v1/execute", desc: "Run code against test cases", auth: "Yes" },
   { method: "POST", badge: "post", path: "/api/v1/submit", desc: "Submit code for judging", auth: "Yes" },
+  { method: "GET", badge: "get", path: "/api/v1/jobs/:job_id", desc: "Poll a queued run or submission", auth: "Yes" },
   { method: "GET", badge: "get", path: "/api/v1/submissions", desc: "Get user submission history", auth: "Yes" },
   { method: "GET", badge: "get", path: "/api/v1/stats", desc: "Get user stats (cached 2min)", auth: "Yes" },
   { method: "GET", badge: "get", path: "/api/v1/chat/:problem_id", desc: "Load AI chat history (Redis+DB)", auth: "Yes" },
   { method: "POST", badge: "post", path: "/api/v1/chat/save", desc: "Save AI chat conversation", auth: "Yes" },
-  { method: "GET", badge: "get", path: "/api/v1/admin/stats", desc: "Admin dashboard stats (cached 30s)", auth: "Admin" },
+  { method: "GET", badge: "get", path: "/api/v1/admin/stats", desc: "Admin dashboard stats from rollups (cached 30s)", auth: "Admin" },
+  { method: "GET", badge: "get", path: "/api/v1/admin/users", desc: "Paged user list (sort, search, role filter)", auth: "Admin" },
   { method: "POST", badge: "post", path: "/api/v1/admin/problems", desc: "Create a new problem (admin)", auth: "Admin" },
   { method: "PUT", badge: "put", path: "/api/v1/admin/problems/:slug", desc: "Update a problem (admin)", auth: "Admin" },
   { method: "DELETE", badge: "delete", path: "/api/v1/admin/problems/:slug", desc: "Delete a problem (admin)", auth: "Admin" },
   { method: "POST", badge: "post", path: "/api/v1/admin/set-admin", desc: "Set user admin status", auth: "Admin" },
+  { method: "GET", badge: "get", path: "/api/v1/admin/judge", desc: "Judge queue, latency and warm pool stats", auth: "Admin" },
 ];
 
 const STACK: { icon: ReactNode; title: string; sub: string; bg: string; items: string[] }[] = [
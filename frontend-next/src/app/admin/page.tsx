@@ -2,7 +2,13 @@
 
 import { useState, useEffect } from "react";
 import { useRouter } from "next/navigation";
-import { getApiBase, fetchJSON, authHeaders, authFetch } from "@/lib/api";
+import {
+  getApiBase,
+  fetchJSON,
+  authHeaders,
+  authFetch,
+  resolveJudgeResponse,
+} from "@/lib/api";
 import Navbar from "@/components/Navbar";
 
 import { showToast } from "@/components/Toast";
@@ -31,17 +37,27 @@ interface AdminStats {
     submissions: number;
     acceptance: number;
   }[];
-  recent_users: {
-    id: number;
-    username: string;
-    joined: string;
-    submissions: number;
-    solved: number;
-    last_active: string | null;
-    is_admin: boolean;
-  }[];
 }
 
+interface AdminUser {
+  id: number;
+  username: string;
+  joined: string | null;
+  submissions: number;
+  solved: number;
+  last_active: string | null;
+  is_admin: boolean;
+}
+
+interface AdminUsersPage {
+  users: AdminUser[];
+  next_cursor: number | null;
+}
+
+type UserSort = "submissions" | "solved" | "last_active" | "joined" | "username";
+
+const USERS_PAGE_SIZE = 50;
+
 type SidebarView = "dashboard" | "problems" | "users" | "submissions";
 
 export default function AdminPage() {
@@ -58,6 +74,13 @@ export default function AdminPage() {
   const [sidebarView, setSidebarView] = useState<SidebarView>("dashboard");
   const [adminStats, setAdminStats] = useState<AdminStats | null>(null);
 
+  const [users, setUsers] = useState<AdminUser[] | null>(null);
+  const [usersCursor, setUsersCursor] = useState<number | null>(null);
+  const [usersLoadingMore, setUsersLoadingMore] = useState(false);
+  const [userSort, setUserSort] = useState<UserSort>("submissions");
+  const [userRole, setUserRole] = useState<"" | "admin" | "user">("");
+  const [userQuery, setUserQuery] = useState("");
+
   const [formData, setFormData] = useState({
     slug: "",
     title: "",
@@ -106,6 +129,45 @@ export default function AdminPage() {
     }
   }
 
+  function usersUrl(cursor: number | null) {
+    const params = new URLSearchParams({
+      sort: userSort,
+      limit: String(USERS_PAGE_SIZE),
+    });
+    if (userQuery.trim()) params.set("q", userQuery.trim());
+    if (userRole) params.set("role", userRole);
+    if (cursor !== null) params.set("cursor", String(cursor));
+    return `${getApiBase()}/api/v1/admin/users?${params}`;
+  }
+
+  // First page whenever the Users view opens or its sort/filters change
+  useEffect(() => {
+    if (sidebarView !== "users") return;
+    const timer = setTimeout(() => {
+      fetchJSON<AdminUsersPage>(usersUrl(null))
+        .then((page) => {
+          setUsers(page?.users ?? []);
+          setUsersCursor(page?.next_cursor ?? null);
+        })
+        .catch(() => showToast("Failed to load users", "error"));
+    }, 250);
+    return () => clearTimeout(timer);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [sidebarView, userSort, userRole, userQuery]);
+
+  const loadMoreUsers = () => {
+    if (usersCursor === null || usersLoadingMore) return;
+    setUsersLoadingMore(true);
+    fetchJSON<AdminUsersPage>(usersUrl(usersCursor))
+      .then((page) => {
+        if (!page) return;
+        setUsers((prev) => [...(prev ?? []), ...page.users]);
+        setUsersCursor(page.next_cursor);
+      })
+      .catch(() => showToast("Failed to load more", "error"))
+      .finally(() => setUsersLoadingMore(false));
+  };
+
   const toggleUserAdmin = async (userId: number, currentStatus: boolean) => {
     try {
       const res = await authFetch(
@@ -118,7 +180,11 @@ export default function AdminPage() {
       );
       if (res.ok) {
         showToast(`User privileges updated`, "success");
-        fetchStats();
+        setUsers((prev) =>
+          prev?.map((u) =>
+            u.id === userId ? { ...u, is_admin: !currentStatus } : u,
+          ) ?? null,
+        );
       } else {
         const error = await res.json();
         throw new Error(error.error || "Failed to update user");
@@ -147,6 +213,7 @@ export default function AdminPage() {
       );
       if (res.ok) {
         showToast(`User deleted`, "success");
+        setUsers((prev) => prev?.filter((u) => u.id !== userId) ?? null);
         fetchStats();
       } else {
         const error = await res.json();
@@ -478,7 +545,7 @@ CRITICAL RULES:
           test_data: formData.test_data,
         }),
       });
-      const data = await res.json();
+      const { data } = await resolveJudgeResponse(res);
       const output = data.output || "No output";
       setTestOutput(output);
 
@@ -1001,6 +1068,39 @@ CRITICAL RULES:
             <div className="table-card fade-in-up">
               <div className="table-header">
                 <h3>All Users</h3>
+                <div style={{ display: "flex", gap: 8 }}>
+                  <input
+                    type="text"
+                    className="table-search"
+                    placeholder="Search users..."
+                    value={userQuery}
+                    onChange={(e) => setUserQuery(e.target.value)}
+                  />
+                  <select
+                    className="table-search"
+                    style={{ minWidth: 0 }}
+                    value={userRole}
+                    onChange={(e) =>
+                      setUserRole(e.target.value as "" | "admin" | "user")
+                    }
+                  >
+                    <option value="">All roles</option>
+                    <option value="admin">Admins</option>
+                    <option value="user">Users</option>
+                  </select>
+                  <select
+                    className="table-search"
+                    style={{ minWidth: 0 }}
+                    value={userSort}
+                    onChange={(e) => setUserSort(e.target.value as UserSort)}
+                  >
+                    <option value="submissions">Most submissions</option>
+                    <option value="solved">Most solved</option>
+                    <option value="last_active">Recently active</option>
+                    <option value="joined">Newest</option>
+                    <option value="username">Username</option>
+                  </select>
+                </div>
               </div>
               <table className="admin-table">
                 <thead>
@@ -1015,7 +1115,7 @@ CRITICAL RULES:
                   </tr>
                 </thead>
                 <tbody>
-                  {adminStats?.recent_users?.map((u) => (
+                  {users?.map((u) => (
                     <tr key={u.id}>
                       <td>#{u.id}</td>
                       <td className="table-title">
@@ -1050,7 +1150,7 @@ CRITICAL RULES:
                       </td>
                       <td style={{ fontSize: 12, color: "var(--text-muted)" }}>
                         {u.last_active
-                          ? new Date(u.last_active).toLocaleString()
+                          ? new Date(u.last_active).toLocaleDateString()
                           : "Never"}
                       </td>
                       <td>
@@ -1096,8 +1196,33 @@ CRITICAL RULES:
                       </td>
                     </tr>
                   )}
+                  {users?.length === 0 && (
+                    <tr>
+                      <td
+                        colSpan={7}
+                        style={{
+                          textAlign: "center",
+                          color: "var(--text-muted)",
+                          padding: 24,
+                        }}
+                      >
+                        No users found
+                      </td>
+                    </tr>
+                  )}
                 </tbody>
               </table>
+              {usersCursor !== null && (
+                <div style={{ textAlign: "center", padding: 16 }}>
+                  <button
+                    className="btn btn-secondary"
+                    onClick={loadMoreUsers}
+                    disabled={usersLoadingMore}
+                  >
+                    {usersLoadingMore ? "Loading..." : "Show more"}
+                  </button>
+                </div>
+              )}
             </div>
           )}
 
@@ -1,6 +1,6 @@
 "use client";
 
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { useRouter } from "next/navigation";
 import { getApiBase, fetchJSON } from "@/lib/api";
 import Navbar from "@/components/Navbar";
@@ -16,6 +16,29 @@ interface LeaderboardEntry {
   last_active: string | null;
 }
 
+type LeaderboardWindow = "all" | "week" | "month";
+
+interface LeaderboardPageData {
+  window: LeaderboardWindow;
+  entries: LeaderboardEntry[];
+  total: number;
+  next_cursor: number | null;
+}
+
+type MyRank = Partial<LeaderboardEntry> & {
+  window: LeaderboardWindow;
+  rank: number | null;
+  total: number;
+};
+
+const WINDOW_LABELS: Record<LeaderboardWindow, string> = {
+  all: "All Time",
+  month: "This Month",
+  week: "This Week",
+};
+
+const PAGE_SIZE = 50;
+
 interface Achievement {
   id: string;
   title: string;
@@ -107,6 +130,13 @@ export default function LeaderboardPage() {
   );
   const [currentUserId, setCurrentUserId] = useState<number | null>(null);
   const [isLoading, setIsLoading] = useState(true);
+  const [lbWindow, setLbWindow] = useState<LeaderboardWindow>("all");
+  const [nextCursor, setNextCursor] = useState<number | null>(null);
+  const [totalRanked, setTotalRanked] = useState(0);
+  const [myRank, setMyRank] = useState<MyRank | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+  // Window the list currently shows; responses for any other are dropped
+  const windowRef = useRef<LeaderboardWindow>(lbWindow);
 
   useEffect(() => {
     const uid = localStorage.getItem("user_id");
@@ -117,18 +147,62 @@ export default function LeaderboardPage() {
     }
     setCurrentUserId(Number(uid));
 
+    fetchJSON<AchievementsData>(`${getApiBase()}/api/v1/achievements`)
+      .then((ach) => {
+        if (ach) setAchievements(ach);
+      })
+      .catch(() => showToast("Failed to load achievements", "error"));
+  }, [router]);
+
+  useEffect(() => {
+    if (!localStorage.getItem("token")) return;
+    windowRef.current = lbWindow;
+    let cancelled = false;
     const base = getApiBase();
+    setIsLoading(true);
     Promise.all([
-      fetchJSON<LeaderboardEntry[]>(`${base}/api/v1/leaderboard`),
-      fetchJSON<AchievementsData>(`${base}/api/v1/achievements`),
+      fetchJSON<LeaderboardPageData>(
+        `${base}/api/v1/leaderboard?window=${lbWindow}&limit=${PAGE_SIZE}`,
+      ),
+      fetchJSON<MyRank>(`${base}/api/v1/leaderboard/me?window=${lbWindow}`),
     ])
-      .then(([lb, ach]) => {
-        setLeaderboard(Array.isArray(lb) ? lb : []);
-        if (ach) setAchievements(ach);
+      .then(([page, me]) => {
+        if (cancelled) return;
+        setLeaderboard(page?.entries ?? []);
+        setNextCursor(page?.next_cursor ?? null);
+        setTotalRanked(page?.total ?? 0);
+        setMyRank(me);
       })
-      .catch(() => showToast("Failed to load leaderboard", "error"))
-      .finally(() => setIsLoading(false));
-  }, [router]);
+      .catch(() => {
+        if (!cancelled) showToast("Failed to load leaderboard", "error");
+      })
+      .finally(() => {
+        if (!cancelled) setIsLoading(false);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [lbWindow]);
+
+  const loadMore = () => {
+    if (nextCursor === null || isLoadingMore) return;
+    const requested = lbWindow;
+    setIsLoadingMore(true);
+    fetchJSON<LeaderboardPageData>(
+      `${getApiBase()}/api/v1/leaderboard?window=${requested}&limit=${PAGE_SIZE}&cursor=${nextCursor}`,
+    )
+      .then((page) => {
+        if (!page || windowRef.current !== requested) return;
+        setLeaderboard((prev) => [...prev, ...page.entries]);
+        setNextCursor(page.next_cursor);
+        setTotalRanked(page.total);
+      })
+      .catch(() => showToast("Failed to load more", "error"))
+      .finally(() => setIsLoadingMore(false));
+  };
+
+  const myRankVisible =
+    myRank?.rank != null && leaderboard.some((e) => e.user_id === currentUserId);
 
   const earnedCount =
     achievements?.achievements.filter((a) => a.earned).length ?? 0;
@@ -221,6 +295,50 @@ export default function LeaderboardPage() {
             {/* Leaderboard View */}
             {activeTab === "leaderboard" && (
               <div className="fade-in-up">
+                <div
+                  style={{
+                    display: "flex",
+                    alignItems: "center",
+                    gap: 8,
+                    flexWrap: "wrap",
+                    marginBottom: 20,
+                  }}
+                >
+                  {(["all", "month", "week"] as LeaderboardWindow[]).map((w) => (
+                    <button
+                      key={w}
+                      className={`filter-btn${lbWindow === w ? " active" : ""}`}
+                      onClick={() => setLbWindow(w)}
+                    >
+                      {WINDOW_LABELS[w]}
+                    </button>
+                  ))}
+                  {myRank && (
+                    <span
+                      style={{
+                        marginLeft: "auto",
+                        color: "var(--text-muted)",
+                        fontSize: 14,
+                      }}
+                    >
+                      {myRank.rank != null ? (
+                        <>
+                          You&apos;re{" "}
+                          <strong style={{ color: "var(--accent-primary)" }}>
+                            #{myRank.rank}
+                          </strong>{" "}
+                          of {myRank.total}
+                          {!myRankVisible && myRank.solved != null && (
+                            <> · {myRank.solved} solved</>
+                          )}
+                        </>
+                      ) : (
+                        "Submit a solution to get ranked"
+                      )}
+                    </span>
+                  )}
+                </div>
+
                 <div className="lb-podium">
                   {leaderboard.slice(0, 3).map((entry, i) => {
                     const podiumOrder = [1, 0, 2];
@@ -375,6 +493,19 @@ export default function LeaderboardPage() {
                     </tbody>
                   </table>
                 </div>
+                {nextCursor !== null && (
+                  <div style={{ textAlign: "center", marginTop: 16 }}>
+                    <button
+                      className="btn btn-secondary"
+                      onClick={loadMore}
+                      disabled={isLoadingMore}
+                    >
+                      {isLoadingMore
+                        ? "Loading..."
+                        : `Show more (${leaderboard.length} of ${totalRanked})`}
+                    </button>
+                  </div>
+                )}
               </div>
             )}
 
@@ -91,6 +91,91 @@ export default function PlaygroundPage() {
     }
   }, [output, isRunning]);
 
+  // Strip all TTY control characters:
+  // 1. ANSI escape sequences (colors, cursor moves, etc.)
+  // 2. Carriage returns
+  // 3. Any remaining non-printable chars (except newline \n and tab \t)
+  const cleanTerminalOutput = (raw: string) =>
+    raw
+      // 1. ANSI CSI escapes (handles Bracketed Paste 'l', 'h', Cursor moves)
+      .replace(/\x1b\[[\x30-\x3f]*[\x20-\x2f]*[\x40-\x7e]/g, "")
+      // 2. OSC sequences
+      .replace(/\x1b\].*?(\x07|\x1b\\)/g, "")
+      // 3. Carriage returns
+      .replace(/\r/g, "")
+      // 4. Other control chars
+      .replace(/[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]/g, "")
+      // 5. Unicode replacement char from invalid TTY bytes
+      .replace(/\uFFFD/g, "");
+
+  const finishSession = (exitCode?: number, executionTime?: number) => {
+    setIsRunning(false);
+    setSessionId(null);
+    if (executionTime !== undefined) {
+      setOutput(
+        (prev) =>
+          prev +
+          `\n\n--- Process exited with code ${exitCode} in ${executionTime}s ---`,
+      );
+    }
+  };
+
+  const connectionLost = () => {
+    setIsRunning(false);
+    setSessionId(null);
+    setOutput(
+      (prev) => prev + "\n[Terminal connection lost or ended unexpectedly]",
+    );
+  };
+
+  // Server-Sent Events over fetch (EventSource cannot send the auth header):
+  // "output" events carry terminal text, a final "exit" event the status.
+  const streamTerminal = async (sid: string) => {
+    let res: Response;
+    try {
+      res = await authFetch(
+        `${getApiBase()}/api/v1/playground/stream/${sid}`,
+        { headers: authHeaders() },
+      );
+    } catch {
+      return pollTerminal(sid);
+    }
+    if (!res.ok || !res.body) return pollTerminal(sid);
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    try {
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let sep;
+        while ((sep = buffer.indexOf("\n\n")) !== -1) {
+          const block = buffer.slice(0, sep);
+          buffer = buffer.slice(sep + 2);
+          let event = "message";
+          let data = "";
+          for (const line of block.split("\n")) {
+            if (line.startsWith("event: ")) event = line.slice(7);
+            else if (line.startsWith("data: ")) data += line.slice(6);
+          }
+          if (event === "output") {
+            const text = cleanTerminalOutput(JSON.parse(data));
+            setOutput((prev) => prev + text);
+          } else if (event === "exit") {
+            const info = JSON.parse(data);
+            finishSession(info.exit_code, info.execution_time);
+            return;
+          }
+        }
+      }
+    } catch {
+      // fall through
+    }
+    connectionLost();
+  };
+
   const pollTerminal = async (sid: string) => {
     try {
       const res = await authFetch(
@@ -103,43 +188,17 @@ export default function PlaygroundPage() {
       const data = await res.json();
 
       if (data.output) {
-        // Strip all TTY control characters:
-        // 1. ANSI escape sequences (colors, cursor moves, etc.)
-        // 2. Carriage returns
-        // 3. Any remaining non-printable chars (except newline \n and tab \t)
-        const cleanOutput = data.output
-          // 1. ANSI CSI escapes (handles Bracketed Paste 'l', 'h', Cursor moves)
-          .replace(/\x1b\[[\x30-\x3f]*[\x20-\x2f]*[\x40-\x7e]/g, "")
-          // 2. OSC sequences
-          .replace(/\x1b\].*?(\x07|\x1b\\)/g, "")
-          // 3. Carriage returns
-          .replace(/\r/g, "")
-          // 4. Other control chars
-          .replace(/[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]/g, "")
-          // 5. Unicode replacement char from invalid TTY bytes
-          .replace(/\uFFFD/g, "");
+        const cleanOutput = cleanTerminalOutput(data.output);
         setOutput((prev) => prev + cleanOutput);
       }
 
       if (data.running) {
         setTimeout(() => pollTerminal(sid), 200);
       } else {
-        setIsRunning(false);
-        setSessionId(null);
-        if (data.execution_time !== undefined) {
-          setOutput(
-            (prev) =>
-              prev +
-              `\n\n--- Process exited with code ${data.exit_code} in ${data.execution_time}s ---`,
-          );
-        }
+        finishSession(data.exit_code, data.execution_time);
       }
     } catch (e: any) {
-      setIsRunning(false);
-      setSessionId(null);
-      setOutput(
-        (prev) => prev + "\n[Terminal connection lost or ended unexpectedly]",
-      );
+      connectionLost();
     }
   };
 
@@ -168,8 +227,8 @@ export default function PlaygroundPage() {
       // Focus the terminal input box immediately
       setTimeout(() => terminalInputRef.current?.focus(), 100);
 
-      // Start polling
-      pollTerminal(sid);
+      // Stream output (falls back to polling)
+      streamTerminal(sid);
     } catch (err: any) {
       setOutput(err.message || "An error occurred starting the execution.");
       setIsRunning(false);
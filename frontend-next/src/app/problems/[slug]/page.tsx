@@ -3,7 +3,13 @@
 import { useState, useEffect, useCallback, useRef } from "react";
 import { useParams, useRouter } from "next/navigation";
 import dynamic from "next/dynamic";
-import { getApiBase, fetchJSON, authHeaders, authFetch } from "@/lib/api";
+import {
+  getApiBase,
+  fetchJSON,
+  authHeaders,
+  authFetch,
+  resolveJudgeResponse,
+} from "@/lib/api";
 import Navbar from "@/components/Navbar";
 import AISidebarSkeleton from "@/components/AISidebarSkeleton";
 
@@ -179,12 +185,12 @@ export default function ProblemDetailPage() {
           problem_id: slug,
         }),
       });
-      if (!res.ok) {
-        if (res.status === 429)
+      const { ok, status, data } = await resolveJudgeResponse(res);
+      if (!ok) {
+        if (status === 429)
           throw new Error("Too many requests. Please slow down.");
         throw new Error("Server or Docker error occurred. Try again.");
       }
-      const data = await res.json();
       const output = data.output || data.error || "";
       setRawOutput(output);
       const cases = parseTestCases(output);
@@ -211,12 +217,12 @@ export default function ProblemDetailPage() {
           code,
         }),
       });
-      if (!res.ok) {
-        if (res.status === 429)
+      const { ok, status, data } = await resolveJudgeResponse(res);
+      if (!ok) {
+        if (status === 429)
           throw new Error("Too many requests. Please slow down.");
         throw new Error("Server or Docker error occurred. Try again.");
       }
-      const data = await res.json();
       const output = data.output || data.error || "";
       setRawOutput(output);
       const cases = parseTestCases(output);
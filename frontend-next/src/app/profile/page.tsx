@@ -38,6 +38,11 @@ interface Submission {
   created_at: string;
 }
 
+interface Profile {
+  stats: Stats;
+  submissions: Submission[];
+}
+
 export default function ProfilePage() {
   const router = useRouter();
   const [username, setUsername] = useState("");
@@ -55,14 +60,10 @@ export default function ProfilePage() {
     }
     setUsername(uname || "User");
 
-    const base = getApiBase();
-    Promise.all([
-      fetchJSON<Stats>(`${base}/api/v1/stats`),
-      fetchJSON<Submission[]>(`${base}/api/v1/submissions`),
-    ])
-      .then(([s, sub]) => {
-        setStats(s ?? null);
-        setSubmissions(Array.isArray(sub) ? sub : []);
+    fetchJSON<Profile>(`${getApiBase()}/api/v1/profile`)
+      .then((profile) => {
+        setStats(profile?.stats ?? null);
+        setSubmissions(profile?.submissions ?? []);
       })
       .catch(() => {})
       .finally(() => setIsLoading(false));
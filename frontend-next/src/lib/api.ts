@@ -130,3 +130,33 @@ export async function authFetch(
   }
   return res;
 }
+
+/**
+ * Resolve a response from /api/v1/execute or /api/v1/submit to its payload.
+ * When the backend judges through its queue it answers 202 with a job id;
+ * in that case poll /api/v1/jobs/<id> until the job finishes.
+ */
+export async function resolveJudgeResponse(
+  res: Response,
+): Promise<{ ok: boolean; status: number; data: any }> {
+  if (res.status !== 202) {
+    const data = await res.json().catch(() => ({}));
+    return { ok: res.ok, status: res.status, data };
+  }
+  const { job_id } = await res.json();
+  for (;;) {
+    await new Promise((resolve) => setTimeout(resolve, 400));
+    const jobRes = await authFetch(`${getApiBase()}/api/v1/jobs/${job_id}`, {
+      headers: authHeaders(),
+    });
+    if (!jobRes.ok) return { ok: false, status: jobRes.status, data: {} };
+    const job = await jobRes.json();
+    if (job.state === "finished" || job.state === "failed") {
+      return {
+        ok: job.http_status < 400,
+        status: job.http_status,
+        data: job.result,
+      };
+    }
+  }
+}